@@ -0,0 +1,71 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import market_sessions
+
+# ================= 分析结果缓存 =================
+# 右键分析 / 自选股扫描的结果按 (代码, 最新K线日期) 记忆:
+# - 开盘期间行情一直在变，结果只保留 ttl_open 秒；休市期间保留 ttl_closed 秒
+# - 换日 (最新K线日期变化) 后旧结果立即失效
+# - 同一代码的并发请求共享一次计算 (single-flight)，连续点击不会重复请求日K
+
+
+class AnalysisCache:
+    """
+    compute(code, name): 实际计算 (如 generate_analysis_data)
+    version(code): 返回当前最新K线日期，作为缓存键的一部分 (未知时返回 None)
+    """
+
+    def __init__(self, compute, version=lambda code: None, ttl_open=3.0, ttl_closed=300.0):
+        self.compute = compute
+        self.version = version
+        self.ttl_open = ttl_open
+        self.ttl_closed = ttl_closed
+        self._results = {}   # {code: (最新K线日期, 结果, 过期时间)}
+        self._inflight = {}  # {code: Future} 正在计算的请求
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _ttl(self, code):
+        if market_sessions.is_open(market_sessions.classify(code)):
+            return self.ttl_open
+        return self.ttl_closed
+
+    def get(self, code, name):
+        """返回分析结果；缓存有效时直接返回，同一代码正在计算时等待那次计算的结果"""
+        bar_date = self.version(code)
+        with self._lock:
+            entry = self._results.get(code)
+            if entry is not None and entry[0] == bar_date and time.monotonic() < entry[2]:
+                self.hits += 1
+                return entry[1]
+            future = self._inflight.get(code)
+            owner = future is None
+            if owner:
+                future = self._inflight[code] = Future()
+                self.misses += 1
+        if not owner:
+            return future.result()
+
+        try:
+            result = self.compute(code, name)
+        except Exception as e:
+            with self._lock:
+                self._inflight.pop(code, None)
+            future.set_exception(e)
+            raise
+        with self._lock:
+            # 失败 (None) 也缓存，避免对取不到数据的代码反复请求
+            self._results[code] = (self.version(code), result, time.monotonic() + self._ttl(code))
+            self._inflight.pop(code, None)
+        future.set_result(result)
+        return result
+
+    def retain(self, codes):
+        """只保留 codes 中的缓存 (自选股变化时调用)"""
+        with self._lock:
+            for code in list(self._results):
+                if code not in codes:
+                    del self._results[code]
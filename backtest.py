@@ -0,0 +1,223 @@
+"""
+回测: 用历史日K检验右键分析的打分模型 (technical_analysis.score_snapshot)
+
+- 每只代码一次性向量化计算整段历史的打分与结论 (technical_analysis.score_series)，
+  不逐日重建指标
+- 命中率: 各结论出现后 horizon 天的收益，买入类结论看上涨比例，卖出类结论看下跌比例
+- 策略: 出现"积极买入"次日起持有，出现"减仓/卖出"次日起空仓，其余结论维持原仓位；
+  与同期买入持有对比收益和最大回撤
+- 日K读取 (本地缓存，必要时请求网络) 用线程池，计算按代码分到多个进程
+
+命令行:
+    python backtest.py                                # 回测 stock_config.json 中的自选股
+    python backtest.py sh600000 sz000001 --bars 2000
+    python backtest.py --file codes.txt --horizon 10 --fee 0.001 --processes 8
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+import indicators
+import instruments
+import kline_store
+import screener
+import technical_analysis
+
+BACKTEST_BARS = 1000    # 每只代码回测的日K数量 (约 4 年)
+HORIZON = 5             # 命中率统计的持有天数
+WARMUP_BARS = 26 + 9    # MACD 需要的最少K线数，之前的打分缺少因子，不参与统计
+FETCH_WORKERS = 16      # 日K读取并发数
+PROCESSES = min(os.cpu_count() or 1, 8)  # 计算进程数 (0 为在当前进程计算)
+
+# 命中的方向: 买入类结论之后应上涨，卖出类结论之后应下跌，观察不计命中率
+HIT_DIRECTION = {2: 1, 1: 1, 0: 0, -1: -1, -2: -1}
+
+
+def backtest_bars(rows, horizon=HORIZON, fee=0.0):
+    """
+    对单只代码的日K ([(date, open, close, high, low, volume), ...]) 回测
+    返回 {"bars", "signals": {结论编号: [次数, 命中, 收益和]}, "strategy", "buy_hold",
+          "max_drawdown", "buy_hold_drawdown", "trades", "exposure"}；K线不足时返回 None
+    """
+    bars = indicators.Bars.from_rows(rows)
+    size = len(bars)
+    if size <= WARMUP_BARS:
+        return None
+    close = bars.close
+    codes = technical_analysis.conclusion_series(technical_analysis.score_series(bars))
+    first = WARMUP_BARS - 1  # 第一根因子齐全的K线 (第 WARMUP_BARS 根) 的下标
+
+    # 各结论之后 horizon 天的收益 (最后 horizon 根没有完整的后续行情)
+    signals = {}
+    if size > first + horizon:
+        forward = close[first + horizon:] / close[first:-horizon] - 1
+        sampled = codes[first:-horizon]
+        for code, direction in HIT_DIRECTION.items():
+            returns = forward[sampled == code]
+            hits = int(np.count_nonzero(returns * direction > 0)) if direction else 0
+            signals[code] = [len(returns), hits, float(returns.sum())]
+
+    # 仓位: 买入信号记 1，卖出信号记 0，其余沿用上一个信号 (向前填充)
+    signal = np.full(size, np.nan)
+    signal[codes == 2] = 1.0
+    signal[codes == -2] = 0.0
+    signal[:first] = np.nan
+    if np.isnan(signal[first]):
+        signal[first] = 0.0  # 起始空仓 (第一根就是买入信号时保留)
+    last = np.where(np.isnan(signal), 0, np.arange(size))
+    position = signal[np.maximum.accumulate(last)][first:]
+    # 当天收盘出信号，次日起按新仓位计算收益
+    held = position[:-1]
+    daily = close[first + 1:] / close[first:-1] - 1
+    changes = np.diff(position, prepend=0.0)  # 含第一根的建仓
+    turnover = np.abs(changes)
+    equity = (1 - fee * turnover[0]) * np.cumprod(1 + held * daily - fee * turnover[1:])
+    hold_equity = close[first + 1:] / close[first]
+
+    return {
+        "bars": len(daily),
+        "signals": signals,
+        "strategy": float(equity[-1] - 1),
+        "buy_hold": float(hold_equity[-1] - 1),
+        "max_drawdown": _max_drawdown(equity),
+        "buy_hold_drawdown": _max_drawdown(hold_equity),
+        "trades": int(np.count_nonzero(changes > 0)),
+        "exposure": float(held.mean()),
+    }
+
+
+def _max_drawdown(equity):
+    """净值序列的最大回撤 (负数)，起点净值为 1"""
+    peak = np.maximum.accumulate(np.maximum(equity, 1.0))
+    return float(min((equity / peak - 1).min(), 0.0))
+
+
+def _backtest_item(item):
+    """进程池任务: (代码, 名称, 日K, horizon, fee) -> (代码, 名称, 回测结果)"""
+    code, name, rows, horizon, fee = item
+    return code, name, backtest_bars(rows, horizon, fee)
+
+
+def load_history(stocks, bars=BACKTEST_BARS, workers=FETCH_WORKERS):
+    """并发读取 stocks 的日K，返回 [(代码, 名称, 日K)]；不支持技术分析或读取失败的代码跳过"""
+    stocks = [s for s in stocks if "analysis" in instruments.resolve(s["code"]).capabilities]
+    if not stocks:
+        return []
+
+    def fetch(stock):
+        try:
+            rows = kline_store.get_bars(instruments.resolve(stock["code"]).kline_code, bars)
+        except Exception as e:
+            print(f"Backtest fetch error for {stock['code']}: {e}")
+            return None
+        return (stock["code"], stock["name"], rows) if rows else None
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(stocks)), thread_name_prefix="backtest") as pool:
+        return [h for h in pool.map(fetch, stocks) if h]
+
+
+def run(history, horizon=HORIZON, fee=0.0, processes=PROCESSES):
+    """对 load_history 的结果逐只回测，返回 [(代码, 名称, 回测结果)] (K线不足的代码跳过)"""
+    items = [(code, name, rows, horizon, fee) for code, name, rows in history]
+    if processes and len(items) > 1:
+        with ProcessPoolExecutor(max_workers=min(processes, len(items))) as pool:
+            chunk = max(1, len(items) // (processes * 4))
+            results = list(pool.map(_backtest_item, items, chunksize=chunk))
+    else:
+        results = [_backtest_item(item) for item in items]
+    return [r for r in results if r[2]]
+
+
+def summarize(results):
+    """汇总全部代码: 各结论的次数/命中率/平均收益，以及策略与买入持有的平均表现"""
+    signals = {code: [0, 0, 0.0] for code in HIT_DIRECTION}
+    for _, _, r in results:
+        for code, (count, hits, total) in r["signals"].items():
+            signals[code][0] += count
+            signals[code][1] += hits
+            signals[code][2] += total
+    n = len(results)
+    return {
+        "symbols": n,
+        "bars": sum(r["bars"] for _, _, r in results),
+        "signals": signals,
+        "strategy": sum(r["strategy"] for _, _, r in results) / n,
+        "buy_hold": sum(r["buy_hold"] for _, _, r in results) / n,
+        "max_drawdown": sum(r["max_drawdown"] for _, _, r in results) / n,
+        "buy_hold_drawdown": sum(r["buy_hold_drawdown"] for _, _, r in results) / n,
+        "worst_drawdown": min(r["max_drawdown"] for _, _, r in results),
+        "trades": sum(r["trades"] for _, _, r in results),
+        "exposure": sum(r["exposure"] for _, _, r in results) / n,
+        "beat": sum(1 for _, _, r in results if r["strategy"] > r["buy_hold"]),
+    }
+
+
+def print_report(summary, horizon, results=None):
+    if results:
+        print("代码\t名称\t策略%\t持有%\t回撤%\t持有回撤%\t交易\t持仓%")
+        for code, name, r in results:
+            print(f"{code}\t{name}\t{r['strategy'] * 100:+.1f}\t{r['buy_hold'] * 100:+.1f}\t"
+                  f"{r['max_drawdown'] * 100:.1f}\t{r['buy_hold_drawdown'] * 100:.1f}\t"
+                  f"{r['trades']}\t{r['exposure'] * 100:.0f}")
+        print()
+
+    print(f"结论\t次数\t命中率\t{horizon}日平均收益%")
+    for code in sorted(HIT_DIRECTION, reverse=True):
+        count, hits, total = summary["signals"][code]
+        rate = f"{hits / count * 100:.1f}%" if count and HIT_DIRECTION[code] else "-"
+        avg = f"{total / count * 100:+.2f}" if count else "-"
+        print(f"{technical_analysis.CONCLUSION_CODES[code]}\t{count}\t{rate}\t{avg}")
+
+    s = summary
+    print(f"\n{s['symbols']} 只代码，{s['bars']} 根K线")
+    print(f"策略平均收益 {s['strategy'] * 100:+.1f}%  (买入持有 {s['buy_hold'] * 100:+.1f}%，"
+          f"跑赢 {s['beat']}/{s['symbols']})")
+    print(f"平均最大回撤 {s['max_drawdown'] * 100:.1f}%  (买入持有 {s['buy_hold_drawdown'] * 100:.1f}%，"
+          f"最差 {s['worst_drawdown'] * 100:.1f}%)")
+    print(f"交易 {s['trades']} 次，平均持仓时间占比 {s['exposure'] * 100:.0f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="技术面打分模型回测")
+    parser.add_argument("codes", nargs="*", help="代码 (不填则回测配置文件中的自选股)")
+    parser.add_argument("--file", help="代码列表文件 (每行一个代码)")
+    parser.add_argument("--config", default=screener.CONFIG_FILE, help="主程序配置文件")
+    parser.add_argument("--bars", type=int, default=BACKTEST_BARS, help="每只代码的日K数量")
+    parser.add_argument("--horizon", type=int, default=HORIZON, help="命中率统计的持有天数")
+    parser.add_argument("--fee", type=float, default=0.0, help="单边交易成本 (如 0.001 为千分之一)")
+    parser.add_argument("--workers", type=int, default=FETCH_WORKERS, help="日K读取并发数")
+    parser.add_argument("--processes", type=int, default=PROCESSES, help="计算进程数 (0 为不使用多进程)")
+    parser.add_argument("--per-symbol", action="store_true", help="同时输出每只代码的结果")
+    args = parser.parse_args(argv)
+    if args.horizon < 1:
+        parser.error("--horizon must be >= 1")
+
+    if args.codes:
+        stocks = [{"code": c, "name": c} for c in args.codes]
+    elif args.file:
+        stocks = screener.read_codes(args.file)
+    elif os.path.exists(args.config):
+        stocks = screener.load_watchlist(args.config)
+    else:
+        parser.error(f"no codes given and {args.config} not found")
+
+    t0 = time.perf_counter()
+    history = load_history(stocks, args.bars, args.workers)
+    t1 = time.perf_counter()
+    results = run(history, args.horizon, args.fee, args.processes)
+    t2 = time.perf_counter()
+    if not results:
+        print("没有可回测的代码 (日K不足或读取失败)", file=sys.stderr)
+        return 1
+    print_report(summarize(results), args.horizon, results if args.per_symbol else None)
+    print(f"\n{len(results)}/{len(stocks)} backtested: fetch {t1 - t0:.2f}s, compute {t2 - t1:.2f}s",
+          file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
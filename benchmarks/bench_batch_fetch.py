@@ -0,0 +1,92 @@
+"""
+批量行情抓取基准: 验证上千只代码能在一个刷新周期 (REFRESH_RATE) 内完成
+
+用法:
+    python benchmarks/bench_batch_fetch.py                 # 模拟网络 (默认 1200 只)
+    python benchmarks/bench_batch_fetch.py --count 3000    # 更大的自选股
+    python benchmarks/bench_batch_fetch.py --live          # 直连真实接口 (需联网)
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stock_monitor  # noqa: E402
+from benchmarks import payloads  # noqa: E402
+
+
+class _SimResponse:
+    status_code = 200
+
+    def __init__(self, content):
+        self.content = content
+        self.text = content.decode("gbk", errors="ignore")
+
+    def raise_for_status(self):
+        pass
+
+
+def make_simulated_get(latency, per_code):
+    """模拟网络: 固定往返延迟 + 按代码数量增加的传输耗时"""
+    rng = random.Random(42)
+    lock = threading.Lock()
+
+    def simulated_get(url, headers=None, timeout=2):
+        query = urlsplit(url).path
+        if "list=" in query:
+            codes = query.split("list=", 1)[1].split(",")
+            with lock:
+                body = payloads.sina_payload(codes, rng=rng)
+        else:
+            codes = query.split("q=", 1)[1].split(",")
+            with lock:
+                body = payloads.tencent_payload(codes, rng=rng)
+        time.sleep(latency + per_code * len(codes))
+        return _SimResponse(body)
+
+    return simulated_get
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量行情抓取基准")
+    parser.add_argument("--count", type=int, default=1200, help="代码数量")
+    parser.add_argument("--rounds", type=int, default=10, help="测试轮数")
+    parser.add_argument("--latency", type=float, default=0.08, help="模拟往返延迟(秒)")
+    parser.add_argument("--per-code", type=float, default=0.0005, help="模拟每只代码的传输耗时(秒)")
+    parser.add_argument("--live", action="store_true", help="直连真实接口")
+    args = parser.parse_args()
+
+    if not args.live:
+        stock_monitor.http_client.get = make_simulated_get(args.latency, args.per_code)
+
+    stocks = [{"code": c, "name": c} for c in payloads.universe(args.count)]
+    stock_monitor.STOCKS = stocks
+    stock_monitor.on_stocks_changed()
+    tencent_chunks = -(-args.count // stock_monitor.TENCENT_CHUNK_SIZE)
+    print(f"{args.count} codes, {tencent_chunks} chunks x {stock_monitor.TENCENT_CHUNK_SIZE}, "
+          f"{stock_monitor.FETCH_WORKERS} workers, tick = {stock_monitor.REFRESH_RATE}s, "
+          f"budget = {stock_monitor.TICK_BUDGET}s, {'live' if args.live else 'simulated'}")
+
+    timings = []
+    for i in range(args.rounds):
+        t0 = time.perf_counter()
+        data = stock_monitor.get_stock_data_tencent(stocks)
+        elapsed = time.perf_counter() - t0
+        timings.append(elapsed)
+        print(f"  round {i + 1:2d}: {elapsed * 1000:7.1f} ms, {len(data)}/{args.count} quotes")
+
+    timings.sort()
+    median = timings[len(timings) // 2]
+    ok = timings[-1] <= stock_monitor.REFRESH_RATE
+    print(f"median {median * 1000:.1f} ms, max {timings[-1] * 1000:.1f} ms, "
+          f"{args.count / median:.0f} quotes/s -> {'within one tick' if ok else 'SLOWER than one tick'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,231 @@
+"""
+技术指标基准: indicators (NumPy 列存储) vs 旧版 (逐根 dict + 列表推导)
+
+用法:
+    python benchmarks/bench_indicators.py                  # 100 根K线 x 500 只 (与右键分析同长度)
+    python benchmarks/bench_indicators.py --bars 2000      # 长历史 (回测场景)
+    python benchmarks/bench_indicators.py --kdj-n 120      # 长周期 KDJ
+    python benchmarks/bench_indicators.py --bars 1000 --symbols 50   # 回测打分
+"""
+import argparse
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import indicators  # noqa: E402
+import technical_analysis  # noqa: E402
+
+
+def make_rows(bars, rng):
+    """合成日K: [(date, open, close, high, low, volume), ...]"""
+    rows = []
+    close = rng.uniform(5, 50)
+    for i in range(bars):
+        open_ = close * (1 + rng.gauss(0, 0.005))
+        close = max(0.5, open_ * (1 + rng.gauss(0, 0.015)))
+        high = max(open_, close) * (1 + abs(rng.gauss(0, 0.006)))
+        low = min(open_, close) * (1 - abs(rng.gauss(0, 0.006)))
+        rows.append((f"d{i:05d}", open_, close, high, low, rng.uniform(1e5, 5e6)))
+    return rows
+
+
+def boundary_rows(changes, volumes, bars=160, start=10.0):
+    """
+    合成落在打分阈值上的日K: 收盘价按 changes 循环涨跌，成交量按 volumes 循环
+    (如 1 涨 6 跌、涨幅 = 1.5 倍跌幅时 RSI 恰为 20；成交量 5 平 1 放 1.5 倍时量比恰为 1.5)
+    """
+    rows = []
+    close = start
+    for i in range(bars):
+        prev = close
+        close = prev + changes[i % len(changes)]
+        rows.append((f"d{i:05d}", prev, close, max(prev, close), min(prev, close), volumes[i % len(volumes)]))
+    return rows
+
+
+# 阈值附近的历史: RSI 20 / 80、量比 1.5 / 0.6、收盘价等于均线 (涨跌相抵)
+BOUNDARY_CASES = [
+    ([0.15] + [-0.1] * 6, [1.1] * 5 + [1.65]),
+    ([0.1] * 6 + [-0.15], [1.3] * 5 + [0.78]),
+    ([0.07, -0.07], [0.3] * 5 + [0.45]),
+    ([0.3, -0.1, -0.1, -0.1], [2.2, 2.2, 2.2, 2.2, 2.2, 1.32]),
+]
+
+
+# ---------- 旧版算法 (原样保留，作为对照) ----------
+
+def legacy_parse(rows):
+    return [{"date": r[0], "open": r[1], "close": r[2], "high": r[3], "low": r[4], "volume": r[5]}
+            for r in rows]
+
+
+def legacy_ma(data, days):
+    if len(data) < days:
+        return None
+    subset = data[-days:]
+    return sum(d['close'] for d in subset) / days
+
+
+def legacy_rsi(data, periods=14):
+    if len(data) < periods + 1:
+        return None
+    gains = []
+    losses = []
+    for i in range(1, len(data)):
+        change = data[i]['close'] - data[i-1]['close']
+        if change > 0:
+            gains.append(change)
+            losses.append(0)
+        else:
+            gains.append(0)
+            losses.append(abs(change))
+    avg_gain = sum(gains[-periods:]) / periods
+    avg_loss = sum(losses[-periods:]) / periods
+    if avg_loss == 0:
+        return 100
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def legacy_macd(data, short=12, long=26, mid=9):
+    closes = [d['close'] for d in data]
+
+    def get_ema(values, n):
+        ema = [values[0]]
+        alpha = 2 / (n + 1)
+        for i in range(1, len(values)):
+            ema.append(alpha * values[i] + (1 - alpha) * ema[-1])
+        return ema
+
+    dif = [s - l for s, l in zip(get_ema(closes, short), get_ema(closes, long))]
+    dea = get_ema(dif, mid)
+    return dif, dea
+
+
+def legacy_kdj(data, n=9, m1=3, m2=3):
+    k_val = 50
+    d_val = 50
+    for i in range(len(data)):
+        window = data[max(0, i-n+1):i+1]
+        low_n = min(d['low'] for d in window)
+        high_n = max(d['high'] for d in window)
+        rsv = 50 if high_n == low_n else (data[i]['close'] - low_n) / (high_n - low_n) * 100
+        k_val = (m1-1)/m1 * k_val + 1/m1 * rsv
+        d_val = (m2-1)/m2 * d_val + 1/m2 * k_val
+    return k_val, d_val
+
+
+def run_legacy(rows):
+    data = legacy_parse(rows)
+    return (legacy_ma(data, 5), legacy_ma(data, 20), legacy_ma(data, 60), legacy_rsi(data),
+            legacy_macd(data), legacy_kdj(data))
+
+
+def run_numpy(rows):
+    bars = indicators.Bars.from_rows(rows)
+    return (indicators.sma(bars.close, 5), indicators.sma(bars.close, 20), indicators.sma(bars.close, 60),
+            indicators.rsi_simple(bars.close), indicators.macd(bars.close),
+            indicators.kdj(bars.high, bars.low, bars.close))
+
+
+def check(rows):
+    """校验两种实现的最后一个值一致"""
+    old = run_legacy(rows)
+    new = run_numpy(rows)
+    pairs = [(old[0], new[0][-1]), (old[1], new[1][-1]), (old[2], new[2][-1]), (old[3], new[3][-1]),
+             (old[4][0][-1], new[4][0][-1]), (old[4][1][-1], new[4][1][-1]),
+             (old[5][0], new[5][0][-1]), (old[5][1], new[5][1][-1])]
+    for a, b in pairs:
+        assert math.isclose(a, float(b), rel_tol=1e-9, abs_tol=1e-9), (a, b)
+
+
+def check_scores(rows):
+    """校验 score_series 的每一根与逐日重建指标 + score_snapshot 的打分一致 (完整历史，不截窗口)"""
+    series = technical_analysis.score_series(indicators.Bars.from_rows(rows))
+    for t in range(len(rows)):
+        snap = indicators.LiveIndicators(indicators.Bars.from_rows(rows[:t + 1])).snapshot()
+        result = technical_analysis.score_snapshot("", "", snap)
+        expected = result["score"] if result else 0.0  # 第一根没有昨收，不打分
+        assert series[t] == expected, (t, series[t], expected)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="技术指标基准")
+    parser.add_argument("--bars", type=int, default=100, help="每只代码的K线数量")
+    parser.add_argument("--symbols", type=int, default=500, help="代码数量")
+    parser.add_argument("--kdj-n", type=int, default=60, help="KDJ 对比中较长的窗口 N")
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    universe = [make_rows(args.bars, rng) for _ in range(args.symbols)]
+    for rows in universe[:20]:
+        check(rows)
+    # 打分: 默认 100 根之外再加两只长历史 (超过右键分析的 ANALYSIS_BARS 窗口)
+    for rows in universe[:5] + [make_rows(400, rng) for _ in range(2)]:
+        check_scores(rows)
+    for changes, volumes in BOUNDARY_CASES:
+        check_scores(boundary_rows(changes, volumes))
+
+    print(f"{args.symbols} symbols x {args.bars} bars (MA5/20/60, RSI, MACD, KDJ)")
+    timings = {}
+    for label, fn in (("legacy", run_legacy), ("numpy", run_numpy)):
+        t0 = time.perf_counter()
+        for rows in universe:
+            fn(rows)
+        timings[label] = time.perf_counter() - t0
+        print(f"  {label:<8} {timings[label] * 1000:8.1f} ms  {args.symbols / timings[label]:10,.0f} symbols/s")
+    print(f"  speedup  {timings['legacy'] / timings['numpy']:.2f}x")
+
+    # KDJ 单独对比: 旧版每根K线切片求 min/max (O(len*N))，新版滑动窗口极值 O(len)
+    data = [legacy_parse(rows) for rows in universe]
+    bars = [indicators.Bars.from_rows(rows) for rows in universe]
+    for n in (9, args.kdj_n):
+        k, d, _ = indicators.kdj(bars[0].high, bars[0].low, bars[0].close, n)
+        assert all(math.isclose(a, float(b), rel_tol=1e-9)
+                   for a, b in zip(legacy_kdj(data[0], n), (k[-1], d[-1])))
+        t0 = time.perf_counter()
+        for d in data:
+            legacy_kdj(d, n)
+        old = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        for b in bars:
+            indicators.kdj(b.high, b.low, b.close, n)
+        new = time.perf_counter() - t0
+        print(f"  KDJ({n:>3}) legacy {old * 1000:8.1f} ms  numpy {new * 1000:8.1f} ms  speedup {old / new:.1f}x")
+
+    # 实时指标: 每笔行情 update + snapshot，对比每次全量重算
+    live = indicators.LiveIndicators(bars[0])
+    last = universe[0][-1]
+    ticks = 20000
+    t0 = time.perf_counter()
+    for i in range(ticks):
+        live.update(last[2] * (1 + (i % 7 - 3) * 0.001), last[5], "")
+        live.snapshot()
+    per_tick = (time.perf_counter() - t0) / ticks
+    t0 = time.perf_counter()
+    for _ in range(200):
+        run_numpy(universe[0])
+    per_recompute = (time.perf_counter() - t0) / 200
+    print(f"  live tick {per_tick * 1e6:6.1f} us  vs full recompute {per_recompute * 1e6:8.1f} us")
+
+    # 回测打分: 逐日用截至当天的完整历史重建指标再打分 (score_snapshot) vs 整段历史一次计算 (score_series)
+    sample = universe[:5]
+    t0 = time.perf_counter()
+    for rows in sample:
+        for t in range(1, len(rows)):
+            snap = indicators.LiveIndicators(indicators.Bars.from_rows(rows[:t + 1])).snapshot()
+            technical_analysis.score_snapshot("", "", snap)
+    walk = (time.perf_counter() - t0) / len(sample)
+    t0 = time.perf_counter()
+    for b in bars:
+        technical_analysis.score_series(b)
+    vector = (time.perf_counter() - t0) / len(bars)
+    print(f"  score history  walk-forward {walk * 1000:8.1f} ms/symbol  "
+          f"vectorized {vector * 1000:6.2f} ms/symbol  speedup {walk / vector:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+行情解析微基准: quote_parser (单遍字节解析) vs 旧版 (整包 GBK 解码 + 多次 split)
+
+用法:
+    python benchmarks/bench_parser.py                       # 合成数据 (1000 只股票 + 200 条新浪)
+    python benchmarks/bench_parser.py --tencent-file a.txt  # 使用录制的腾讯原始返回 (字节)
+    python benchmarks/bench_parser.py --sina-file b.txt     # 使用录制的新浪原始返回 (字节)
+"""
+import argparse
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import quote_parser  # noqa: E402
+from benchmarks import payloads  # noqa: E402
+
+
+def legacy_parse_tencent(raw, code_map):
+    """
+    旧版 get_stock_data_tencent 中的腾讯解析逻辑 (去掉网络请求和注释，解析部分原样保留，作为对照)
+    返回 (price, percent, volume)，没有行情时间；比较时只比对 quote_parser 结果的前三项
+    """
+    results = {}
+    content = raw.decode('gbk', errors='ignore')
+    lines = content.strip().split(';')
+    for line in lines:
+        line = line.strip()
+        if '="' not in line: continue
+        try:
+            temp = line.split('="')[0]
+            key = temp[2:]
+            original_code = code_map.get(key, key)
+            data_str = line.split('="')[1].strip('"')
+            data = data_str.split('~')
+            if len(data) > 30:
+                current_price = float(data[3])
+                percent = float(data[32])
+                volume = float(data[6])
+                results[original_code] = (current_price, percent, volume)
+                continue
+            data_comma = data_str.split(',')
+            if len(data_comma) > 5:
+                current_price = float(data_comma[0])
+                if key.startswith('hf_'):
+                    percent = float(data_comma[1])
+                else:
+                    change_amount = float(data_comma[1])
+                    if current_price != 0:
+                        last_close = current_price - change_amount
+                        if last_close != 0:
+                            percent = (change_amount / last_close) * 100
+                        else:
+                            percent = 0.0
+                    else:
+                        percent = 0.0
+                results[original_code] = (current_price, percent, 0)
+        except Exception:
+            continue
+    return results
+
+
+def legacy_parse_sina(raw):
+    """
+    旧版 get_stock_data_tencent 中的新浪解析逻辑 (去掉网络请求和注释，解析部分原样保留，作为对照)
+    返回 (price, percent)；比较时只比对 quote_parser 结果的前两项
+    """
+    results = {}
+    content = raw.decode('gbk', errors='ignore')
+    lines = content.strip().split(';')
+    for line in lines:
+        if '="' not in line: continue
+        try:
+            key_part = line.split('="')[0]
+            if "_str_" in key_part:
+                api_key = key_part.split('_str_')[1]
+                user_code = api_key
+                if api_key.startswith("g_") and not api_key.startswith("gds_"):
+                    user_code = api_key[2:]
+                data_str = line.split('="')[1].strip('"')
+                data = data_str.split(',')
+                current_price = 0.0
+                percent = 0.0
+                if api_key.startswith("nf_"):
+                    if len(data) > 8:
+                        current_price = float(data[8])
+                        last_close = float(data[5])
+                        if last_close > 0:
+                            percent = ((current_price - last_close) / last_close) * 100
+                elif api_key.startswith("gds_"):
+                    if len(data) > 4:
+                        current_price = float(data[0])
+                        last_close = float(data[4])
+                        if last_close > 0:
+                            percent = ((current_price - last_close) / last_close) * 100
+                else:
+                    if len(data) > 0:
+                        current_price = float(data[0])
+                        if len(data) > 4:
+                            last_close = float(data[4])
+                            if last_close > 0:
+                                percent = ((current_price - last_close) / last_close) * 100
+                results[user_code] = (current_price, percent)
+                if user_code != api_key:
+                    results[api_key] = (current_price, percent)
+        except Exception:
+            continue
+    return results
+
+
+def project(results, width):
+    """quote_parser 结果截成旧版的字段数 (旧版没有行情时间，新浪还没有成交量)"""
+    return {code: quote[:width] for code, quote in results.items()}
+
+
+def check_quote_times(raw, results):
+    """行情时间是旧版没有的字段: 腾讯股票格式应与原始记录的第 30 个字段一致"""
+    for record in raw.decode("gbk", errors="ignore").split(";"):
+        if '="' not in record:
+            continue
+        key, body = record.strip().split('="', 1)
+        fields = body.strip('"').split("~")
+        if len(fields) > 30:
+            assert results[key[2:]][3] == fields[30], (key, results[key[2:]][3], fields[30])
+
+
+def bench(label, fn, n_records, number):
+    best = min(timeit.repeat(fn, number=number, repeat=5)) / number
+    print(f"  {label:<8} {best * 1000:8.3f} ms/payload  {n_records / best:12,.0f} records/s")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="行情解析微基准")
+    parser.add_argument("--count", type=int, default=1000, help="合成腾讯记录数")
+    parser.add_argument("--tencent-file", help="录制的腾讯原始返回")
+    parser.add_argument("--sina-file", help="录制的新浪原始返回")
+    parser.add_argument("--number", type=int, default=20, help="每轮重复次数")
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    if args.tencent_file:
+        with open(args.tencent_file, "rb") as f:
+            tencent_raw = f.read()
+    else:
+        codes = payloads.universe(args.count) + ["hf_XAU", "hf_GC"]
+        tencent_raw = payloads.tencent_payload(codes, rng=rng)
+    if args.sina_file:
+        with open(args.sina_file, "rb") as f:
+            sina_raw = f.read()
+    else:
+        codes = [f"nf_AU{i}" for i in range(100)] + [f"gds_AU{9900 + i}" for i in range(99)] + ["Au99.99"]
+        sina_raw = payloads.sina_payload(codes, rng=rng)
+
+    # 先校验两种实现结果一致 (另加几条名称含 0x7E 第二字节的记录)
+    tilde_raw = "".join(payloads.tencent_line(f"sh{688000 + i}", name=name, rng=rng)
+                        for i, name in enumerate(payloads.TILDE_NAMES)).encode("gbk")
+    names = {}
+    new_tilde = quote_parser.parse_tencent(tilde_raw, {}, names)
+    assert project(new_tilde, 3) == legacy_parse_tencent(tilde_raw, {}), "tencent results differ (GBK names)"
+    check_quote_times(tilde_raw, new_tilde)
+    assert sorted(names.values()) == sorted(payloads.TILDE_NAMES), "tencent names differ"
+    new_t = quote_parser.parse_tencent(tencent_raw, {})
+    old_t = legacy_parse_tencent(tencent_raw, {})
+    new_s = quote_parser.parse_sina(sina_raw)
+    old_s = legacy_parse_sina(sina_raw)
+    assert project(new_t, 3) == old_t, "tencent results differ"
+    assert project(new_s, 2) == old_s, "sina results differ"
+    check_quote_times(tencent_raw, new_t)
+
+    print(f"tencent: {len(tencent_raw):,} bytes, {len(new_t)} records")
+    old = bench("legacy", lambda: legacy_parse_tencent(tencent_raw, {}), len(new_t), args.number)
+    new = bench("parser", lambda: quote_parser.parse_tencent(tencent_raw, {}), len(new_t), args.number)
+    print(f"  speedup  {old / new:.2f}x")
+
+    print(f"sina: {len(sina_raw):,} bytes, {len(new_s)} records")
+    old = bench("legacy", lambda: legacy_parse_sina(sina_raw), len(new_s), args.number)
+    new = bench("parser", lambda: quote_parser.parse_sina(sina_raw), len(new_s), args.number)
+    print(f"  speedup  {old / new:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+端到端吞吐基准: 启动本地模拟行情服务器 (fake_quote_server)，走真实的 HTTP/连接池/解析路径
+测量每秒行情数、每轮刷新的延迟分位数，以及搜索和日K接口的延迟
+(日K使用临时目录里的新缓存库: 第一遍是请求接口 + 写缓存，第二遍单独报告命中缓存的耗时)
+
+用法:
+    python benchmarks/bench_throughput.py                           # 1200 只, 20 轮
+    python benchmarks/bench_throughput.py --latency 0.05 --jitter 0.03 --error-rate 0.02
+    python benchmarks/bench_throughput.py --tencent-file a.txt      # 回放录制的腾讯返回
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import http_client  # noqa: E402
+import kline_store  # noqa: E402
+import stock_monitor  # noqa: E402
+import technical_analysis  # noqa: E402,F401  主程序按需导入，提前加载以免计入第一次日K耗时
+from benchmarks import payloads  # noqa: E402
+from benchmarks.fake_quote_server import FakeQuoteServer  # noqa: E402
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(p / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def report(label, timings, extra=""):
+    timings = sorted(timings)
+    print(f"  {label:<8} p50 {percentile(timings, 50) * 1000:7.1f} ms  "
+          f"p90 {percentile(timings, 90) * 1000:7.1f} ms  "
+          f"p99 {percentile(timings, 99) * 1000:7.1f} ms  "
+          f"max {timings[-1] * 1000:7.1f} ms{extra}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="端到端吞吐基准 (本地模拟服务器)")
+    parser.add_argument("--count", type=int, default=1200, help="股票代码数量")
+    parser.add_argument("--sina", type=int, default=40, help="新浪期货/现货代码数量")
+    parser.add_argument("--rounds", type=int, default=20, help="行情刷新轮数")
+    parser.add_argument("--latency", type=float, default=0.03, help="服务器基础延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.02, help="延迟随机波动(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 500 的概率")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="挂起不返回的概率")
+    parser.add_argument("--tencent-file", help="录制的腾讯原始返回，按代码回放")
+    parser.add_argument("--sina-file", help="录制的新浪原始返回，按代码回放")
+    args = parser.parse_args()
+
+    server = FakeQuoteServer(latency=args.latency, jitter=args.jitter,
+                             error_rate=args.error_rate, hang_rate=args.hang_rate,
+                             tencent_file=args.tencent_file, sina_file=args.sina_file)
+    server.start()
+    http_client.use_base_url(server.base_url)
+    http_client.warm_up()
+
+    codes = payloads.universe(args.count)
+    codes += [f"nf_AU{i}" for i in range(args.sina // 2)]
+    codes += [f"gds_AU{9900 + i}" for i in range(args.sina - args.sina // 2)]
+    stocks = [{"code": c, "name": c} for c in codes]
+    stock_monitor.STOCKS = stocks
+    stock_monitor.on_stocks_changed()
+    print(f"{len(codes)} codes against {server.base_url}, latency {args.latency * 1000:.0f}"
+          f"±{args.jitter * 1000:.0f} ms, error rate {args.error_rate:.0%}, "
+          f"tick = {stock_monitor.REFRESH_RATE}s, budget = {stock_monitor.TICK_BUDGET}s")
+
+    # 行情: 每轮一次完整抓取 (与引擎每个周期的调用一致)
+    timings = []
+    total_quotes = 0
+    missing = 0
+    for _ in range(args.rounds):
+        t0 = time.perf_counter()
+        data = stock_monitor.get_stock_data_tencent(stocks)
+        timings.append(time.perf_counter() - t0)
+        total_quotes += len(data)
+        missing += len(codes) - len(data)
+    busy = sum(timings)
+    report("quotes", timings, f"  {total_quotes / busy:,.0f} quotes/s, {missing} missing")
+
+    # 搜索和日K: 单次请求延迟
+    search_timings = []
+    for i in range(args.rounds):
+        t0 = time.perf_counter()
+        stock_monitor.search_stocks_sina(f"60{i % 10}")
+        search_timings.append(time.perf_counter() - t0)
+    report("search", search_timings)
+
+    # 日K: 不用当前目录的 kline_cache.db (上次运行留下的缓存会让"请求"变成读 SQLite)
+    with tempfile.TemporaryDirectory() as tmp:
+        store = kline_store._store = kline_store.KlineStore(os.path.join(tmp, kline_store.DB_FILE))
+        try:
+            for label in ("kline", "cached"):
+                kline_timings = []
+                for code in codes[:args.rounds]:
+                    t0 = time.perf_counter()
+                    stock_monitor.get_kline_data_analysis(code)
+                    kline_timings.append(time.perf_counter() - t0)
+                report(label, kline_timings, f"  {store.fetches} fetches" if label == "kline" else "")
+        finally:
+            kline_store._store = None
+            store.close()
+
+    print(f"  server handled {server.requests} requests")
+    server.stop()
+    over = percentile(sorted(timings), 99) > stock_monitor.REFRESH_RATE
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
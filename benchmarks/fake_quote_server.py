@@ -0,0 +1,276 @@
+"""
+本地模拟行情服务器: 按真实接口格式返回合成 (或录制) 数据，可配置延迟和错误注入
+
+支持的接口 (路径与线上一致):
+    /q=sh600000,hf_XAU                              腾讯行情  v_xxx="..."
+    /list=gds_AU9999,nf_AU0                         新浪行情  var hq_str_xxx="..."
+    /appstock/app/fqkline/get?param=code,day,,,100,qfq   腾讯日K (JSON)
+    /suggest/type=&key=600                          新浪搜索
+
+单独运行，并让主程序连到它:
+    python benchmarks/fake_quote_server.py --port 8765 --latency 0.03 --error-rate 0.05
+    STOCK_MONITOR_API_BASE=http://127.0.0.1:8765 python stock_monitor.py
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import payloads  # noqa: E402
+
+# 合成日K的起始日期 (每只代码的走势由代码本身决定，多次请求结果一致)
+KLINE_EPOCH = date(2020, 1, 2)
+
+
+def _load_records(path, marker):
+    """把录制的原始返回按代码拆成 {key: 单条记录字节}"""
+    records = {}
+    with open(path, "rb") as f:
+        raw = f.read()
+    for chunk in raw.split(b";"):
+        chunk = chunk.strip()
+        eq = chunk.find(b'="')
+        idx = chunk.find(marker)
+        if eq < 0 or idx < 0:
+            continue
+        key = chunk[idx + len(marker):eq].decode("ascii", errors="ignore")
+        records[key] = chunk + b";\n"
+    return records
+
+
+class _Quote:
+    """单只代码的模拟行情 (随机游走)"""
+
+    def __init__(self, code):
+        self.rng = random.Random(zlib.crc32(code.encode()))
+        self.last_close = round(self.rng.uniform(3, 80), 2)
+        if code.startswith(("hf_", "gds_", "nf_", "Au", "g_")):
+            self.last_close = round(self.rng.uniform(500, 2700), 2)
+        self.price = self.last_close
+        self.volume = self.rng.randint(1000, 100000)
+        self.lock = threading.Lock()
+
+    def tick(self):
+        with self.lock:
+            self.price = round(max(0.01, self.price * (1 + self.rng.gauss(0, 0.001))), 2)
+            self.volume += self.rng.randint(0, 500)
+            return self.price, self.last_close, self.volume
+
+
+class FakeQuoteServer:
+    """
+    latency: 每个请求的基础延迟（秒）
+    jitter: 延迟的随机波动（秒）
+    error_rate: 返回 HTTP 500 的概率
+    hang_rate: 挂起 hang_seconds 后才返回的概率 (模拟超时)
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0, jitter=0.0,
+                 error_rate=0.0, hang_rate=0.0, hang_seconds=5.0,
+                 tencent_file=None, sina_file=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.recorded_tencent = _load_records(tencent_file, b"v_") if tencent_file else {}
+        self.recorded_sina = _load_records(sina_file, b"_str_") if sina_file else {}
+        self.requests = 0  # 已处理的 GET 请求数 (处理线程并发递增，受 _lock 保护)
+        self._quotes = {}
+        self._klines = {}
+        self._lock = threading.Lock()
+        self._rng = random.Random(1)
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # 支持长连接，与真实接口行为一致
+
+            def do_HEAD(self):
+                self._send(200, b"", "text/plain")
+
+            def do_GET(self):
+                status, body, ctype = server.handle(self.path)
+                self._send(status, body, ctype)
+
+            def _send(self, status, body, ctype):
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                if self.command != "HEAD":
+                    self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- 路由 ----------
+
+    def handle(self, path):
+        with self._lock:
+            self.requests += 1
+            roll = self._rng.random()
+            delay = self.latency + self._rng.uniform(0, self.jitter)
+        if roll < self.hang_rate:
+            delay += self.hang_seconds
+        if delay > 0:
+            time.sleep(delay)
+        if self.hang_rate <= roll < self.hang_rate + self.error_rate:
+            return 500, b"injected error", "text/plain"
+
+        parts = urlsplit(path)
+        route = unquote(parts.path)
+        if route.startswith("/q="):
+            return 200, self.tencent(route[3:].split(",")), "text/html; charset=GBK"
+        if route.startswith("/list="):
+            return 200, self.sina(route[6:].split(",")), "text/html; charset=GBK"
+        if route.startswith("/appstock/app/fqkline/get"):
+            param = parse_qs(parts.query).get("param", [""])[0]
+            return 200, self.kline(param), "application/json"
+        if route.startswith("/suggest/"):
+            return 200, self.suggest(route.split("key=", 1)[-1]), "text/html; charset=GBK"
+        return 404, b"not found", "text/plain"
+
+    def _quote(self, code):
+        with self._lock:
+            q = self._quotes.get(code)
+            if q is None:
+                q = self._quotes[code] = _Quote(code)
+        return q
+
+    def tencent(self, codes):
+        out = []
+        for code in codes:
+            if not code:
+                continue
+            if code in self.recorded_tencent:
+                out.append(self.recorded_tencent[code].decode("gbk", errors="ignore"))
+                continue
+            price, last_close, volume = self._quote(code).tick()
+            if code.startswith("hf_"):
+                pct = (price - last_close) / last_close * 100
+                out.append(payloads.tencent_hf_line(code, price=price, percent=round(pct, 2)))
+            elif code.startswith(("sh", "sz", "bj", "hk", "us")):
+                out.append(payloads.tencent_line(code, price=price, last_close=last_close, volume=volume))
+            else:
+                out.append('v_pv_none_match="1";\n')
+        return "".join(out).encode("gbk")
+
+    def sina(self, codes):
+        out = []
+        for code in codes:
+            if not code:
+                continue
+            if code in self.recorded_sina:
+                out.append(self.recorded_sina[code].decode("gbk", errors="ignore"))
+                continue
+            price, last_close, _ = self._quote(code).tick()
+            out.append(payloads.sina_line(code, price=price, last_close=last_close))
+        return "".join(out).encode("gbk")
+
+    def _kline_series(self, code):
+        """合成日K: 从 KLINE_EPOCH 到今天的每个工作日，走势由代码决定"""
+        today = date.today()
+        cached = self._klines.get(code)
+        if cached is not None and cached[0] == today:
+            return cached[1]
+        # 生成在锁外进行，不同代码的请求互不阻塞 (同一代码并发时重复生成也无妨)
+        rng = random.Random(zlib.crc32(code.encode()))
+        close = rng.uniform(5, 50)
+        bars = []
+        day = KLINE_EPOCH
+        while day <= today:
+            if day.weekday() < 5:
+                open_ = close * (1 + rng.gauss(0, 0.005))
+                close = max(0.5, open_ * (1 + rng.gauss(0, 0.015)))
+                high = max(open_, close) * (1 + abs(rng.gauss(0, 0.006)))
+                low = min(open_, close) * (1 - abs(rng.gauss(0, 0.006)))
+                volume = rng.randint(50000, 5000000)
+                bars.append([day.isoformat(), f"{open_:.3f}", f"{close:.3f}", f"{high:.3f}",
+                             f"{low:.3f}", f"{volume:.3f}"])
+            day += timedelta(days=1)
+        self._klines[code] = (today, bars)
+        return bars
+
+    def kline(self, param):
+        # param: code,day,start,end,count,qfq
+        fields = (param.split(",") + [""] * 6)[:6]
+        code, _, start, end, count, _ = fields
+        bars = self._kline_series(code)
+        if start:
+            bars = [b for b in bars if b[0] >= start]
+        if end:
+            bars = [b for b in bars if b[0] <= end]
+        count = int(count) if count.isdigit() else 320
+        bars = bars[-count:]
+        key = "day" if code[2:5] in ("000", "399") else "qfqday"
+        body = {"code": 0, "msg": "", "data": {code: {key: bars}}}
+        return json.dumps(body).encode("utf-8")
+
+    def suggest(self, keyword):
+        items = []
+        for code in payloads.universe(2000):
+            if keyword in code:
+                items.append(f"股票{code[-4:]},11,{code[2:]},{code},股票{code[-4:]},,股票{code[-4:]},99,1,,,")
+            if len(items) >= 10:
+                break
+        return f'var suggestvalue="{";".join(items)}";'.encode("gbk")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地模拟行情服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="基础延迟(秒)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="延迟随机波动(秒)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="返回 HTTP 500 的概率")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="挂起不返回的概率")
+    parser.add_argument("--tencent-file", help="录制的腾讯原始返回，按代码回放")
+    parser.add_argument("--sina-file", help="录制的新浪原始返回，按代码回放")
+    args = parser.parse_args()
+
+    server = FakeQuoteServer(args.host, args.port, args.latency, args.jitter,
+                             args.error_rate, args.hang_rate,
+                             tencent_file=args.tencent_file, sina_file=args.sina_file)
+    print(f"{datetime.now():%H:%M:%S} fake quote server on {server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
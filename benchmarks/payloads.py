@@ -0,0 +1,98 @@
+"""
+合成行情数据 (供基准测试使用)
+格式与腾讯 qt.gtimg.cn / 新浪 hq.sinajs.cn 的真实返回保持一致，GBK 编码
+"""
+import random
+from datetime import datetime
+
+# 腾讯股票格式 (~ 分隔) 的字段数，真实返回一般在 80 个以上
+TENCENT_FIELD_COUNT = 88
+
+
+def universe(count):
+    """生成 count 个 A 股代码 (沪市 60xxxx + 深市 00xxxx 交替)"""
+    codes = []
+    for i in range(count):
+        if i % 2 == 0:
+            codes.append(f"sh{600000 + i // 2:06d}")
+        else:
+            codes.append(f"sz{1 + i // 2:06d}")
+    return codes
+
+
+# GBK 编码中第二字节为 0x7E ("~") 的名称，用于校验解析器不会在名称中间切分字段
+TILDE_NAMES = ["中葉银行", "紐約金", "詞典科技", "古箏文化", "賬務通"]
+
+
+def tencent_line(code, price=None, last_close=None, volume=None, now=None, rng=random, name=None):
+    """构造一条腾讯股票行情: v_sh600000="1~名称~600000~现价~昨收~...";"""
+    last_close = last_close or round(rng.uniform(3, 80), 2)
+    price = price or round(last_close * (1 + rng.uniform(-0.05, 0.05)), 2)
+    volume = volume or rng.randint(1000, 5000000)
+    now = now or datetime.now()
+    change = price - last_close
+    fields = [""] * TENCENT_FIELD_COUNT
+    fields[0] = "1" if code.startswith("sh") else "51"
+    fields[1] = name or f"股票{code[-4:]}"
+    fields[2] = code[2:]
+    fields[3] = f"{price:.2f}"
+    fields[4] = f"{last_close:.2f}"
+    fields[5] = f"{last_close:.2f}"
+    fields[6] = str(volume)
+    for i in range(7, 29):
+        fields[i] = str(rng.randint(0, 99999))
+    fields[30] = now.strftime("%Y%m%d%H%M%S")
+    fields[31] = f"{change:.2f}"
+    fields[32] = f"{change / last_close * 100:.2f}"
+    fields[33] = f"{max(price, last_close):.2f}"
+    fields[34] = f"{min(price, last_close):.2f}"
+    fields[36] = str(volume)
+    fields[37] = str(volume * 10)
+    return f'v_{code}="{"~".join(fields)}";\n'
+
+
+def tencent_hf_line(code="hf_XAU", price=None, percent=None, now=None, rng=random):
+    """构造一条腾讯外盘期货行情 (逗号分隔): v_hf_XAU="现价,涨跌幅,..." """
+    price = price or round(rng.uniform(2500, 2700), 2)
+    percent = percent if percent is not None else round(rng.uniform(-2, 2), 2)
+    now = now or datetime.now()
+    fields = [f"{price:.2f}", f"{percent:.2f}", f"{price:.2f}", f"{price + 0.5:.2f}",
+              f"{price + 5:.2f}", f"{price - 5:.2f}", now.strftime("%H:%M:%S"),
+              f"{price:.2f}", f"{price:.2f}", "0", "0", "0", now.strftime("%Y-%m-%d"), "伦敦金"]
+    return f'v_{code}="{",".join(fields)}";\n'
+
+
+def sina_line(code, price=None, last_close=None, now=None, rng=random):
+    """构造一条新浪行情: var hq_str_gds_AU9999="...";  支持 gds_ / nf_ / g_ 现货"""
+    now = now or datetime.now()
+    last_close = last_close or round(rng.uniform(500, 1100), 2)
+    price = price or round(last_close * (1 + rng.uniform(-0.03, 0.03)), 2)
+    if code.startswith("nf_"):
+        # 名称,时间,开盘,最高,最低,昨收,买价,卖价,最新价,...
+        fields = ["黄金连续", now.strftime("%H%M%S"), f"{last_close:.2f}", f"{price + 2:.2f}",
+                  f"{price - 2:.2f}", f"{last_close:.2f}", f"{price:.2f}", f"{price:.2f}",
+                  f"{price:.2f}", f"{price:.2f}", f"{last_close:.2f}", "1", "1", "100000",
+                  "200000", "沪", "黄金", now.strftime("%Y-%m-%d")]
+    else:
+        # 现价,?,开盘,最高,昨收,最低,时间,...
+        fields = [f"{price:.2f}", "0", f"{last_close:.2f}", f"{price + 2:.2f}",
+                  f"{last_close:.2f}", f"{price - 2:.2f}", now.strftime("%H:%M:%S"),
+                  f"{last_close:.2f}", f"{price:.2f}", "0", "0", "0", now.strftime("%Y-%m-%d"), "黄金9999"]
+    key = code if code.startswith(("nf_", "gds_", "g_")) else f"g_{code}"
+    return f'var hq_str_{key}="{",".join(fields)}";\n'
+
+
+def tencent_payload(codes, rng=random):
+    """批量腾讯返回 (bytes, GBK)"""
+    lines = []
+    for code in codes:
+        if code.startswith("hf_"):
+            lines.append(tencent_hf_line(code, rng=rng))
+        else:
+            lines.append(tencent_line(code, rng=rng))
+    return "".join(lines).encode("gbk")
+
+
+def sina_payload(codes, rng=random):
+    """批量新浪返回 (bytes, GBK)"""
+    return "".join(sina_line(code, rng=rng) for code in codes).encode("gbk")
@@ -0,0 +1,117 @@
+"""
+启动耗时剖析: 用 python -X importtime 在子进程里导入 stock_monitor，输出各直接依赖的累计导入耗时，
+检查 NumPy/PIL 等重模块没有在启动时被导入，并对总导入耗时做预算检查 (超出时退出码为 1，可放进 CI)
+
+--ui 时再真正启动一次主程序 (需要图形界面和网络)，读取 --profile-startup 输出的
+导入 / 读配置 / 首帧 / 第一笔行情耗时
+
+用法:
+    python benchmarks/startup_profile.py                    # 导入耗时, 5 次取中位数
+    python benchmarks/startup_profile.py --budget 150       # 导入超过 150 ms 时失败
+    python benchmarks/startup_profile.py --ui --paint-budget 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 启动时不应导入的模块 (只在打开分析/选股/二维码时按需加载)
+LAZY_MODULES = ("numpy", "PIL", "tkinter.ttk", "indicators", "technical_analysis", "screener", "replay")
+
+IMPORT_BUDGET_MS = 250  # 默认导入预算 (开发机上约 100 ms，留出慢机器的余量)
+
+
+def run_python(args, cwd):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return subprocess.run([sys.executable] + args, cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+def profile_imports(cwd):
+    """导入一次 stock_monitor: 返回 (总耗时 ms, {直接依赖: 累计 ms}, 被导入的重模块)"""
+    probe = ("import json, sys, stock_monitor; "
+             f"print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))")
+    result = run_python(["-X", "importtime", "-c", probe], cwd)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+    total, children, pending = 0.0, {}, {}
+    # 格式: "import time: self [us] | cumulative | imported package"，缩进表示层级，子模块先于父模块输出
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            pending[name.strip()] = int(cumulative) / 1000
+        elif depth == 0:
+            if name.strip() == "stock_monitor":
+                total, children = int(cumulative) / 1000, pending
+            pending = {}
+    loaded = json.loads(result.stdout.strip().splitlines()[-1])
+    return total, children, loaded
+
+
+def profile_ui(cwd):
+    """启动主程序直到第一笔行情 (或超时)，返回 {阶段: ms}"""
+    result = run_python([os.path.join(ROOT, "stock_monitor.py"), "--profile-startup"], cwd)
+    for line in result.stdout.splitlines():
+        if line.startswith("STARTUP_PROFILE "):
+            return json.loads(line[len("STARTUP_PROFILE "):])
+    raise RuntimeError((result.stderr or result.stdout).strip()[-500:] or "no startup profile")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="启动耗时剖析与预算检查")
+    parser.add_argument("--runs", type=int, default=5, help="导入次数 (取中位数)")
+    parser.add_argument("--top", type=int, default=15, help="列出耗时最多的直接依赖个数")
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_MS, help="导入耗时预算 (ms)")
+    parser.add_argument("--ui", action="store_true", help="同时启动界面，测量首帧和第一笔行情")
+    parser.add_argument("--paint-budget", type=float, default=0, help="首帧耗时预算 (ms，0 为不检查)")
+    args = parser.parse_args()
+
+    failures = []
+    # 在临时目录里运行，不读写当前目录的配置/快照/行情记录
+    with tempfile.TemporaryDirectory() as cwd:
+        totals, per_module = [], {}
+        for _ in range(args.runs):
+            total, children, loaded = profile_imports(cwd)
+            totals.append(total)
+            for name, ms in children.items():
+                per_module.setdefault(name, []).append(ms)
+
+        total = statistics.median(totals)
+        print(f"import stock_monitor: median {total:.1f} ms "
+              f"(min {min(totals):.1f}, max {max(totals):.1f}, {args.runs} runs)")
+        ranked = sorted(((statistics.median(v), k) for k, v in per_module.items()), reverse=True)
+        for ms, name in ranked[:args.top]:
+            print(f"  {name:<24} {ms:8.1f} ms")
+        if loaded:
+            failures.append(f"imported at startup: {', '.join(loaded)}")
+        if total > args.budget:
+            failures.append(f"import {total:.1f} ms > budget {args.budget:g} ms")
+
+        if args.ui:
+            marks = profile_ui(cwd)
+            print("startup: " + ", ".join(f"{k} {v:.0f} ms" for k, v in marks.items()))
+            if "first_quote" not in marks:
+                print("  no quote before timeout (network unavailable?)")
+            if args.paint_budget and marks.get("first_paint", float("inf")) > args.paint_budget:
+                failures.append(f"first paint {marks.get('first_paint')} ms > budget {args.paint_budget:g} ms")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("OK")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
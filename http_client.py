@@ -0,0 +1,80 @@
+import os
+import socket
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# ================= 网络传输层 =================
+# 所有行情/K线/搜索请求共用一个 Session:
+# 每个主机一个连接池，长连接复用，避免每秒刷新都重新握手
+
+# 各接口的主机地址 (可通过 use_base_url 或环境变量 STOCK_MONITOR_API_BASE
+# 统一指向本地模拟服务器，见 benchmarks/fake_quote_server.py)
+ENDPOINTS = {
+    "tencent": "http://qt.gtimg.cn",        # 腾讯行情
+    "sina": "http://hq.sinajs.cn",          # 新浪行情
+    "kline": "http://web.ifzq.gtimg.cn",    # 腾讯K线
+    "suggest": "http://suggest3.sinajs.cn", # 新浪搜索
+}
+
+# 需要在启动时预热的行情主机
+WARM_UP_ENDPOINTS = ("tencent", "sina", "kline")
+
+POOL_CONNECTIONS = 8  # 连接池数量 (按主机区分)
+POOL_MAXSIZE = 16     # 每个主机最多保留的长连接数
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def get_session():
+    """获取全局共享的 Session (首次调用时创建，线程安全)"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS,
+                                      pool_maxsize=POOL_MAXSIZE,
+                                      max_retries=0)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update({"Connection": "keep-alive"})
+                _session = session
+    return _session
+
+
+def use_base_url(base_url):
+    """把所有接口指向同一个地址 (本地模拟服务器/基准测试用)"""
+    base_url = base_url.rstrip("/")
+    for name in ENDPOINTS:
+        ENDPOINTS[name] = base_url
+
+
+def url(name, path):
+    """拼接接口地址: url("tencent", "/q=sh000001")"""
+    return ENDPOINTS[name] + path
+
+
+def get(url, headers=None, timeout=2):
+    """通过共享连接池发起 GET 请求 (替代 requests.get)"""
+    return get_session().get(url, headers=headers, timeout=timeout)
+
+
+def warm_up(names=WARM_UP_ENDPOINTS, timeout=2):
+    """预热: 提前完成 DNS 解析和 TCP 握手，把长连接放进连接池"""
+    for name in names:
+        target = ENDPOINTS[name] + "/"
+        try:
+            parts = urlsplit(target)
+            socket.getaddrinfo(parts.hostname, parts.port or 80)  # 让系统 DNS 缓存先生效
+            # 关闭响应后连接会归还连接池，供后续请求复用
+            get_session().head(target, timeout=timeout).close()
+        except Exception as e:
+            print(f"Warm-up failed for {target}: {e}")
+
+
+if os.environ.get("STOCK_MONITOR_API_BASE"):
+    use_base_url(os.environ["STOCK_MONITOR_API_BASE"])
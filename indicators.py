@@ -0,0 +1,389 @@
+"""
+技术指标计算 (NumPy 向量化)
+
+K线以列存储 (Bars: 日期 + open/high/low/close/volume 连续 float64 数组)，
+指标函数返回与输入等长的整条序列 (数据不足的位置为 NaN)，供分析、选股、回测共用
+"""
+import threading
+from collections import deque
+from datetime import date as date_cls
+
+import numpy as np
+
+# EMA 分块闭式计算时，块内缩放因子 (1-alpha)^-k 的上限；越大块越长，但累加的精度损失越大
+_EMA_SCALE_LIMIT = 1e6
+
+
+class Bars:
+    """日K的列存储"""
+    __slots__ = ("date", "open", "high", "low", "close", "volume")
+
+    def __init__(self, date, open, high, low, close, volume):
+        self.date = date
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    @classmethod
+    def from_rows(cls, rows):
+        """由 [(date, open, close, high, low, volume), ...] (kline_store/接口顺序) 构造"""
+        if not rows:
+            empty = np.empty(0)
+            return cls(np.empty(0, dtype="U10"), empty, empty.copy(), empty.copy(), empty.copy(), empty.copy())
+        date, open, close, high, low, volume = zip(*rows)
+        return cls(np.array(date, dtype="U10"), np.array(open, dtype=np.float64),
+                   np.array(high, dtype=np.float64), np.array(low, dtype=np.float64),
+                   np.array(close, dtype=np.float64), np.array(volume, dtype=np.float64))
+
+    def tail(self, n):
+        """最近 n 根K线"""
+        return Bars(*(getattr(self, f)[-n:] for f in self.__slots__))
+
+    def __len__(self):
+        return len(self.close)
+
+
+def _ema_filter(values, alpha, seed):
+    """
+    一阶递推 y[t] = (1-alpha)*y[t-1] + alpha*x[t]，y[-1] = seed
+    按块用闭式求解: 块内 y[i] = w^(i+1) * (y_prev + alpha * sum_{k<=i} x[k] / w^(k+1))，w = 1-alpha
+    块长保证 w^-k 不超过 _EMA_SCALE_LIMIT，避免溢出和精度损失
+    """
+    x = np.asarray(values, dtype=np.float64)
+    out = np.empty_like(x)
+    w = 1.0 - alpha
+    if w <= 0.0:
+        out[:] = x
+        return out
+    chunk = max(1, int(np.log(_EMA_SCALE_LIMIT) / -np.log(w)))
+    powers = w ** np.arange(1, min(chunk, len(x)) + 1)
+    prev = seed
+    for start in range(0, len(x), chunk):
+        seg = x[start:start + chunk]
+        p = powers[:len(seg)]
+        out[start:start + len(seg)] = p * (prev + alpha * np.cumsum(seg / p))
+        prev = out[start + len(seg) - 1]
+    return out
+
+
+def sma(values, n):
+    """简单移动平均"""
+    x = np.asarray(values, dtype=np.float64)
+    out = np.full(len(x), np.nan)
+    if n <= 0 or len(x) < n:
+        return out
+    csum = np.cumsum(np.insert(x, 0, 0.0))
+    out[n - 1:] = (csum[n:] - csum[:-n]) / n
+    return out
+
+
+def ema(values, n):
+    """指数移动平均 (alpha = 2/(n+1)，以第一个值为初值)"""
+    x = np.asarray(values, dtype=np.float64)
+    if len(x) == 0:
+        return x.copy()
+    return _ema_filter(x, 2.0 / (n + 1), x[0])
+
+
+def macd(close, short=12, long=26, mid=9):
+    """MACD: 返回 (dif, dea, macd柱) 三条序列，macd柱 = (dif - dea) * 2"""
+    dif = ema(close, short) - ema(close, long)
+    dea = ema(dif, mid)
+    return dif, dea, (dif - dea) * 2
+
+
+def _changes(close):
+    diff = np.diff(np.asarray(close, dtype=np.float64))
+    return np.where(diff > 0, diff, 0.0), np.where(diff < 0, -diff, 0.0)
+
+
+def _rsi_from_averages(avg_gain, avg_loss):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - 100 / (1 + avg_gain / avg_loss)
+    return np.where(avg_loss == 0, 100.0, rsi)
+
+
+def rsi_simple(close, periods=14):
+    """RSI (最近 periods 天涨跌幅的简单平均，与原分析面板的算法一致)"""
+    out = np.full(len(close), np.nan)
+    if len(close) < periods + 1:
+        return out
+    gains, losses = _changes(close)
+    avg_gain = sma(gains, periods)[periods - 1:]
+    avg_loss = sma(losses, periods)[periods - 1:]
+    out[periods:] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+def rsi_wilder(close, periods=14):
+    """RSI (Wilder 平滑: 前 periods 天简单平均作初值，之后 alpha = 1/periods 递推)"""
+    out = np.full(len(close), np.nan)
+    if len(close) < periods + 1:
+        return out
+    gains, losses = _changes(close)
+    alpha = 1.0 / periods
+    seed_gain = gains[:periods].mean()
+    seed_loss = losses[:periods].mean()
+    avg_gain = np.concatenate(([seed_gain], _ema_filter(gains[periods:], alpha, seed_gain)))
+    avg_loss = np.concatenate(([seed_loss], _ema_filter(losses[periods:], alpha, seed_loss)))
+    out[periods:] = _rsi_from_averages(avg_gain, avg_loss)
+    return out
+
+
+def _rolling_extreme(values, n, ufunc, fill):
+    """
+    van Herk/Gil-Werman 滑动窗口极值: 按长度 n 分块，块内前缀极值 + 后缀极值，
+    每个窗口 = 前一块的后缀极值与本块前缀极值的较大/较小者，O(len) 与窗口长度无关
+    """
+    x = np.asarray(values, dtype=np.float64)
+    size = len(x)
+    if size == 0 or n <= 1:
+        return x.copy()
+    # 前面补 n-1 个填充值 (开头不足 n 天时按已有数据计算)，再补齐到 n 的整数倍
+    total = -(-(size + n - 1) // n) * n
+    padded = np.full(total, fill)
+    padded[n - 1:n - 1 + size] = x
+    blocks = padded.reshape(-1, n)
+    prefix = ufunc.accumulate(blocks, axis=1).ravel()
+    suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+    # 窗口 [i, i+n-1] (填充后的下标) 的极值
+    return ufunc(suffix[:size], prefix[n - 1:n - 1 + size])
+
+
+def rolling_max(values, n):
+    """过去 n 天 (含当天) 的最高值，开头不足 n 天时按已有数据计算"""
+    return _rolling_extreme(values, n, np.maximum, -np.inf)
+
+
+def rolling_min(values, n):
+    """过去 n 天 (含当天) 的最低值，开头不足 n 天时按已有数据计算"""
+    return _rolling_extreme(values, n, np.minimum, np.inf)
+
+
+class RollingExtremes:
+    """
+    逐根K线维护过去 n 天最高价/最低价的单调队列 (每根摊还 O(1))
+    用于实时行情逐笔更新；批量计算用 rolling_max / rolling_min
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.count = 0
+        self._highs = deque()  # (序号, 最高价)，最高价单调递减
+        self._lows = deque()   # (序号, 最低价)，最低价单调递增
+
+    def push(self, high, low):
+        """加入一根新K线，返回 (窗口最高价, 窗口最低价)"""
+        i = self.count
+        self.count += 1
+        while self._highs and self._highs[-1][1] <= high:
+            self._highs.pop()
+        self._highs.append((i, high))
+        while self._lows and self._lows[-1][1] >= low:
+            self._lows.pop()
+        self._lows.append((i, low))
+        expired = i - self.n
+        while self._highs[0][0] <= expired:
+            self._highs.popleft()
+        while self._lows[0][0] <= expired:
+            self._lows.popleft()
+        return self._highs[0][1], self._lows[0][1]
+
+    def peek(self, high, low):
+        """假设再加入一根K线 (未收盘的当天K线)，返回窗口极值，不修改队列"""
+        expired = self.count - self.n
+        highest, lowest = high, low
+        for i, value in self._highs:
+            if i > expired:
+                highest = max(highest, value)
+                break
+        for i, value in self._lows:
+            if i > expired:
+                lowest = min(lowest, value)
+                break
+        return highest, lowest
+
+
+def kdj(high, low, close, n=9, m1=3, m2=3):
+    """KDJ: 返回 (k, d, j) 三条序列，K/D 以 50 为初值 (整段历史，O(len) 与 n 无关)"""
+    if n < 1 or m1 < 1 or m2 < 1:
+        raise ValueError(f"invalid KDJ parameters: n={n}, m1={m1}, m2={m2}")
+    high_n = rolling_max(high, n)
+    low_n = rolling_min(low, n)
+    span = high_n - low_n
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsv = np.where(span == 0, 50.0, (np.asarray(close, dtype=np.float64) - low_n) / span * 100)
+    k = _ema_filter(rsv, 1.0 / m1, 50.0)
+    d = _ema_filter(k, 1.0 / m2, 50.0)
+    return k, d, 3 * k - 2 * d
+
+
+def _quote_date(quote_time):
+    """从行情时间 (如 20260116150003 / 2026-01-16 15:00:03) 取出日期 YYYY-MM-DD，取不到时用今天"""
+    digits = "".join(ch for ch in str(quote_time)[:10] if ch.isdigit())
+    if len(digits) >= 8:
+        return f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}"
+    return date_cls.today().isoformat()
+
+
+class LiveIndicators:
+    """
+    实时指标状态: 用日K历史建立一次，之后每笔行情只更新当天K线，取值 O(1)
+
+    - 已收盘K线的状态 (EMA/DEA、RSI 涨跌窗口、Wilder 均值、KDJ 的 K/D 与滑动极值、均线累加和) 只在换日时推进
+    - 当天K线由实时行情合成 (开盘取第一笔，最高/最低随行情更新，收盘取最新价，成交量取当日累计)
+    - 历史的最后一根K线作为初始的"当天K线"，收盘后/周末也能直接取值
+    与批量函数 (sma / macd / rsi_simple / rsi_wilder / kdj) 的最后一个值一致
+    """
+
+    def __init__(self, bars, ma_periods=(5, 20, 60), macd=(12, 26, 9), rsi_periods=14, kdj=(9, 3, 3)):
+        self.ma_periods = tuple(ma_periods)
+        self.short, self.long, self.mid = macd
+        self.rsi_periods = rsi_periods
+        self.kdj_n, self.m1, self.m2 = kdj
+        self._lock = threading.Lock()
+
+        # 已收盘K线的状态
+        self.count = 0
+        self._closes = deque(maxlen=max(self.ma_periods))  # 最近收盘价
+        self._ma_sums = {n: 0.0 for n in self.ma_periods}  # 最近 n-1 根收盘价之和
+        self._volumes = deque(maxlen=5)                    # 最近5根成交量 (量比)
+        self._changes = deque(maxlen=rsi_periods - 1)       # 最近 periods-1 个 (涨幅, 跌幅)
+        self._gain_sum = 0.0
+        self._loss_sum = 0.0
+        self._wilder = None              # (平均涨幅, 平均跌幅)，满 periods 个涨跌后才有
+        self._wilder_sums = [0.0, 0.0]   # 不足 periods 个涨跌时的累加
+        self._ema_short = None
+        self._ema_long = None
+        self._dea = None
+        self._macd_bar = None
+        self._k = 50.0
+        self._d = 50.0
+        self._extremes = RollingExtremes(self.kdj_n)
+        self.bar = None  # 当天K线 [date, open, high, low, close, volume]
+
+        rows = list(zip(bars.date.tolist(), bars.open.tolist(), bars.high.tolist(),
+                        bars.low.tolist(), bars.close.tolist(), bars.volume.tolist()))
+        for row in rows[:-1]:
+            self._commit(list(row))
+        if rows:
+            self.bar = list(rows[-1])
+
+    # ---------- 状态推进 ----------
+
+    def _evaluate(self, bar):
+        """在已收盘状态之上加入 bar，返回 (指标值, 推进后的递推状态)"""
+        day, _, high, low, close, volume = bar
+        total = self.count + 1
+        last_close = self._closes[-1] if self._closes else None
+        values = {"date": day, "price": close, "prev_close": last_close, "volume": volume,
+                  "vol_ma5": sum(self._volumes) / 5 if len(self._volumes) == 5 else 0}
+
+        for n in self.ma_periods:
+            values[f"ma{n}"] = (self._ma_sums[n] + close) / n if total >= n else None
+
+        # MACD (EMA 以第一根收盘价为初值)
+        a_short = 2.0 / (self.short + 1)
+        a_long = 2.0 / (self.long + 1)
+        a_mid = 2.0 / (self.mid + 1)
+        ema_short = close if self._ema_short is None else a_short * close + (1 - a_short) * self._ema_short
+        ema_long = close if self._ema_long is None else a_long * close + (1 - a_long) * self._ema_long
+        dif = ema_short - ema_long
+        dea = dif if self._dea is None else a_mid * dif + (1 - a_mid) * self._dea
+        macd_bar = (dif - dea) * 2
+        values["macd"] = None
+        if total >= self.long + self.mid:
+            values["macd"] = {"dif": dif, "dea": dea, "macd": macd_bar, "prev_macd": self._macd_bar}
+
+        # RSI: 简单平均 + Wilder 平滑
+        gain = loss = 0.0
+        wilder = self._wilder
+        values["rsi"] = values["rsi_wilder"] = None
+        if last_close is not None:
+            change = close - last_close
+            gain, loss = (change, 0.0) if change > 0 else (0.0, -change)
+            n = self.rsi_periods
+            if total >= n + 1:
+                values["rsi"] = _rsi_value((self._gain_sum + gain) / n, (self._loss_sum + loss) / n)
+                if wilder is None:
+                    wilder = ((self._wilder_sums[0] + gain) / n, (self._wilder_sums[1] + loss) / n)
+                else:
+                    wilder = ((wilder[0] * (n - 1) + gain) / n, (wilder[1] * (n - 1) + loss) / n)
+                values["rsi_wilder"] = _rsi_value(*wilder)
+
+        # KDJ
+        highest, lowest = self._extremes.peek(high, low)
+        rsv = 50.0 if highest == lowest else (close - lowest) / (highest - lowest) * 100
+        k = (self.m1 - 1) / self.m1 * self._k + rsv / self.m1
+        d = (self.m2 - 1) / self.m2 * self._d + k / self.m2
+        values["kdj"] = {"k": k, "d": d, "j": 3 * k - 2 * d} if total >= self.kdj_n else None
+
+        state = (ema_short, ema_long, dea, macd_bar, gain, loss, wilder, k, d)
+        return values, state
+
+    def _commit(self, bar):
+        """当天K线收盘: 推进所有递推状态"""
+        _, state = self._evaluate(bar)
+        (self._ema_short, self._ema_long, self._dea, self._macd_bar,
+         gain, loss, wilder, self._k, self._d) = state
+        _, _, high, low, close, volume = bar
+
+        if self._closes:
+            if self._wilder is None and wilder is None:
+                self._wilder_sums[0] += gain
+                self._wilder_sums[1] += loss
+            self._wilder = wilder
+            maxlen = self._changes.maxlen
+            if maxlen:
+                if len(self._changes) == maxlen:
+                    old_gain, old_loss = self._changes[0]
+                    self._gain_sum -= old_gain
+                    self._loss_sum -= old_loss
+                self._changes.append((gain, loss))
+                self._gain_sum += gain
+                self._loss_sum += loss
+
+        for n in self.ma_periods:
+            if n > 1:
+                self._ma_sums[n] += close
+                if len(self._closes) >= n - 1:
+                    self._ma_sums[n] -= self._closes[-(n - 1)]
+        self._closes.append(close)
+        self._volumes.append(volume)
+        self._extremes.push(high, low)
+        self.count += 1
+
+    # ---------- 对外接口 ----------
+
+    def update(self, price, volume=0, quote_time=""):
+        """并入一笔实时行情 (O(1))；行情日期晚于当天K线时先收盘旧K线再开新K线"""
+        if price <= 0:
+            return
+        day = _quote_date(quote_time)
+        with self._lock:
+            bar = self.bar
+            if bar is None or day > bar[0]:
+                if bar is not None:
+                    self._commit(bar)
+                self.bar = [day, price, price, price, price, volume]
+            elif day == bar[0]:
+                bar[2] = max(bar[2], price)
+                bar[3] = min(bar[3], price)
+                bar[4] = price
+                if volume:
+                    bar[5] = volume
+
+    def snapshot(self):
+        """当前各指标的值 (含当天K线)，没有任何K线时返回 None"""
+        with self._lock:
+            if self.bar is None:
+                return None
+            return self._evaluate(self.bar)[0]
+
+
+def _rsi_value(avg_gain, avg_loss):
+    if avg_loss == 0:
+        return 100.0
+    return 100 - 100 / (1 + avg_gain / avg_loss)
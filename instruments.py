@@ -0,0 +1,92 @@
+"""
+品种注册表: 每只代码的数据源、接口代码和能力只在自选股变化时计算一次
+
+- provider: "sina" (期货/现货) 或 "tencent" (股票/指数/ETF/外汇/美股)
+- api_code: 行情接口使用的代码 (csi000300 -> sh000300, Au99.99 -> g_Au99.99)
+- kline_code: K线接口 (fqkline) 使用的代码
+- capabilities: "kline" (有日K) / "volume" (有成交量，可算量比) / "analysis" (可做技术分析)
+多个用户代码映射到同一个接口代码时 (别名)，只请求一次，结果分发给所有别名
+"""
+
+# 走新浪接口的代码前缀 (期货 nf_ / 贵金属现货)
+SINA_PREFIXES = ("nf_", "Au", "Ag", "Pt", "gds_")
+# 没有日K数据的品种 (期货/现货/外盘)
+NO_KLINE_PREFIXES = ("hf_", "gds_", "nf_", "Au", "Ag", "Pt")
+
+
+class Instrument:
+    """单个品种的路由信息"""
+    __slots__ = ("code", "provider", "api_code", "kline_code", "capabilities")
+
+    def __init__(self, code, provider, api_code, kline_code, capabilities):
+        self.code = code
+        self.provider = provider
+        self.api_code = api_code
+        self.kline_code = kline_code
+        self.capabilities = capabilities
+
+    def __repr__(self):
+        return f"Instrument({self.code!r}, {self.provider}, api={self.api_code!r})"
+
+
+def _tencent_code(code):
+    """把 csi/sh1b/cns 等别名前缀转换成腾讯的 sh 代码"""
+    if code.startswith("csi"):
+        return "sh" + code[3:]
+    if code.startswith("sh1b"):
+        return "sh00" + code[4:]
+    if code.startswith("cns"):
+        return "sh" + code[3:]
+    return code
+
+
+def resolve(code):
+    """计算一只代码的路由信息 (不依赖注册表，供冷路径和单独调用使用)"""
+    if code.startswith(SINA_PREFIXES):
+        provider = "sina"
+        # 新浪现货需要 g_ 前缀 (Au99.99 -> g_Au99.99)，nf_/gds_ 不需要
+        if code.startswith(("nf_", "gds_")):
+            api_code = code
+        else:
+            api_code = f"g_{code}"
+    else:
+        provider = "tencent"
+        api_code = _tencent_code(code)
+
+    capabilities = set()
+    if not code.startswith(NO_KLINE_PREFIXES):
+        capabilities.update(("kline", "analysis"))
+        if provider == "tencent":
+            capabilities.add("volume")
+    return Instrument(code, provider, api_code, _tencent_code(code), frozenset(capabilities))
+
+
+class InstrumentRegistry:
+    """自选股的路由表 (STOCKS 变化时重建，行情热路径只做字典查询)"""
+
+    def __init__(self, stocks=()):
+        self.instruments = {}  # {code: Instrument}
+        self.reverse = {}      # {api_code: [code, ...]} 同一接口代码的所有别名
+        for s in stocks:
+            code = s["code"]
+            if code in self.instruments:
+                continue
+            inst = resolve(code)
+            self.instruments[code] = inst
+            self.reverse.setdefault(inst.api_code, []).append(code)
+
+    def get(self, code):
+        """查询路由信息；不在自选股里的代码临时计算"""
+        inst = self.instruments.get(code)
+        if inst is None:
+            inst = resolve(code)
+        return inst
+
+    def has(self, code, capability):
+        return capability in self.get(code).capabilities
+
+    def __contains__(self, code):
+        return code in self.instruments
+
+    def __len__(self):
+        return len(self.instruments)
@@ -0,0 +1,175 @@
+"""
+本地日K缓存 (SQLite): 5日均量、右键分析、technical_analysis 共用一份数据
+
+- 以 (代码, 复权类型, 日期) 为主键，重启后仍然有效
+- 首次请求拉取 HISTORY_BARS 根，之后只拉取最后一根已收盘K线之后的数据
+- 增量请求会带上最后一根已收盘K线用于校验：前复权价格发生变化 (除权除息)
+  说明整段历史都被重新复权，清空该代码的缓存后重新全量拉取
+- 收盘后已经同步过的代码当天不再请求网络；盘中最多每 REFRESH_INTERVAL 秒请求一次
+"""
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+import http_client
+import market_sessions
+
+DB_FILE = "kline_cache.db"
+HISTORY_BARS = 120      # 首次拉取的K线数量 (够分析用的 100 根 + 余量)
+REFRESH_INTERVAL = 60   # 盘中重新同步的最小间隔（秒）
+PRICE_TOLERANCE = 1e-3  # 校验K线的收盘价允许误差 (接口返回三位小数)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS bars (
+    code TEXT NOT NULL, adj TEXT NOT NULL, date TEXT NOT NULL,
+    open REAL, close REAL, high REAL, low REAL, volume REAL,
+    PRIMARY KEY (code, adj, date)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sync (
+    code TEXT NOT NULL, adj TEXT NOT NULL,
+    synced_at REAL NOT NULL,   -- 上次同步时间 (time.time)
+    depth INTEGER NOT NULL,    -- 最近一次全量拉取请求的K线数量
+    PRIMARY KEY (code, adj)
+);
+"""
+
+
+def _parse_days(payload, code):
+    """从 fqkline 返回中取出K线: [(date, open, close, high, low, volume), ...]"""
+    data = payload.get("data")
+    if not isinstance(data, dict):
+        return []
+    stock_data = data.get(code, {})
+    if not isinstance(stock_data, dict):
+        return []
+    # 个股是 qfqday，指数只有 day
+    kline = stock_data.get("qfqday", stock_data.get("day", []))
+    rows = []
+    for item in kline:
+        rows.append((item[0], float(item[1]), float(item[2]), float(item[3]),
+                     float(item[4]), float(item[5])))
+    return rows
+
+
+class KlineStore:
+    """日K缓存 (线程安全，网络请求在锁外进行)"""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            # 缓存丢了可以重新拉取: WAL + NORMAL 提交时不必每次等待磁盘刷写
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+        self.fetches = 0  # 网络请求次数 (统计用)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- 读写 ----------
+
+    def _load(self, code, adj, count):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT date, open, close, high, low, volume FROM bars "
+                "WHERE code=? AND adj=? ORDER BY date DESC LIMIT ?", (code, adj, count)).fetchall()
+            sync = self._conn.execute(
+                "SELECT synced_at, depth FROM sync WHERE code=? AND adj=?", (code, adj)).fetchone()
+        rows.reverse()
+        return rows, sync
+
+    def _save(self, code, adj, rows, depth, replace=False):
+        with self._lock:
+            if replace:
+                self._conn.execute("DELETE FROM bars WHERE code=? AND adj=?", (code, adj))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO bars VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(code, adj) + tuple(r) for r in rows])
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync VALUES (?, ?, ?, ?)", (code, adj, time.time(), depth))
+            self._conn.commit()
+
+    def invalidate(self, code, adj="qfq"):
+        with self._lock:
+            self._conn.execute("DELETE FROM bars WHERE code=? AND adj=?", (code, adj))
+            self._conn.execute("DELETE FROM sync WHERE code=? AND adj=?", (code, adj))
+            self._conn.commit()
+
+    # ---------- 网络 ----------
+
+    def _fetch(self, code, adj, start, count, timeout):
+        self.fetches += 1
+        path = f"/appstock/app/fqkline/get?param={code},day,{start},,{count},{adj}"
+        resp = http_client.get(http_client.url("kline", path), timeout=timeout)
+        resp.raise_for_status()
+        return _parse_days(resp.json(), code)
+
+    def _is_fresh(self, code, synced_at):
+        now = time.time()
+        if now - synced_at < REFRESH_INTERVAL:
+            return True
+        # 上次同步之后市场没有开过盘 (如收盘后、周末)，缓存就是最新的
+        market = market_sessions.classify(code)
+        return not market_sessions.traded_since(market, datetime.fromtimestamp(synced_at))
+
+    def get_bars(self, code, count, adj="qfq", timeout=3):
+        """
+        获取最近 count 根日K (code 为K线接口代码，如 sh600000)
+        返回 [(date, open, close, high, low, volume), ...]，按日期升序，可能包含今天未收盘的K线
+        网络失败时返回已缓存的数据；既没有缓存也拉取失败时抛出异常
+        """
+        rows, sync = self._load(code, adj, count)
+        if sync is not None and count <= sync[1] and self._is_fresh(code, sync[0]):
+            return rows
+
+        today = date.today().isoformat()
+        # 最后一根已收盘K线: 增量拉取的起点，也是复权校验的基准
+        anchor = None
+        for row in reversed(rows):
+            if row[0] < today:
+                anchor = row
+                break
+
+        try:
+            if sync is not None and anchor is not None and count <= sync[1]:
+                gap = (date.today() - date.fromisoformat(anchor[0])).days + 1
+                fresh = self._fetch(code, adj, anchor[0], gap, timeout)
+                if fresh and fresh[0][0] == anchor[0] and abs(fresh[0][2] - anchor[2]) <= PRICE_TOLERANCE:
+                    self._save(code, adj, fresh, sync[1])
+                    return self._load(code, adj, count)[0]
+                print(f"K-line history of {code} re-adjusted, refetching")
+
+            depth = max(count, HISTORY_BARS, sync[1] if sync else 0)
+            fresh = self._fetch(code, adj, "", depth, timeout)
+            if fresh:
+                self._save(code, adj, fresh, depth, replace=True)
+                return fresh[-count:]
+            return rows
+        except Exception:
+            if rows:
+                return rows
+            raise
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """获取全局共享的日K缓存 (首次调用时打开数据库)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = KlineStore()
+    return _store
+
+
+def get_bars(code, count, adj="qfq", timeout=3):
+    """从全局缓存获取日K，见 KlineStore.get_bars"""
+    return get_store().get_bars(code, count, adj=adj, timeout=timeout)
@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta, time as dtime
+
+# ================= 交易时段 =================
+# 按品种分类的交易时段 (北京时间，周一至周五开盘)
+# 结束时间早于开始时间表示跨越午夜 (夜盘)，例如周五夜盘持续到周六凌晨
+# 注: 不含法定节假日，节假日按"收盘"处理也只是多几次低频轮询
+
+MARKET_SESSIONS = {
+    # A股 (含 9:15 集合竞价)
+    "a_share": [(dtime(9, 15), dtime(11, 30)), (dtime(13, 0), dtime(15, 0))],
+    # 港股 (含 16:00-16:10 收市竞价)
+    "hk": [(dtime(9, 30), dtime(12, 0)), (dtime(13, 0), dtime(16, 10))],
+    # 美股 (覆盖夏令时 21:30 与冬令时 22:30 开盘)
+    "us": [(dtime(21, 30), dtime(5, 0))],
+    # 上海黄金交易所现货 (日盘 + 夜盘)
+    "sge": [(dtime(9, 0), dtime(15, 30)), (dtime(19, 50), dtime(2, 30))],
+    # 国内期货 (日盘 + 最长夜盘)
+    "futures": [(dtime(9, 0), dtime(11, 30)), (dtime(13, 30), dtime(15, 0)), (dtime(21, 0), dtime(2, 30))],
+    # 国际金价/外盘期货: 几乎 24 小时，每天 05:00-06:00 休市
+    "global": [(dtime(6, 0), dtime(5, 0))],
+}
+
+TRADING_WEEKDAYS = (0, 1, 2, 3, 4)  # 周一至周五
+
+# 收盘后继续按正常频率轮询的时间，用于拿到收盘价/结算价
+POST_CLOSE_GRACE = timedelta(minutes=10)
+# 休市期间的轮询间隔（秒），临近开盘时会自动缩短到开盘时刻
+CLOSED_POLL_INTERVAL = 600
+
+
+def classify(code):
+    """根据代码前缀判断所属市场"""
+    if code.startswith("hf_"):
+        return "global"
+    if code.startswith("nf_"):
+        return "futures"
+    if code.startswith(("gds_", "g_", "Au", "Ag", "Pt")):
+        return "sge"
+    if code.startswith("hk"):
+        return "hk"
+    if code.startswith("us"):
+        return "us"
+    if code.startswith(("sh", "sz", "bj", "csi", "cns")):
+        return "a_share"
+    return None  # 未知品种: 始终视为开盘
+
+
+def _windows(market, now):
+    """枚举 now 前后一周内该市场的所有交易时段 (start, end)"""
+    today = now.date()
+    for offset in range(-1, 8):
+        day = today + timedelta(days=offset)
+        if day.weekday() not in TRADING_WEEKDAYS:
+            continue
+        for start_t, end_t in MARKET_SESSIONS[market]:
+            start = datetime.combine(day, start_t)
+            end = datetime.combine(day, end_t)
+            if end <= start:
+                end += timedelta(days=1)  # 跨午夜
+            yield start, end
+
+
+def is_open(market, now=None, grace=POST_CLOSE_GRACE):
+    """市场当前是否处于交易时段 (含收盘后的宽限期)"""
+    if market not in MARKET_SESSIONS:
+        return True
+    now = now or datetime.now()
+    return any(start <= now < end + grace for start, end in _windows(market, now))
+
+
+def seconds_until_open(market, now=None):
+    """距离下一次开盘的秒数 (当前已开盘返回 0)"""
+    if market not in MARKET_SESSIONS:
+        return 0
+    now = now or datetime.now()
+    if is_open(market, now, grace=timedelta(0)):
+        return 0
+    starts = [start for start, _ in _windows(market, now) if start > now]
+    if not starts:
+        return CLOSED_POLL_INTERVAL
+    return (min(starts) - now).total_seconds()
+
+
+def traded_since(market, since, now=None, grace=POST_CLOSE_GRACE):
+    """since 到 now 之间是否有过交易 (含收盘宽限期)，用于判断缓存的日K是否可能已过时"""
+    if market not in MARKET_SESSIONS:
+        return True
+    now = now or datetime.now()
+    if now - since > timedelta(days=1):
+        return True  # 超出 _windows 的枚举范围，保守处理
+    return any(start < now and end + grace > since for start, end in _windows(market, now))
+
+
+def poll_interval(code, base_rate, now=None):
+    """
+    计算某只代码的轮询间隔（秒）
+    开盘 (含收盘宽限期) 按 base_rate 全速刷新；
+    休市按 CLOSED_POLL_INTERVAL 低频刷新，但不会错过下一次开盘
+    """
+    market = classify(code)
+    now = now or datetime.now()
+    if is_open(market, now):
+        return base_rate
+    return max(base_rate, min(CLOSED_POLL_INTERVAL, seconds_until_open(market, now)))
@@ -0,0 +1,178 @@
+"""
+分时K线: 把实时行情逐笔合成 1 分钟 OHLCV，供盘中指标和分时图使用 (不额外请求网络)
+
+- 每个品种一组定长环形缓冲 (array 模块的连续数组)，最多保留 capacity 根，内存占用固定
+- 分钟取自行情时间 (quote_time)，而不是本地时钟；旧于当前分钟的行情 (乱序/重复) 丢弃
+- 行情里的成交量是当日累计量，分钟成交量 = 本分钟末累计量 - 上一分钟末累计量，换日清零；
+  程序中途启动时，第一笔行情之前的成交量不计入
+- 只在有成交的分钟生成K线，午休/休市不补空K线
+"""
+import threading
+from array import array
+from datetime import datetime
+
+MINUTE_CAPACITY = 960  # 每个品种保留的分钟K线数 (A股 4 个交易日，约 46KB/品种)
+
+
+def minute_key(quote_time, now=None):
+    """行情时间 (20260116150003 / 2026-01-16 15:00:03) -> 分钟键 202601161500 (int)，取不到时用本地时间"""
+    digits = "".join(ch for ch in str(quote_time) if ch.isdigit())
+    if len(digits) >= 12:
+        return int(digits[:12])
+    return int((now or datetime.now()).strftime("%Y%m%d%H%M"))
+
+
+def format_minute(key):
+    """分钟键 -> "2026-01-16 15:00" """
+    s = str(key)
+    return f"{s[:4]}-{s[4:6]}-{s[6:8]} {s[8:10]}:{s[10:12]}"
+
+
+class MinuteBars:
+    """单个品种的分钟K线环形缓冲 (非线程安全，由 MinuteAggregator 加锁)"""
+    __slots__ = ("capacity", "minute", "open", "high", "low", "close", "volume",
+                 "size", "head", "_day", "_day_volume", "_bar_start_volume")
+
+    def __init__(self, capacity=MINUTE_CAPACITY):
+        self.capacity = capacity
+        self.minute = array("q", bytes(8 * capacity))
+        self.open = array("d", bytes(8 * capacity))
+        self.high = array("d", bytes(8 * capacity))
+        self.low = array("d", bytes(8 * capacity))
+        self.close = array("d", bytes(8 * capacity))
+        self.volume = array("d", bytes(8 * capacity))
+        self.size = 0   # 已有K线数 (<= capacity)
+        self.head = 0   # 最新一根K线的位置
+        self._day = 0               # 当前交易日 (YYYYMMDD)
+        self._day_volume = 0.0      # 最近一笔行情的当日累计成交量
+        self._bar_start_volume = 0.0  # 当前分钟开始时的累计成交量
+
+    def update(self, price, cum_volume, key):
+        """并入一笔行情 (O(1))；返回 False 表示行情旧于当前分钟而被丢弃"""
+        if price <= 0:
+            return False
+        day = key // 10000
+        if day != self._day:
+            self._day = day
+            # 中途开始记录时，第一笔之前的当日成交量不计入任何分钟
+            self._day_volume = self._bar_start_volume = 0.0 if self.size else cum_volume
+        # 累计量只增不减，偶发回退 (换数据源/脏数据) 时沿用上一笔
+        if cum_volume > self._day_volume:
+            self._day_volume = cum_volume
+
+        i = self.head
+        if self.size and key == self.minute[i]:
+            if price > self.high[i]:
+                self.high[i] = price
+            if price < self.low[i]:
+                self.low[i] = price
+            self.close[i] = price
+            self.volume[i] = self._day_volume - self._bar_start_volume
+            return True
+        if self.size and key < self.minute[i]:
+            return False
+
+        # 新的一分钟: 上一分钟的累计量作为本分钟的起点
+        if self.size and self.minute[i] // 10000 == day:
+            self._bar_start_volume = self._bar_start_volume + self.volume[i]
+        i = (i + 1) % self.capacity if self.size else 0
+        self.head = i
+        self.size = min(self.size + 1, self.capacity)
+        self.minute[i] = key
+        self.open[i] = self.high[i] = self.low[i] = self.close[i] = price
+        self.volume[i] = self._day_volume - self._bar_start_volume
+        return True
+
+    def _order(self, count):
+        """最近 count 根K线在缓冲中的位置，按时间升序"""
+        count = self.size if count is None else min(count, self.size)
+        start = self.head - count + 1
+        return [(start + k) % self.capacity for k in range(count)]
+
+    def rows(self, count=None, since=None):
+        """[(分钟键, open, high, low, close, volume), ...]，按时间升序；since 为起始分钟键 (含)"""
+        rows = [(self.minute[i], self.open[i], self.high[i], self.low[i], self.close[i], self.volume[i])
+                for i in self._order(count)]
+        if since is not None:
+            rows = [r for r in rows if r[0] >= since]
+        return rows
+
+
+class MinuteAggregator:
+    """所有品种的分钟K线 (线程安全: 行情线程写入，界面/分析线程查询)"""
+
+    def __init__(self, capacity=MINUTE_CAPACITY):
+        self.capacity = capacity
+        self._series = {}  # {code: MinuteBars}
+        self._lock = threading.Lock()
+
+    def update(self, code, price, cum_volume=0, quote_time=""):
+        """并入一笔行情 (price, 当日累计成交量, 行情时间)"""
+        key = minute_key(quote_time)
+        with self._lock:
+            series = self._series.get(code)
+            if series is None:
+                series = self._series[code] = MinuteBars(self.capacity)
+            return series.update(price, cum_volume or 0, key)
+
+    def update_quotes(self, quotes):
+        """批量并入 {code: (price, percent, volume, quote_time)} (行情引擎的一轮结果)"""
+        with self._lock:
+            for code, (price, _, volume, quote_time) in quotes.items():
+                series = self._series.get(code)
+                if series is None:
+                    series = self._series[code] = MinuteBars(self.capacity)
+                series.update(price, volume or 0, minute_key(quote_time))
+
+    def retain(self, codes):
+        """只保留 codes 中的品种 (自选股变化时调用)"""
+        with self._lock:
+            for code in list(self._series):
+                if code not in codes:
+                    del self._series[code]
+
+    def codes(self):
+        with self._lock:
+            return list(self._series)
+
+    # ---------- 查询 ----------
+
+    def rows(self, code, count=None, since=None):
+        """
+        最近 count 根分钟K线 [("2026-01-16 09:31", open, high, low, close, volume), ...]，按时间升序
+        since 可为分钟键或 "YYYY-MM-DD HH:MM"，只返回该分钟 (含) 之后的K线；没有数据时返回 []
+        """
+        if isinstance(since, str):
+            since = minute_key(since)
+        with self._lock:
+            series = self._series.get(code)
+            rows = series.rows(count, since) if series is not None else []
+        return [(format_minute(r[0]),) + r[1:] for r in rows]
+
+    def last(self, code):
+        """最新一根 (可能未走完的) 分钟K线，没有时返回 None"""
+        rows = self.rows(code, 1)
+        return rows[0] if rows else None
+
+    def today(self, code, day=None):
+        """当天 (或 day="YYYY-MM-DD") 的全部分钟K线，分时图用"""
+        with self._lock:
+            series = self._series.get(code)
+            if series is None or not series.size:
+                return []
+            day = int(day.replace("-", "")) if day else series.minute[series.head] // 10000
+            rows = series.rows(since=day * 10000)
+        return [(format_minute(r[0]),) + r[1:] for r in rows if r[0] // 10000 == day]
+
+    def to_bars(self, code, count=None, since=None):
+        """
+        分钟K线的列存储 (indicators.Bars，date 为 "YYYY-MM-DD HH:MM")，
+        可直接传给 indicators.sma / macd / rsi_simple / kdj 计算盘中指标
+        """
+        import numpy as np  # 按需加载，主程序启动时不导入 NumPy
+
+        import indicators
+        rows = self.rows(code, count, since)
+        columns = list(zip(*rows)) if rows else [()] * 6
+        return indicators.Bars(np.array(columns[0], dtype="U16"),
+                               *(np.array(c, dtype=np.float64) for c in columns[1:]))
@@ -0,0 +1,67 @@
+import random
+import threading
+import time
+
+# ================= 数据源健康状态 =================
+# 每个数据源 (新浪/腾讯) 一个熔断器:
+# - CLOSED: 正常请求
+# - OPEN: 连续失败达到阈值后熔断，退避期内不再请求 (界面沿用旧行情并标记过期)
+# - HALF_OPEN: 退避期结束后只放行一个探测请求，成功则恢复，失败则退避时间翻倍
+# 退避时间带随机抖动，网络恢复时各数据源不会同时涌入请求
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class ProviderHealth:
+    """单个数据源的熔断器 + 指数退避"""
+
+    def __init__(self, name, failure_threshold=3, base_backoff=2.0, max_backoff=60.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.state = CLOSED
+        self.failures = 0        # 连续失败次数
+        self.backoff = 0.0       # 当前退避时长（秒）
+        self.retry_at = 0.0      # OPEN 状态下允许探测的时间 (time.monotonic)
+        self.last_error = None
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """本轮是否可以请求该数据源 (OPEN 退避到期时转为 HALF_OPEN 放行一次探测)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and time.monotonic() >= self.retry_at:
+                self.state = HALF_OPEN
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"[{self.name}] recovered after {self.failures} failures")
+            self.state = CLOSED
+            self.failures = 0
+            self.backoff = 0.0
+            self.last_error = None
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = error
+            if self.state == HALF_OPEN:
+                # 探测失败: 退避时间翻倍
+                self._trip(min(self.max_backoff, max(self.base_backoff, self.backoff * 2)))
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._trip(self.base_backoff)
+
+    def _trip(self, backoff):
+        self.backoff = backoff
+        jitter = random.uniform(0.8, 1.2)
+        self.retry_at = time.monotonic() + backoff * jitter
+        if self.state == CLOSED:
+            print(f"[{self.name}] circuit open after {self.failures} failures: {self.last_error}")
+        self.state = OPEN
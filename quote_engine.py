@@ -0,0 +1,112 @@
+import asyncio
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ================= 行情引擎 =================
+# 后台线程里跑一个 asyncio 事件循环，按固定频率调度各个抓取任务:
+# - 按 "起点 + n * 周期" 计算下一次触发时间，抓取耗时不会累积成漂移
+# - 上一轮还没返回时直接跳过本轮，不会越积越多
+# - 结果通过 UiBridge 交给 Tk 主线程
+
+
+class UiBridge:
+    """后台线程 -> Tk 主线程的线程安全通道"""
+
+    def __init__(self):
+        self._queue = queue.Queue()
+
+    def publish(self, item):
+        """后台线程调用：投递一条结果"""
+        self._queue.put(item)
+
+    def drain(self):
+        """主线程调用：取出当前积压的全部结果 (按投递顺序)"""
+        items = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+
+class QuoteEngine:
+    """固定频率的异步抓取调度器"""
+
+    def __init__(self, max_workers=4):
+        self._jobs = []  # [(name, fetch, period, on_result)]
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="engine")
+        self._loop = None
+        self._stop_event = None
+        self._thread = None
+        self.stats = {}  # {name: {"ticks": n, "skipped": n, "errors": n}}
+
+    def add_job(self, name, fetch, period, on_result):
+        """
+        注册周期任务 (需在 start 之前调用)
+        fetch: 阻塞函数，在线程池里执行，返回值交给 on_result
+        on_result: 在引擎线程中调用，通常是 UiBridge.publish
+        """
+        self._jobs.append((name, fetch, period, on_result))
+        self.stats[name] = {"ticks": 0, "skipped": 0, "errors": 0}
+
+    def start(self):
+        """在后台守护线程中启动事件循环"""
+        self._thread = threading.Thread(target=lambda: asyncio.run(self._main()),
+                                        name="quote-engine", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """通知事件循环退出 (可在任意线程调用)"""
+        if self._loop and self._stop_event:
+            try:
+                self._loop.call_soon_threadsafe(self._stop_event.set)
+            except RuntimeError:
+                pass  # 事件循环已关闭
+
+    async def _main(self):
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        tasks = [asyncio.ensure_future(self._schedule(*job)) for job in self._jobs]
+        await self._stop_event.wait()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._executor.shutdown(wait=False)
+
+    async def _schedule(self, name, fetch, period, on_result):
+        """单个任务的固定频率调度 (带漂移补偿)"""
+        stats = self.stats[name]
+        start = self._loop.time()
+        tick = 0
+        in_flight = None
+        while not self._stop_event.is_set():
+            if in_flight is None or in_flight.done():
+                in_flight = asyncio.ensure_future(self._run_once(name, fetch, on_result))
+            else:
+                stats["skipped"] += 1  # 上一轮还在进行，跳过本轮
+
+            # 下一次触发时间始终对齐到 start + n * period
+            tick += 1
+            now = self._loop.time()
+            if start + tick * period <= now:
+                # 已经落后 (比如系统休眠)，直接跳到下一个未来的时间点
+                missed = int((now - start) // period) + 1 - tick
+                stats["skipped"] += missed
+                tick += missed
+            delay = start + tick * period - now
+            try:
+                await asyncio.wait_for(self._stop_event.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_once(self, name, fetch, on_result):
+        stats = self.stats[name]
+        try:
+            result = await self._loop.run_in_executor(self._executor, fetch)
+            stats["ticks"] += 1
+            on_result(result)
+        except Exception as e:
+            stats["errors"] += 1
+            print(f"Engine job {name} error: {e}")
@@ -0,0 +1,161 @@
+"""
+行情数据解析 (腾讯 ~ / 新浪 , 格式)
+
+直接在原始字节上定位每条记录，只切出需要的前几个字段:
+- 不对整包做 GBK 解码，数字字段直接 float(bytes)
+- 字段切分带 maxsplit，后面几十个用不到的字段不再拆分
+- 名称字段只在调用方需要时才按 GBK 解码；名称中的汉字可能以 0x7E ("~") 作为第二字节 (葉/紐/詞...)，
+  腾讯格式切分后校验名称是完整的 GBK 串，切在汉字中间时改为按双字节扫描定位名称结尾
+
+解析结果统一为 {code: (price, percent, volume, quote_time)}
+"""
+import codecs
+
+# 腾讯股票格式需要用到的最大字段下标 (32: 涨跌幅)
+_TENCENT_MAX_FIELD = 32
+# 新浪格式需要用到的最大字段下标 (8: 期货最新价)
+_SINA_MAX_FIELD = 8
+_gbk_decode = codecs.getdecoder("gbk") # 比 bytes.decode("gbk") 少一次编解码器查找
+
+
+def _gbk_field_end(body, start):
+    """从 start 开始找 GBK 字节串中的下一个 "~" 分隔符 (跳过双字节汉字的第二字节)，找不到时返回 -1"""
+    n = len(body)
+    i = start
+    while i < n:
+        b = body[i]
+        if b == 0x7E:
+            return i
+        i += 2 if b >= 0x81 else 1 # 0x81-0xFE 为双字节首字节
+    return -1
+
+
+def _split_tencent(body):
+    """
+    腾讯 ~ 格式切分: 先直接按 b"~" 切分；名称字段不是完整的 GBK 串时 (结尾是被切断的双字节首字节)，
+    说明切在了汉字中间，改为按 GBK 扫描定位名称结尾后重新切分
+    """
+    data = body.split(b"~", _TENCENT_MAX_FIELD + 1)
+    if len(data) < 2:
+        return data
+    try:
+        _gbk_decode(data[1])
+        return data
+    except UnicodeDecodeError:
+        pass
+    first = len(data[0])
+    name_end = _gbk_field_end(body, first + 1)
+    if name_end < 0:
+        return [body[:first], body[first + 1:]]
+    return [body[:first], body[first + 1:name_end]] + body[name_end + 1:].split(b"~", _TENCENT_MAX_FIELD - 1)
+
+
+def _records(raw):
+    """遍历 key="value"; 形式的记录，返回 (key, value) 字节串"""
+    find = raw.find
+    pos = 0
+    while True:
+        eq = find(b'="', pos)
+        if eq < 0:
+            return
+        end = find(b'"', eq + 2)
+        if end < 0:
+            end = len(raw)
+        yield raw[pos:eq].strip(), raw[eq + 2:end]
+        pos = find(b';', end)
+        if pos < 0:
+            return
+        pos += 1
+
+
+def parse_tencent(raw, code_map=None, names=None):
+    """
+    解析腾讯 qt.gtimg.cn 返回的原始字节
+    code_map: {api_code: 用户代码}，用于把接口代码还原回自选股里的代码
+    names: 传入字典时顺带解析名称 {code: name}
+    """
+    results = {}
+    code_map = code_map or {}
+    for key_part, body in _records(raw):
+        # 变量名为 v_代码，如 v_sh000681 / v_hf_XAU
+        key = key_part[2:].decode("ascii", errors="ignore")
+        original_code = code_map.get(key, key)
+        try:
+            # 1. 普通股票格式 (~)
+            data = _split_tencent(body)
+            if len(data) > 30:
+                current_price = float(data[3])
+                percent = float(data[32])
+                volume = float(data[6]) # 成交量(手)
+                quote_time = data[30].decode("ascii", errors="ignore") # yyyymmddHHMMSS
+                results[original_code] = (current_price, percent, volume, quote_time)
+                if names is not None:
+                    names[original_code] = data[1].decode("gbk", errors="ignore")
+                continue
+
+            # 2. 期货/外汇格式 (,)
+            data = body.split(b",", 7)
+            if len(data) > 5:
+                current_price = float(data[0])
+                percent = 0.0
+                if key.startswith("hf_"):
+                    # hf_ 开头的代码，第二个字段就是涨跌幅百分比
+                    percent = float(data[1])
+                elif current_price != 0:
+                    # 其他逗号格式: 第二个字段按涨跌额处理
+                    change_amount = float(data[1])
+                    last_close = current_price - change_amount
+                    if last_close != 0:
+                        percent = (change_amount / last_close) * 100
+                quote_time = data[6].decode("ascii", errors="ignore") if len(data) > 6 else ""
+                results[original_code] = (current_price, percent, 0, quote_time) # 暂不支持量
+        except (ValueError, IndexError):
+            continue
+    return results
+
+
+def parse_sina(raw, names=None):
+    """
+    解析新浪 hq.sinajs.cn 返回的原始字节
+    g_ 开头的现货同时以 Au99.99 (用户代码) 和 g_Au99.99 (接口代码) 两个键返回
+    """
+    results = {}
+    for key_part, body in _records(raw):
+        idx = key_part.find(b"_str_")
+        if idx < 0:
+            continue
+        api_key = key_part[idx + 5:].decode("ascii", errors="ignore") # nf_AU0 / g_Au99.99 / gds_AU9999
+        # 如果是 g_Au99.99，用户存的是 Au99.99
+        user_code = api_key
+        if api_key.startswith("g_") and not api_key.startswith("gds_"):
+            user_code = api_key[2:]
+        try:
+            data = body.split(b",", _SINA_MAX_FIELD + 1)
+            current_price = 0.0
+            percent = 0.0
+            quote_time = ""
+            last_close = 0.0
+            if api_key.startswith("nf_"): # 期货: 名称,时间,开,高,低,昨收,买,卖,最新价
+                if len(data) > 8:
+                    quote_time = data[1].decode("ascii", errors="ignore")
+                    current_price = float(data[8])
+                    last_close = float(data[5])
+                    if names is not None:
+                        names[user_code] = data[0].decode("gbk", errors="ignore")
+            elif api_key.startswith("gds_"): # 贵金属现货: 现价,?,开,高,昨收,...
+                if len(data) > 4:
+                    current_price = float(data[0])
+                    last_close = float(data[4])
+            else: # 其他现货 (Au99.99 / g_)，假设 data[4] 是昨收
+                current_price = float(data[0])
+                if len(data) > 4:
+                    last_close = float(data[4])
+            if last_close > 0:
+                percent = ((current_price - last_close) / last_close) * 100
+        except (ValueError, IndexError):
+            continue
+        results[user_code] = (current_price, percent, 0, quote_time)
+        # 同时保存 api_key 以防万一 (但 results key 必须匹配 STOCKS 中的 code)
+        if user_code != api_key:
+            results[api_key] = (current_price, percent, 0, quote_time)
+    return results
@@ -0,0 +1,41 @@
+"""
+行情快照: 保存最后一次的行情和5日均量，下次启动时立即画出来 (灰色标记为过期)，不必等第一轮网络请求
+
+- 退出时和运行期间每 SNAPSHOT_INTERVAL 秒保存一次 (原子替换，见 state_store.write_atomic)
+- 5日均量只在同一天有效；行情不论哪天都先显示，拿到实时行情后替换
+"""
+import json
+import os
+import time
+from datetime import datetime
+
+import state_store
+
+SNAPSHOT_FILE = "quote_snapshot.json"
+SNAPSHOT_INTERVAL = 30  # 运行期间的保存间隔 (秒)
+
+
+def save(quotes, ma5_volumes, path=SNAPSHOT_FILE):
+    """quotes: {code: (price, percent, volume, quote_time)}，ma5_volumes: {code: 5日均量}"""
+    data = {
+        "date": datetime.now().strftime("%Y-%m-%d"),
+        "saved_at": time.time(),
+        "quotes": {code: list(quote) for code, quote in quotes.items()},
+        "ma5": dict(ma5_volumes),
+    }
+    state_store.write_atomic(path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+
+def load(path=SNAPSHOT_FILE):
+    """返回 (quotes, ma5_volumes)；没有快照或读取失败时返回两个空 dict"""
+    if not os.path.exists(path):
+        return {}, {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        quotes = {code: tuple(quote) for code, quote in data.get("quotes", {}).items()}
+        ma5 = data.get("ma5", {}) if data.get("date") == datetime.now().strftime("%Y-%m-%d") else {}
+        return quotes, ma5
+    except Exception as e:
+        print(f"Error loading quote snapshot: {e}")
+        return {}, {}
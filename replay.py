@@ -0,0 +1,160 @@
+"""
+行情回放: 把录制的行情 (tick_recorder) 或合成行情按 N 倍速送进界面刷新流程，统计界面每秒能画多少帧
+
+- 行情源是 (时间戳, {code: (price, percent, volume, quote_time)}) 的批次序列，与一次抓取的结果同格式
+- speed > 0 时按录制时间间隔 / speed 投递；speed = 0 为最快速度: 每投递一批就等界面画完再投递下一批
+- 界面积压多批时会合并成一帧 (与实时行情相同)，报告里的"合并"即没来得及单独画出的批次
+
+主程序入口: python stock_monitor.py --replay 20260116 --speed 10
+            python stock_monitor.py --replay synthetic --symbols 100 --speed max
+"""
+import random
+import threading
+import time
+from datetime import datetime
+
+import tick_recorder
+
+# 最快速度下等待界面画完一帧的超时 (秒)，超时后照常投递下一批
+FRAME_TIMEOUT = 5.0
+
+
+def recorded_batches(day, directory=tick_recorder.TICK_DIR, codes=None):
+    """
+    读取某天的行情记录，返回 (代码列表, 批次迭代器)；没有记录时返回 None
+    codes 不为空时只回放其中的代码
+    """
+    log = tick_recorder.load_day(day, directory)
+    if log is None:
+        return None
+    wanted = set(codes) if codes else None
+    recorded = [c for c in log.codes if wanted is None or c in wanted]
+
+    def batches():
+        with log:
+            for ts, quotes in log.batches():
+                if wanted is not None:
+                    quotes = {c: q for c, q in quotes.items() if c in wanted}
+                    if not quotes:
+                        continue
+                yield ts, quotes
+    return recorded, batches()
+
+
+def synthetic_batches(codes, seconds=4 * 3600, seed=1, start=None, change_rate=0.5):
+    """
+    合成行情: 每秒一批，每只代码以 change_rate 的概率随机游走一步，偶尔出现跳涨/跳跌
+    (触发跨零、整数涨跌幅等抖动提醒)；start 为起始时间戳，默认今天 9:30
+    """
+    rng = random.Random(seed)
+    if start is None:
+        start = datetime.now().replace(hour=9, minute=30, second=0, microsecond=0).timestamp()
+    prev_close = {c: rng.uniform(5, 50) for c in codes}
+    price = dict(prev_close)
+    volume = {c: 0 for c in codes}
+    for sec in range(seconds):
+        ts = start + sec
+        quote_time = datetime.fromtimestamp(ts).strftime("%Y%m%d%H%M%S")
+        quotes = {}
+        for code in codes:
+            if rng.random() >= change_rate:
+                continue
+            step = rng.gauss(0, 0.0006)
+            if rng.random() < 0.001:
+                step += rng.choice((-0.02, 0.02))
+            limit = prev_close[code]
+            price[code] = round(min(limit * 1.1, max(limit * 0.9, price[code] * (1 + step))), 2)
+            volume[code] += rng.randint(1, 500)
+            percent = round((price[code] / limit - 1) * 100, 2)
+            quotes[code] = (price[code], percent, volume[code], quote_time)
+        yield ts, quotes
+
+
+class Replayer:
+    """
+    回放线程: 按 speed 把批次交给 publish(时间戳, quotes)
+    界面每画完一次调用 frame_done()，用于统计帧率和最快速度下的节拍
+    """
+
+    def __init__(self, batches, publish, speed=1.0):
+        self.batches = batches
+        self.publish = publish
+        self.speed = speed
+        self.published = 0    # 已投递的批次
+        self.frames = 0       # 界面刷新次数
+        self.shakes = 0       # 触发抖动提醒的帧数
+        self.first_ts = None  # 回放覆盖的行情时间范围
+        self.last_ts = None
+        self.started_at = None
+        self.finished_at = None
+        self._frame_event = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def finished(self):
+        return self.finished_at is not None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._frame_event.set()
+
+    def frame_done(self, shook=False):
+        """主线程调用: 界面处理完一次推送"""
+        self.frames += 1
+        if shook:
+            self.shakes += 1
+        self._frame_event.set()
+
+    def _run(self):
+        try:
+            for ts, quotes in self.batches:
+                if self._stop.is_set():
+                    break
+                if self.first_ts is None:
+                    self.first_ts = ts
+                if self.speed > 0:
+                    delay = self.started_at + (ts - self.first_ts) / self.speed - time.perf_counter()
+                    if delay > 0 and self._stop.wait(delay):
+                        break
+                elif self.published:
+                    # 最快速度: 等上一批画完
+                    self._frame_event.wait(FRAME_TIMEOUT)
+                self._frame_event.clear()
+                self.publish(ts, quotes)
+                self.published += 1
+                self.last_ts = ts
+        except Exception as e:
+            print(f"Replay error: {e}")
+        finally:
+            self.finished_at = time.perf_counter()
+
+    def report(self):
+        """回放统计: 耗时、投递批次/界面帧数及每秒数量、合并的批次、实际达到的倍速"""
+        end = self.finished_at or time.perf_counter()
+        elapsed = max(end - (self.started_at or end), 1e-9)
+        covered = (self.last_ts - self.first_ts) if self.published > 1 else 0.0
+        return {
+            "elapsed": elapsed,
+            "batches": self.published,
+            "frames": self.frames,
+            "batches_per_sec": self.published / elapsed,
+            "fps": self.frames / elapsed,
+            "coalesced": max(self.published - self.frames, 0),
+            "shakes": self.shakes,
+            "market_seconds": covered,
+            "effective_speed": covered / elapsed,
+        }
+
+    def format_report(self):
+        r = self.report()
+        target = f"{self.speed:g}x" if self.speed > 0 else "max"
+        return (f"replay {target}: {r['batches']} batches in {r['elapsed']:.1f}s "
+                f"({r['batches_per_sec']:.1f}/s), {r['frames']} frames ({r['fps']:.1f} fps), "
+                f"{r['coalesced']} coalesced, {r['shakes']} shake alerts, "
+                f"{r['market_seconds'] / 60:.1f} market minutes at {r['effective_speed']:.1f}x")
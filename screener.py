@@ -0,0 +1,140 @@
+"""
+批量选股: 对整个自选股 (或任意代码列表) 一次性打分，结果按评分排序
+
+日K读取 (本地缓存，必要时增量请求) 和打分在线程池中并发执行，打分规则与右键分析相同
+(technical_analysis.score_snapshot)
+
+命令行:
+    python screener.py                                # 扫描 stock_config.json 中的自选股
+    python screener.py sh600000 sz000001 sh000300     # 指定代码
+    python screener.py --file codes.txt --sort pct --top 30
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import instruments
+import state_store
+import technical_analysis
+
+CONFIG_FILE = "stock_config.json"
+SCREEN_WORKERS = 16  # 并发数 (主要是日K请求，计算量很小)
+
+# 结果表格的列: (字段, 标题)
+COLUMNS = (
+    ("code", "代码"),
+    ("name", "名称"),
+    ("price", "现价"),
+    ("pct", "涨幅%"),
+    ("score", "评分"),
+    ("conclusion", "结论"),
+    ("factors", "得分因子"),
+)
+
+
+def screen(stocks, analyze=technical_analysis.analyze_code, workers=SCREEN_WORKERS):
+    """
+    并发为 stocks ([{"code":..., "name":...}]) 打分
+    analyze(code, name) 返回 score_snapshot 的结果；不支持技术分析或失败的代码跳过
+    返回按评分从高到低排序的结果列表
+    """
+    stocks = [s for s in stocks if "analysis" in instruments.resolve(s["code"]).capabilities]
+    results = []
+    if not stocks:
+        return results
+    with ThreadPoolExecutor(max_workers=min(workers, len(stocks)), thread_name_prefix="screen") as pool:
+        futures = {pool.submit(analyze, s["code"], s["name"]): s for s in stocks}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Screen error for {futures[future]['code']}: {e}")
+                continue
+            if result:
+                results.append(result)
+    results.sort(key=lambda r: r["score"], reverse=True)
+    return results
+
+
+def format_factors(factors):
+    """得分因子列表 -> "多头排列+1 MACD金叉+0.5 ..." """
+    return " ".join(f"{desc}{value:+g}" for desc, value in factors)
+
+
+def format_cell(result, field):
+    value = result[field]
+    if field == "price":
+        return f"{value:.2f}"
+    if field == "pct":
+        return f"{value:+.2f}"
+    if field == "score":
+        return f"{value:+.1f}"
+    if field == "factors":
+        return format_factors(value)
+    return str(value)
+
+
+def load_watchlist(path=CONFIG_FILE):
+    """读取主程序配置中的自选股 (含主程序尚未写入检查点的修改)"""
+    state = state_store.load_state(path)
+    return state if isinstance(state, list) else state.get("stocks", [])
+
+
+def read_codes(path):
+    """代码列表文件: 每行一个代码，可在代码后跟名称 (空格或逗号分隔)，# 开头为注释"""
+    stocks = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = line.replace(",", " ").split(None, 1)
+            stocks.append({"code": parts[0], "name": parts[1].strip() if len(parts) > 1 else parts[0]})
+    return stocks
+
+
+def print_table(results):
+    for field, title in COLUMNS:
+        print(f"{title}", end="\t")
+    print()
+    for r in results:
+        print("\t".join(format_cell(r, field) for field, _ in COLUMNS))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="自选股批量技术面打分")
+    parser.add_argument("codes", nargs="*", help="代码 (不填则扫描配置文件中的自选股)")
+    parser.add_argument("--file", help="代码列表文件 (每行一个代码)")
+    parser.add_argument("--config", default=CONFIG_FILE, help="主程序配置文件")
+    parser.add_argument("--sort", default="score", choices=[f for f, _ in COLUMNS if f != "factors"],
+                        help="排序字段 (默认评分)")
+    parser.add_argument("--asc", action="store_true", help="升序")
+    parser.add_argument("--top", type=int, default=0, help="只显示前 N 条")
+    parser.add_argument("--workers", type=int, default=SCREEN_WORKERS, help="并发数")
+    args = parser.parse_args(argv)
+
+    if args.codes:
+        stocks = [{"code": c, "name": c} for c in args.codes]
+    elif args.file:
+        stocks = read_codes(args.file)
+    elif os.path.exists(args.config):
+        stocks = load_watchlist(args.config)
+    else:
+        parser.error(f"no codes given and {args.config} not found")
+
+    t0 = time.perf_counter()
+    results = screen(stocks, workers=args.workers)
+    elapsed = time.perf_counter() - t0
+    scored = len(results)
+    results.sort(key=lambda r: r[args.sort], reverse=not args.asc)
+    if args.top:
+        results = results[:args.top]
+    print_table(results)
+    print(f"\n{scored}/{len(stocks)} scored in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,191 @@
+"""
+配置/状态的后台持久化 (write-behind)
+
+- 修改只更新内存并记入待写日志，调用方 (界面主线程、刷新热路径) 不碰磁盘
+- 后台定时器每 FLUSH_INTERVAL 秒把待写日志追加到 <配置文件>.journal (JSON lines，一条一个修改)
+- 每 CHECKPOINT_INTERVAL 秒 (或日志过大、退出时) 把完整状态写成检查点: 先写临时文件并刷盘，
+  再 os.replace 原子替换配置文件，之后清空日志；任何时刻崩溃，配置文件要么是旧的要么是新的
+- 启动时读取检查点再重放日志，恢复到最后一次定时写入时的状态；日志末尾写了一半的行忽略
+- 日志里的修改都是"设为某值"，检查点写完但日志还没清空时重放也不会出错
+
+检查点就是原来的 stock_config.json 格式，旧版本程序和命令行工具可以直接读取
+"""
+import json
+import os
+import threading
+
+FLUSH_INTERVAL = 2.0        # 追加日志的间隔 (秒)
+CHECKPOINT_INTERVAL = 60.0  # 写检查点的间隔 (秒)
+JOURNAL_LIMIT = 64 * 1024   # 日志超过该字节数时提前写检查点
+
+
+def _apply(state, entry):
+    """重放一条日志: ["set", key, value] 或 ["put", key, subkey, value]"""
+    op = entry[0]
+    if op == "set":
+        state[entry[1]] = entry[2]
+    elif op == "put":
+        table = state.get(entry[1])
+        if not isinstance(table, dict):
+            table = state[entry[1]] = {}
+        table[entry[2]] = entry[3]
+
+
+def write_atomic(path, text):
+    """先写临时文件并刷盘，再原子替换 path (崩溃时 path 要么是旧内容要么是新内容)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def load_state(path):
+    """读取检查点并重放日志，返回状态 (不存在时为空 dict；旧版列表格式的配置原样返回)"""
+    state = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            state = json.load(f)
+    journal = path + ".journal"
+    if isinstance(state, dict) and os.path.exists(journal):
+        with open(journal, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break  # 崩溃时写了一半的最后一行
+                _apply(state, entry)
+    return state
+
+
+class StateStore:
+    """
+    带日志的状态存储 (线程安全)
+    set/put/update 只改内存；start() 之后由后台线程定时落盘，close() 时写最终检查点
+    """
+
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.flush_interval = flush_interval
+        self.checkpoint_interval = checkpoint_interval
+        self.state = {}
+        self._pending = []        # 还没写入日志的修改
+        self._dirty = False       # 上次检查点之后是否有修改
+        self._journal_size = 0
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()  # 定时器与 close() 不同时写文件
+        self._stop = threading.Event()
+        self._thread = None
+        self.checkpoints = 0
+        self.read_only = False    # 为 True 时只改内存，不写任何文件 (原文件读取失败又无法改名保留时)
+
+    def load(self):
+        """读取检查点 + 日志，返回状态的副本 (读取失败时抛出异常，状态保持为空)"""
+        state = load_state(self.path)
+        with self._lock:
+            self.state = state if isinstance(state, dict) else {"stocks": state}
+            loaded = dict(self.state)
+        # 上次没有正常退出: 把重放后的状态写成检查点，新的日志不会接在写了一半的行后面
+        if os.path.exists(self.journal_path):
+            self._dirty = True
+            self.checkpoint()
+        return loaded
+
+    def set_aside(self, suffix=".bad"):
+        """读取失败时把检查点和日志改名保留 (如 stock_config.json.bad)，之后的写入不会覆盖它们；返回新文件名列表"""
+        moved = []
+        for path in (self.path, self.journal_path):
+            if os.path.exists(path):
+                os.replace(path, path + suffix)
+                moved.append(path + suffix)
+        return moved
+
+    # ---------- 修改 (只改内存) ----------
+
+    def set(self, key, value):
+        """state[key] = value；值没变时不记日志"""
+        with self._lock:
+            if key in self.state and self.state[key] == value:
+                return
+            value = json.loads(json.dumps(value))  # 拷贝一份，调用方之后修改原对象不影响日志
+            self.state[key] = value
+            self._pending.append(["set", key, value])
+            self._dirty = True
+
+    def put(self, key, subkey, value):
+        """state[key][subkey] = value (如 session_max_map 的单只代码)"""
+        with self._lock:
+            table = self.state.get(key)
+            if not isinstance(table, dict):
+                table = self.state[key] = {}
+            if subkey in table and table[subkey] == value:
+                return
+            table[subkey] = value
+            self._pending.append(["put", key, subkey, value])
+            self._dirty = True
+
+    def update(self, values):
+        for key, value in values.items():
+            self.set(key, value)
+
+    # ---------- 落盘 (后台) ----------
+
+    def start(self):
+        """启动后台定时器"""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="state-store", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        waited = 0.0
+        while not self._stop.wait(self.flush_interval):
+            waited += self.flush_interval
+            try:
+                if waited >= self.checkpoint_interval or self._journal_size >= JOURNAL_LIMIT:
+                    waited = 0.0
+                    self.checkpoint()
+                else:
+                    self.flush()
+            except Exception as e:
+                print(f"Error saving state: {e}")
+
+    def flush(self):
+        """把待写修改追加到日志"""
+        with self._io_lock:
+            with self._lock:
+                pending, self._pending = self._pending, []
+            if not pending or self.read_only:
+                return
+            data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in pending)
+            with open(self.journal_path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+            self._journal_size += len(data.encode("utf-8"))
+
+    def checkpoint(self):
+        """原子地写出完整状态，然后清空日志"""
+        with self._io_lock:
+            with self._lock:
+                if self.read_only or (not self._dirty and not self._journal_size):
+                    return
+                data = json.dumps(self.state, ensure_ascii=False, indent=4)
+                self._pending = []
+                self._dirty = False
+            write_atomic(self.path, data)
+            # 检查点已包含日志里的全部修改
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._journal_size = 0
+            self.checkpoints += 1
+
+    def close(self):
+        """停止定时器并写最终检查点 (退出时调用)"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        try:
+            self.checkpoint()
+        except Exception as e:
+            print(f"Error saving state: {e}")
@@ -1,21 +1,42 @@
-import tkinter as tk
-from tkinter import simpledialog, messagebox, ttk
-from PIL import Image, ImageTk
-import requests
 import time
+_startup_t0 = time.perf_counter() # 启动计时起点 (开始加载本模块)
+import tkinter as tk
+from tkinter import messagebox
 import threading
 import ctypes
+import argparse
 import json
 import os
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, wait
 
 import math
 import random
 
+import http_client
+from quote_engine import QuoteEngine, UiBridge
+import market_sessions
+import quote_parser
+import instruments
+import kline_store
+import minute_bars
+import tick_recorder
+import state_store
+import quote_snapshot
+from provider_health import ProviderHealth, HALF_OPEN
+from analysis_cache import AnalysisCache
+# NumPy (indicators/technical_analysis/screener)、PIL、ttk 只在用到时导入，启动时不加载
+
 VERSION = "0.4.4"
 
+# 启动耗时 {阶段: 距开始加载本模块的秒数}: imports / config / first_paint / first_quote
+startup_marks = {"imports": time.perf_counter() - _startup_t0}
+profile_startup = False # --profile-startup: 拿到第一笔行情后输出启动耗时并退出
+STARTUP_PROFILE_TIMEOUT = 15 # 等待第一笔行情的最长时间 (秒)
+
 # ================= 配置区域 =================
 CONFIG_FILE = "stock_config.json"
+config_store = state_store.StateStore(CONFIG_FILE) # 配置的后台持久化 (修改只改内存，定时写日志/检查点)
 DEFAULT_STOCKS = [
     {"code": "sh000681", "name": "科创价格"}, 
     {"code": "sh000832", "name": "中证转债"}, 
@@ -34,14 +55,66 @@ show_volume = True # 是否显示成交量
 session_max_map = {} # 本次运行期间每只股票出现过的最大涨跌幅绝对值 {code: max_percent}
 current_date_str = datetime.now().strftime("%Y-%m-%d") # 当前运行日期
 MA5_VOLUMES = {} # 5日均量 {code: avg_volume}
+live_indicators = {} # 实时技术指标 {code: (建立日期, indicators.LiveIndicators)}，由日K历史建立、实时行情逐笔更新
+minute_aggregator = minute_bars.MinuteAggregator() # 实时行情合成的分钟K线 (盘中指标/分时图用)
+quote_cache = {} # 最近一次成功获取的行情 {code: (price, percent, volume, quote_time)}
+next_poll_at = {} # 每只代码下一次需要抓取的时间 {code: time.monotonic()}
+last_published = {} # 上次推送给界面的行情 {code: (quote, is_stale)}，用于计算增量
+last_heartbeat_at = 0.0 # 上次心跳 (全量刷新) 的时间
+instrument_registry = instruments.InstrumentRegistry() # 自选股路由表，STOCKS 变化时重建
+# 各数据源的熔断器: 断网时不再每轮阻塞等待超时，恢复后逐步放量
+provider_health = {
+    "sina": ProviderHealth("sina"),
+    "tencent": ProviderHealth("tencent"),
+}
+ui_quotes = {} # 界面当前显示的行情 (由增量合并而来，仅主线程访问)
+ui_stale = set() # 界面当前标记为过期的代码
+replayer = None # 回放模式下的 replay.Replayer (实时行情时为 None)
+shake_enabled = True # 是否播放抖动动画 (回放时可关闭，只统计次数)
 
 # 刷新频率（秒）
 REFRESH_RATE = 1
+# 单次刷新的总时间预算（秒）：各路请求并发，超时的本轮放弃
+TICK_BUDGET = 1.5
+
+# 主线程轮询引擎结果的间隔（毫秒）
+UI_POLL_MS = 50
+ui_poll_ms = UI_POLL_MS # 回放时改为 1ms，帧率只受绘制速度限制
+# 心跳间隔（秒）：即使行情没变化，也定期全量刷新一次界面
+HEARTBEAT_INTERVAL = 5
+
+# 批量请求分片大小: 自选股过多时拆成多个请求，避免 URL 超长、单个响应过大
+TENCENT_CHUNK_SIZE = 60 # 腾讯 q= 每个请求最多代码数
+SINA_CHUNK_SIZE = 40    # 新浪 list= 每个请求最多代码数
+FETCH_WORKERS = 8       # 并发请求数上限
+
+# 行情请求线程池 (新浪/腾讯分片并发)
+_fetch_pool = ThreadPoolExecutor(max_workers=FETCH_WORKERS, thread_name_prefix="quote")
+# 5日均量预取线程池 (各代码并发，自选股变化时只补拉新增代码)
+MA5_WORKERS = 8
+_ma5_pool = ThreadPoolExecutor(max_workers=MA5_WORKERS, thread_name_prefix="ma5")
+_ma5_pending = set() # 已提交但尚未完成的代码
+_ma5_lock = threading.Lock()
+ma5_prefetch_started = False # 启动预取后，自选股变化时自动补拉
+# 技术分析线程池 + 结果缓存 (按代码和最新K线日期记忆，同一代码并发请求只算一次)
+_analysis_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="analysis")
+screener_task = None # 进行中的自选股扫描 (Future)，同一时间只跑一次
+screener_window = None
+analysis_cache = AnalysisCache(lambda code, name: generate_analysis_data(code, name),
+                               version=lambda code: live_bar_date(code))
+# 行情记录 (每天一个二进制日志，启动时压缩以前的日志)
+RECORD_TICKS = True
+tick_log = tick_recorder.TickRecorder() if RECORD_TICKS else None
+# 行情引擎 (asyncio 固定频率调度) 及其与 Tk 主线程之间的通道
+quote_engine = QuoteEngine()
+ui_bridge = UiBridge()
 
 # 字体设置 
 # 使用 Microsoft YaHei UI 在 Windows 上显示更清晰
 # 稍微加大字号以配合高DPI模式
 FONT_CONFIG = ("Microsoft YaHei UI", 10, "bold") 
+# 过期行情 (本轮超时未更新) 的显示颜色
+STALE_COLOR = "#666666"
 # ===========================================
 
 def load_config():
@@ -49,296 +122,217 @@ def load_config():
     global STOCKS, display_mode, session_max_map, show_price, show_volume
     if os.path.exists(CONFIG_FILE):
         try:
-            with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                if isinstance(data, list):
-                    STOCKS = data
-                    # 兼容旧版本，display_mode 保持默认
-                elif isinstance(data, dict):
-                    STOCKS = data.get("stocks", DEFAULT_STOCKS)
-                    display_mode = data.get("display_mode", "bar")
-                    show_price = data.get("show_price", True)
-                    show_volume = data.get("show_volume", True)
-                    
-                    # 检查日期，如果是今天则恢复 session_max_map，否则重置
-                    saved_date = data.get("date", "")
-                    today = datetime.now().strftime("%Y-%m-%d")
-                    if saved_date == today:
-                        session_max_map = data.get("session_max_map", {})
-                    else:
-                        session_max_map = {}
-        except Exception:
+            # 检查点 + 日志: 上次运行中途退出也能恢复到最后一次定时保存的状态
+            # 旧版本的列表格式由 config_store 转成 {"stocks": [...]}，其余设置取默认值
+            data = config_store.load()
+            STOCKS = data.get("stocks", DEFAULT_STOCKS)
+            display_mode = data.get("display_mode", "bar")
+            show_price = data.get("show_price", True)
+            show_volume = data.get("show_volume", True)
+            
+            # 检查日期，如果是今天则恢复 session_max_map，否则重置
+            saved_date = data.get("date", "")
+            if saved_date == current_date_str:
+                session_max_map = dict(data.get("session_max_map", {}))
+            else:
+                session_max_map = {}
+        except Exception as e:
+            print(f"Error loading config: {e}")
             STOCKS = DEFAULT_STOCKS
             session_max_map = {}
             show_price = True
             show_volume = True
+            # 读不出来的配置改名保留 (里面可能是用户的自选股)，不能被默认配置覆盖；改名失败时不写入
+            try:
+                moved = config_store.set_aside()
+                print(f"Unreadable config kept as: {', '.join(moved)}")
+                saved_date = ""
+            except OSError as e:
+                print(f"Error keeping unreadable config: {e}")
+                config_store.read_only = True # 本次运行不写配置，保住原文件
+                saved_date = current_date_str
     else:
+        saved_date = ""
         STOCKS = DEFAULT_STOCKS
         session_max_map = {}
         show_price = True
         show_volume = True
+    if saved_date != current_date_str:
+        # 当天第一次启动: 配置里的日期和最大值一起换成今天的，
+        # 之后盘中逐只记录的最大值在重启/崩溃后才会被认作当天数据
+        save_config()
+
+def on_stocks_changed():
+    """自选股列表变化后调用：重建品种路由表，同步5日均量"""
+    global instrument_registry
+    instrument_registry = instruments.InstrumentRegistry(STOCKS)
+    # 删除的代码清掉5日均量，新增的代码补拉
+    for code in list(MA5_VOLUMES):
+        if code not in instrument_registry:
+            MA5_VOLUMES.pop(code, None)
+    for code in list(live_indicators):
+        if code not in instrument_registry:
+            live_indicators.pop(code, None)
+    # 增量推送和轮询计划也清掉删除的代码: 删除后又加回时第一笔行情照常推送、立即抓取
+    for code in list(last_published):
+        if code not in instrument_registry:
+            last_published.pop(code, None)
+            next_poll_at.pop(code, None)
+    analysis_cache.retain(instrument_registry)
+    minute_aggregator.retain(instrument_registry)
+    if ma5_prefetch_started:
+        prefetch_ma5_volumes()
 
 def save_config():
-    """保存配置文件"""
+    """保存配置 (只更新内存中的状态，由 config_store 在后台原子写入)"""
+    if replayer is not None: return # 回放的行情和自选股不写入配置
     try:
-        data = {
+        config_store.update({
             "stocks": STOCKS,
             "display_mode": display_mode,
             "show_price": show_price,
             "show_volume": show_volume,
             "session_max_map": session_max_map,
             "date": datetime.now().strftime("%Y-%m-%d")
-        }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        })
     except Exception as e:
         print(f"Error saving config: {e}")
 
-def get_ma5_volumes_thread():
-    """后台线程获取5日均量"""
-    global MA5_VOLUMES
-    print("Fetching MA5 volumes...")
-    
-    # 构建代码映射 (复用 get_stock_data_tencent 的逻辑)
-    # 这一步是为了确保 K线接口用的是正确的 sh/sz 代码
-    mapped_codes = {}
-    for item in STOCKS:
-        original = item["code"]
-        api_code = original
-        if original.startswith("csi"):
-            api_code = "sh" + original[3:]
-        elif original.startswith("sh1b"):
-            api_code = "sh00" + original[4:]
-        elif original.startswith("cns"):
-            api_code = "sh" + original[3:]
-        mapped_codes[original] = api_code
-
-    for original_code, api_code in mapped_codes.items():
+def fetch_ma5_volume(original_code):
+    """获取单只代码的5日均量 (在 MA5 线程池中执行)"""
+    try:
+        # K线接口用的 sh/sz 代码由注册表统一换算
+        api_code = instrument_registry.get(original_code).kline_code
+        import indicators, technical_analysis # 按需加载 (NumPy)，不拖慢启动
+        # 取分析用的日K (本地日K缓存，只在缓存过时才请求网络)，顺便建立实时指标状态
+        days = kline_store.get_bars(api_code, technical_analysis.ANALYSIS_BARS, timeout=2)
+        if not days:
+            return
+        if original_code in instrument_registry:
+            seed_live_indicators(original_code, indicators.Bars.from_rows(days))
+            
+        # 排除今天的数据，只取过去的
+        today = datetime.now().strftime("%Y-%m-%d")
+        history_days = [d for d in days if d[0] != today]
+        
+        # 取最后5天
+        last_5 = history_days[-5:]
+        # 拉取期间代码可能已被删除
+        if len(last_5) > 0 and original_code in instrument_registry:
+            # index 5 是成交量
+            avg_vol = sum(d[5] for d in last_5) / len(last_5)
+            MA5_VOLUMES[original_code] = avg_vol
+            print(f"MA5 for {original_code}: {avg_vol}")
+            
+    except Exception as e:
+        print(f"Error fetching MA5 for {original_code}: {e}")
+    finally:
+        with _ma5_lock:
+            _ma5_pending.discard(original_code)
+
+def prefetch_ma5_volumes():
+    """为还没有5日均量的自选股提交后台任务 (启动时及自选股变化时调用，不阻塞)"""
+    global ma5_prefetch_started
+    ma5_prefetch_started = True
+    registry = instrument_registry
+    submitted = 0
+    for code in list(registry.instruments):
         # 过滤不支持K线均量查询的特殊代码 (期货/现货/外汇等)
-        if original_code.startswith(("hf_", "gds_", "nf_", "Au", "Ag", "Pt")):
+        # 快照恢复的均量还没有建立实时指标，仍然要拉取
+        if (code in MA5_VOLUMES and code in live_indicators) or not registry.has(code, "volume"):
             continue
-
-        try:
-            # 获取6天数据，为了排除今天（如果今天已经有数据）
-            url = f"http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={api_code},day,,,6,qfq"
-            resp = requests.get(url, timeout=2)
-            if resp.status_code != 200:
-                continue
-                
-            data = resp.json()
-            # 腾讯接口结构: data['data'][code]['day'] 或 'qfqday'
-            # 注意: 如果 api_code 不存在或返回格式异常 (如 'list' object), 这里会抛出 AttributeError
-            if not isinstance(data.get('data'), dict):
-                continue
-
-            stock_data = data['data'].get(api_code, {})
-            days = []
-            if 'day' in stock_data:
-                days = stock_data['day']
-            elif 'qfqday' in stock_data:
-                days = stock_data['qfqday']
-            
-            if not days:
+        with _ma5_lock:
+            if code in _ma5_pending:
                 continue
-                
-            # 排除今天的数据，只取过去的
-            today = datetime.now().strftime("%Y-%m-%d")
-            history_days = [d for d in days if d[0] != today]
-            
-            # 取最后5天
-            last_5 = history_days[-5:]
-            if len(last_5) > 0:
-                # index 5 是成交量
-                avg_vol = sum(float(d[5]) for d in last_5) / len(last_5)
-                MA5_VOLUMES[original_code] = avg_vol
-                print(f"MA5 for {original_code}: {avg_vol}")
-                
-        except Exception as e:
-            print(f"Error fetching MA5 for {original_code}: {e}")
-
-def get_stock_data_tencent(codes):
+            _ma5_pending.add(code)
+        _ma5_pool.submit(fetch_ma5_volume, code)
+        submitted += 1
+    if submitted:
+        print(f"Fetching MA5 volumes for {submitted} codes...")
+
+def fetch_sina_quotes(api_codes, timeout=2):
+    """新浪接口获取期货/现货行情 (nf_ / gds_ / g_Au99.99 等)，结果以接口代码为键
+    网络错误直接抛出，由调用方记入数据源健康状态
+    """
+    url = http_client.url("sina", f"/list={','.join(api_codes)}")
+    headers = {'Referer': 'http://finance.sina.com.cn'}
+    resp = http_client.get(url, headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    # 格式:
+    # var hq_str_nf_AU0="黄金连续,150000,1089.00,1105.60,..."
+    # var hq_str_g_Au99_99="370.00,370.00,368.50,371.80,..." 
+    # var hq_str_gds_AU9999="1094.00,0,1092.00,1094.00,1102.95,..."
+    return quote_parser.parse_sina(resp.content)
+
+def fetch_tencent_quotes(api_codes, timeout=2):
+    """腾讯接口获取股票/ETF/外汇/美股行情，结果以接口代码为键
+    网络错误直接抛出，由调用方记入数据源健康状态
+    """
+    url = http_client.url("tencent", f"/q={','.join(api_codes)}")
+    resp = http_client.get(url, timeout=timeout)
+    resp.raise_for_status()
+    # 格式:
+    # v_sh000681="1~科创价格~000681~现价~昨收~今开~成交量~..."
+    # v_hf_XAU="现价,涨跌幅,..."
+    return quote_parser.parse_tencent(resp.content)
+
+def get_stock_data_tencent(codes, budget=TICK_BUDGET):
     """
     使用腾讯/新浪接口批量获取股票/期货/外汇数据
     codes: [{"code": "sh000001", "name": "上证指数"}, ...]
+    budget: 本次刷新的总时间预算(秒)，各分片并发请求，超时未返回的分片直接放弃
     """
-    results = {}
-    
-    # 分离出需要用新浪接口查询的代码 (nf_开头 或 Au99.99等现货)
-    sina_codes = []
-    tencent_codes = []
+    registry = instrument_registry
     
+    # 按数据源分组 (路由信息已在注册表中算好)，别名去重后每个接口代码只请求一次
+    sina_api = {}
+    tencent_api = {}
+    wanted = []
     for s in codes:
-        code = s["code"]
-        # 扩展新浪接口支持的代码：期货(nf_) 和 现货(Au/Ag开头) 和 gds_开头
-        if code.startswith("nf_") or code.startswith("Au") or code.startswith("Ag") or code.startswith("Pt") or code.startswith("gds_"):
-            sina_codes.append(code)
+        inst = registry.get(s["code"])
+        wanted.append(inst)
+        if inst.provider == "sina":
+            sina_api[inst.api_code] = True
         else:
-            tencent_codes.append(code)
-            
-    # 1. 获取新浪数据 (期货/现货)
-    if sina_codes:
-        try:
-            # 新浪现货代码通常需要加 g_ 前缀 (如 Au99.99 -> g_Au99.99)
-            # 但 nf_ 开头的期货不需要
-            query_list = []
-            for c in sina_codes:
-                if c.startswith("nf_") or c.startswith("gds_"):
-                    query_list.append(c)
-                else:
-                    # 现货: 假设是 Au99.99 这种，尝试加 g_ (如果用户没加)
-                    if not c.startswith("g_"):
-                        query_list.append(f"g_{c}") # 尝试加 g_
-                    else:
-                        query_list.append(c)
-                        
-            url = f"http://hq.sinajs.cn/list={','.join(query_list)}"
-            headers = {'Referer': 'http://finance.sina.com.cn'}
-            resp = requests.get(url, headers=headers, timeout=2)
-            content = resp.content.decode('gbk', errors='ignore')
-            # 格式:
-            # var hq_str_nf_AU0="黄金连续,150000,1089.00,1105.60,..."
-            # var hq_str_g_Au99_99="370.00,370.00,368.50,371.80,..." 
-            # var hq_str_gds_AU9999="1094.00,0,1092.00,1094.00,1102.95,..."
+            tencent_api[inst.api_code] = True
+    sina_api = list(sina_api)
+    tencent_api = list(tencent_api)
             
-            lines = content.strip().split(';')
-            for line in lines:
-                if '="' not in line: continue
-                try:
-                    key_part = line.split('="')[0] # var hq_str_nf_AU0
-                    # 提取原始 key
-                    if "_str_" in key_part:
-                        api_key = key_part.split('_str_')[1] # nf_AU0 or g_Au99.99 or gds_AU9999
-                        
-                        # 还原回用户输入的 code
-                        # 如果是 g_Au99.99，用户存的是 Au99.99
-                        user_code = api_key
-                        if api_key.startswith("g_") and not api_key.startswith("gds_"):
-                            user_code = api_key[2:]
-                        
-                        data_str = line.split('="')[1].strip('"')
-                        data = data_str.split(',')
-                        
-                        # 解析逻辑
-                        current_price = 0.0
-                        percent = 0.0
-                        
-                        if api_key.startswith("nf_"): # 期货
-                             if len(data) > 8:
-                                current_price = float(data[8])
-                                last_close = float(data[5])
-                                if last_close > 0:
-                                    percent = ((current_price - last_close) / last_close) * 100
-                        elif api_key.startswith("gds_"): # 贵金属现货 (gds_AU9999)
-                            # 格式: Current, ?, Open, High, LastClose?, Low? ...
-                            # 示例: 1094.00,0,1092.00,1094.00,1102.95,1049.01,...
-                            if len(data) > 4:
-                                current_price = float(data[0])
-                                last_close = float(data[4])
-                                if last_close > 0:
-                                    percent = ((current_price - last_close) / last_close) * 100
-                        else: # 其他现货 (Au99.99 / g_)
-                             if len(data) > 0:
-                                 current_price = float(data[0])
-                                 # 尝试计算涨跌幅，假设 data[4] 是昨收 (Common pattern)
-                                 if len(data) > 4:
-                                     last_close = float(data[4])
-                                     if last_close > 0:
-                                         percent = ((current_price - last_close) / last_close) * 100
-                        
-                        results[user_code] = (current_price, percent)
-                        # 同时保存 api_key 以防万一 (但 results key 必须匹配 STOCKS 中的 code)
-                        if user_code != api_key:
-                             results[api_key] = (current_price, percent)
-
-                except Exception:
-                    continue
-        except Exception as e:
-            pass
-
-    # 2. 获取腾讯数据 (股票/ETF/外汇/美股)
-    if tencent_codes:
-        # 构建 code_map 以便在解析时还原原始代码
-        code_map = {}
-        for code in tencent_codes:
-            api_code = code
-            if code.startswith("csi"):
-                api_code = "sh" + code[3:]
-            elif code.startswith("sh1b"):
-                api_code = "sh00" + code[4:]
-            elif code.startswith("cns"):
-                api_code = "sh" + code[3:]
-            code_map[api_code] = code
-
-        # 使用 api_code 进行查询
-        api_query_codes = list(code_map.keys())
-        # 对于不需要转换的普通代码，也要确保在 code_map 里
-        # (上面的循环其实已经覆盖了，因为 default api_code = code)
-        
+    # 新浪(期货/现货) 与 腾讯(股票/ETF/外汇/美股) 按分片同时发出
+    jobs = [] # [(health, future)]
+    for provider, api_list, chunk_size, fetch in (
+            ("sina", sina_api, SINA_CHUNK_SIZE, fetch_sina_quotes),
+            ("tencent", tencent_api, TENCENT_CHUNK_SIZE, fetch_tencent_quotes)):
+        if not api_list: continue
+        health = provider_health[provider]
+        # 熔断中: 本轮不请求该数据源，其代码沿用旧行情并标记为过期
+        if not health.allow_request(): continue
+        chunks = [api_list[i:i + chunk_size] for i in range(0, len(api_list), chunk_size)]
+        # 半开状态只发一个分片做探测，成功后下一轮恢复全量
+        if health.state == HALF_OPEN: chunks = chunks[:1]
+        for chunk in chunks:
+            jobs.append((health, _fetch_pool.submit(fetch, chunk, budget)))
+
+    # 统一截止时间: 慢的分片不再拖累其他分片，
+    # 超时分片里的代码不会出现在结果中，由调用方标记为"过期"
+    by_api = {}
+    done, _ = wait([f for _, f in jobs], timeout=budget)
+    for health, f in jobs:
+        if f not in done:
+            health.record_failure("timeout")
+            continue
         try:
-            url = f"http://qt.gtimg.cn/q={','.join(api_query_codes)}"
-            resp = requests.get(url, timeout=2)
-            
-            # 腾讯接口返回GBK编码，需要正确解码
-            content = resp.content.decode('gbk', errors='ignore')
-            
-            # 解析返回数据
-            lines = content.strip().split(';')
-            for line in lines:
-                line = line.strip()
-                if '="' not in line: continue
-                
-                # 提取代码和数据
-                # line: v_sh000681="1~..."
-                # 注意：对于 hf_XAU，key 可能是 hf_XAU
-                try:
-                    temp = line.split('="')[0]
-                    # 腾讯返回的变量名通常是 v_代码，如 v_sh000681, v_hf_XAU
-                    # 如果代码里包含下划线（如 hf_XAU），split('_') 会有多个部分
-                    # v_hf_XAU -> ['v', 'hf', 'XAU'] -> 取 [1:] 拼接？
-                    # 或者直接取 v_ 之后的部分
-                    key = temp[2:] # 去掉 "v_"
-                    
-                    # 还原回用户输入的 code
-                    original_code = code_map.get(key, key)
-                    
-                    data_str = line.split('="')[1].strip('"')
-                    
-                    # 1. 尝试普通股票格式 (~)
-                    data = data_str.split('~')
-                    if len(data) > 30:
-                        current_price = float(data[3])
-                        percent = float(data[32])
-                        volume = float(data[6]) # 成交量(手)
-                        results[original_code] = (current_price, percent, volume)
-                        continue
-                        
-                    # 2. 尝试期货/外汇格式 (,)
-                    data_comma = data_str.split(',')
-                    if len(data_comma) > 5:
-                        current_price = float(data_comma[0])
-                        # 对于 hf_ 开头的代码，data_comma[1] 是涨跌幅百分比
-                        if key.startswith('hf_'):
-                            percent = float(data_comma[1])
-                        else:
-                            # 其他逗号分隔的数据 (如果有的话)，暂时保持原有逻辑或默认为0
-                            # 或者尝试计算: change_amount = data_comma[1]
-                            change_amount = float(data_comma[1])
-                            if current_price != 0:
-                                last_close = current_price - change_amount
-                                if last_close != 0:
-                                    percent = (change_amount / last_close) * 100
-                                else:
-                                    percent = 0.0
-                            else:
-                                percent = 0.0
-                        
-                        results[original_code] = (current_price, percent, 0) # 暂不支持量
-                except Exception:
-                    continue
+            by_api.update(f.result())
+            health.record_success()
         except Exception as e:
-            # print(f"Error: {e}")
-            pass
-            
+            health.record_failure(e)
+    
+    # 接口代码 -> 用户代码 (别名共享同一份行情)
+    results = {}
+    for inst in wanted:
+        val = by_api.get(inst.api_code)
+        if val is not None:
+            results[inst.code] = val
     return results
 
 def search_stocks_sina(keyword):
@@ -346,10 +340,10 @@ def search_stocks_sina(keyword):
     使用新浪接口搜索股票
     返回列表: [(code, name), ...]
     """
-    url = f"http://suggest3.sinajs.cn/suggest/type=&key={keyword}"
+    url = http_client.url("suggest", f"/suggest/type=&key={keyword}")
     try:
         headers = {'Referer': 'http://finance.sina.com.cn'}
-        resp = requests.get(url, headers=headers, timeout=2)
+        resp = http_client.get(url, headers=headers, timeout=2)
         content = resp.text
         # var suggestvalue="黄金,87,au0,au0,黄金,,黄金,99,1,,,;..."
         if '="' not in content:
@@ -378,26 +372,137 @@ def search_stocks_sina(keyword):
         print(f"Search error: {e}")
         return []
 
-def update_ui_loop():
+def fetch_quote_snapshot():
     """
-    后台线程：循环获取数据并更新UI
+    行情引擎每个周期调用一次 (在引擎线程池中执行)
+    返回 (delta, stale_codes, heartbeat)，经 ui_bridge 交给主线程刷新
+    delta 只包含与上次推送相比有变化的行情，heartbeat 为 True 时界面做一次全量刷新
     """
-    global root, labels
-    while True:
+    stocks = list(STOCKS) # 拷贝一份，避免设置窗口同时修改列表
+    
+    # 只抓取到期的代码: 开盘品种每个周期都抓，休市品种低频抓取
+    now_ts = time.monotonic()
+    now_dt = datetime.now()
+    due = [s for s in stocks if next_poll_at.get(s["code"], 0) <= now_ts]
+    fresh = get_stock_data_tencent(due) if due else {}
+    if tick_log is not None and fresh:
         try:
-            if not root or not root.winfo_exists():
-                break
-                
-            data_map = get_stock_data_tencent(STOCKS)
-            
-            # 确保labels数量与STOCKS一致
-            # 在主线程中更新UI组件
-            root.after(0, lambda: refresh_labels(data_map))
-            
+            tick_log.record(fresh)
         except Exception as e:
-            pass
-            
-        time.sleep(REFRESH_RATE)
+            print(f"Tick record error: {e}")
+    for s in due:
+        code = s["code"]
+        if code in fresh:
+            # 留半个周期余量，保证下一次落在对应的刷新周期内
+            interval = market_sessions.poll_interval(code, REFRESH_RATE, now_dt)
+            next_poll_at[code] = now_ts + interval - REFRESH_RATE / 2
+    return build_quote_snapshot(stocks, fresh, {s["code"] for s in due})
+
+def build_quote_snapshot(stocks, fresh, due_codes):
+    """
+    并入一轮新行情 fresh，返回交给界面的 (delta, stale_codes, heartbeat)
+    due_codes: 本轮应当更新的代码，其中没拿到新行情的标记为过期 (回放时为空)
+    """
+    global last_heartbeat_at
+    quote_cache.update(fresh)
+    # 实时行情并入已建立的技术指标 (合成当天K线)
+    for code, quote in fresh.items():
+        entry = live_indicators.get(code)
+        if entry is not None:
+            entry[1].update(quote[0], quote[2], quote[3])
+    minute_aggregator.update_quotes(fresh)
+    
+    # 本轮该抓却没按时拿到的代码沿用上次的行情，并标记为过期 (灰色显示)
+    # 未到期的 (休市) 代码直接使用缓存，不算过期
+    data_map = {}
+    stale = set()
+    for s in stocks:
+        code = s["code"]
+        if code in fresh:
+            data_map[code] = fresh[code]
+        elif code in quote_cache:
+            data_map[code] = quote_cache[code]
+            if code in due_codes:
+                stale.add(code)
+    
+    # 增量推送: 价格/涨跌幅/成交量/行情时间 或 过期状态有变化的才交给界面
+    delta = {}
+    for code, val in data_map.items():
+        key = (val, code in stale)
+        if last_published.get(code) != key:
+            last_published[code] = key
+            delta[code] = val
+    
+    # 心跳: 定期让界面全量刷新一次 (量比随时间变化、跨日检查等)
+    now_ts = time.monotonic()
+    heartbeat = now_ts - last_heartbeat_at >= HEARTBEAT_INTERVAL
+    if heartbeat:
+        last_heartbeat_at = now_ts
+    return delta, stale, heartbeat
+
+def save_quote_snapshot():
+    """保存最后的行情和5日均量 (定时任务及退出时调用)，下次启动时立即显示"""
+    try:
+        quote_snapshot.save(dict(quote_cache), dict(MA5_VOLUMES))
+    except Exception as e:
+        print(f"Error saving quote snapshot: {e}")
+
+def restore_quote_snapshot():
+    """启动时载入上次的行情快照: 界面立即显示 (灰色过期)，实时行情到达后替换"""
+    quotes, ma5 = quote_snapshot.load()
+    codes = {s["code"] for s in STOCKS}
+    for code, quote in quotes.items():
+        if code in codes:
+            quote_cache[code] = quote
+            ui_quotes[code] = quote
+            ui_stale.add(code)
+    for code, volume in ma5.items():
+        if code in codes:
+            MA5_VOLUMES.setdefault(code, volume)
+
+def mark_startup(stage):
+    """记录启动阶段的耗时 (只记第一次)；拿到第一笔行情时输出汇总"""
+    if stage in startup_marks: return
+    startup_marks[stage] = time.perf_counter() - _startup_t0
+    if stage == "first_quote":
+        print("Startup: " + ", ".join(f"{k} {v * 1000:.0f} ms" for k, v in startup_marks.items()))
+        if profile_startup:
+            report_startup_profile()
+
+def report_startup_profile():
+    """--profile-startup: 输出一行 JSON (供 benchmarks/startup_profile.py 解析) 后退出"""
+    print("STARTUP_PROFILE " + json.dumps({k: round(v * 1000, 1) for k, v in startup_marks.items()}), flush=True)
+    quit_app()
+
+def poll_ui_bridge():
+    """主线程定时取出引擎推送的行情并刷新界面"""
+    if not root: return
+    try:
+        items = ui_bridge.drain()
+        if items and any(delta for delta, _, _ in items):
+            mark_startup("first_quote")
+        if items:
+            # 积压多帧时按顺序合并增量，只画一次
+            changed = set()
+            full = False
+            for delta, stale, heartbeat in items:
+                ui_quotes.update(delta)
+                changed.update(delta)
+                full = full or heartbeat
+            ui_stale.clear()
+            ui_stale.update(items[-1][1])
+            shook = False
+            if changed or full:
+                shook = refresh_labels(ui_quotes, ui_stale, changed=None if full else changed)
+            if replayer is not None:
+                replayer.frame_done(shook)
+    except Exception as e:
+        print(f"UI refresh error: {e}")
+    root.after(ui_poll_ms, poll_ui_bridge)
+
+def redraw_all():
+    """用界面当前持有的行情全量重绘 (切换显示模式、修改自选股后调用)"""
+    refresh_labels(ui_quotes, ui_stale)
 
 def shake_window():
     """窗口抖动动画"""
@@ -427,6 +532,7 @@ last_display_mode = None
 last_stock_count = 0
 last_show_price = None
 last_show_volume = None
+last_view_ceiling = None
 
 def bind_events(widget):
     """绑定通用事件到组件"""
@@ -458,9 +564,13 @@ def get_trading_minutes():
     
     return min(minutes, 240)
 
-def refresh_labels(data_map):
-    """在主线程刷新Labels (重构版：支持Grid布局)"""
-    global main_frame, stock_row_widgets, last_display_mode, last_stock_count, root, last_percentages
+def refresh_labels(data_map, stale_codes=(), changed=None):
+    """在主线程刷新Labels (重构版：支持Grid布局)
+    stale_codes: 本轮未按时更新、沿用旧行情的代码，灰色显示
+    changed: 本次有变化的代码，只重绘这些行；None 表示全部重绘
+    返回本次是否触发了抖动提醒
+    """
+    global main_frame, stock_row_widgets, last_display_mode, last_stock_count, root, last_percentages, last_view_ceiling
     global session_max_map, current_date_str, show_price, last_show_price, show_volume, last_show_volume
     
     if not root: return
@@ -570,14 +680,19 @@ def refresh_labels(data_map):
     # === 更新数据 ===
     
     # 1. 更新每只股票的历史最大值 (Session Max)
-    for code in data_map:
-        # 兼容 (price, percent) 和 (price, percent, volume)
+    # 过期行情不计入: 启动快照可能是前一天的涨跌幅 (首轮全部代码都会抓取，没拿到新行情的一直是过期)
+    for code in (data_map if changed is None else changed):
+        if code not in data_map or code in stale_codes: continue
+        # 行情格式: (price, percent, volume, quote_time)
         val = data_map[code]
         percent = val[1]
         
         cur_abs = abs(percent)
         if cur_abs > session_max_map.get(code, 0.0):
             session_max_map[code] = cur_abs
+            # 盘中的最大波动也要持久化 (只记内存日志，后台定时落盘)
+            if replayer is None:
+                config_store.put("session_max_map", code, cur_abs)
             
     # 2. 计算全局视口上限 (View Ceiling)
     # 取所有当前监控股票中的最大历史波动，作为统一的缩放基准
@@ -595,13 +710,20 @@ def refresh_labels(data_map):
     # 2. 如果全局历史最大值超过 2.5%，则视口跟随扩张 (兼容大行情)
     view_ceiling = max(2.5, current_max_all)
     
+    # 布局重建或缩放基准变化时所有柱子都要重画，否则只画有变化的行
+    repaint_all = changed is None or need_rebuild or view_ceiling != last_view_ceiling
+    last_view_ceiling = view_ceiling
+    
     should_shake = False
+    painted = 0
     
     for i, stock in enumerate(STOCKS):
         if i >= len(stock_row_widgets): break
         
         widgets = stock_row_widgets[i]
         code = stock['code']
+        if not repaint_all and code not in changed: continue
+        painted += 1
         display_name = stock['name']
         if len(display_name) > 8: display_name = display_name[:8]
         
@@ -612,15 +734,11 @@ def refresh_labels(data_map):
         vol_text = ""
         
         if code in data_map:
-            val = data_map[code]
-            volume = 0
-            if len(val) == 3:
-                current_price, percent, volume = val
-            else:
-                current_price, percent = val
+            current_price, percent, volume = data_map[code][:3]
             
             color = "#ff3333" if percent > 0 else "#00cc00"
             if percent == 0: color = "#cccccc"
+            if code in stale_codes: color = STALE_COLOR # 过期数据
             
             # 成交量分析 (放量/缩量)
             # 只有在开盘期间或收盘后才计算
@@ -724,6 +842,7 @@ def refresh_labels(data_map):
                 # 颜色定义
                 bar_color = "#FF4D4F" if percent > 0 else "#52C41A" # 现代红绿
                 if percent == 0: bar_color = "#999999"
+                if code in stale_codes: bar_color = STALE_COLOR
                 track_color = "#333333" # 轨道底色
                 
                 # 绘制轨道 (圆角背景)
@@ -747,6 +866,9 @@ def refresh_labels(data_map):
                 canvas.create_line(bar_x1, center_y, bar_x2, center_y,
                                   width=line_width, fill=bar_color, capstyle=tk.ROUND)
 
+    # 没有任何行重绘时，窗口尺寸也不会变
+    if painted == 0: return False
+
     # 动态调整窗口大小
     main_frame.update_idletasks() # 强制计算布局
     req_width = main_frame.winfo_reqwidth()
@@ -763,8 +885,9 @@ def refresh_labels(data_map):
     if abs(target_width - current_width) > 5 or abs(target_height - current_height) > 5:
         root.geometry(f"{target_width}x{target_height}+{root.winfo_x()}+{root.winfo_y()}")
 
-    if should_shake:
+    if should_shake and shake_enabled:
         root.after(50, shake_window)
+    return should_shake
 
 def start_drag(event):
     root_win = event.widget.winfo_toplevel()
@@ -790,7 +913,7 @@ def toggle_display_mode(mode):
     display_mode = mode
     save_config()
     # 立即触发刷新
-    if root: root.after(0, lambda: refresh_labels({}))
+    if root: root.after(0, redraw_all)
 
 def toggle_show_price():
     """切换是否显示价格"""
@@ -798,7 +921,7 @@ def toggle_show_price():
     show_price = not show_price
     save_config()
     # 立即触发刷新
-    if root: root.after(0, lambda: refresh_labels({}))
+    if root: root.after(0, redraw_all)
 
 def toggle_show_volume():
     """切换是否显示成交量"""
@@ -806,11 +929,17 @@ def toggle_show_volume():
     show_volume = not show_volume
     save_config()
     # 立即触发刷新
-    if root: root.after(0, lambda: refresh_labels({}))
+    if root: root.after(0, redraw_all)
 
 def quit_app():
     """退出程序，解决残留白框问题"""
     global root
+    quote_engine.stop()
+    if tick_log is not None:
+        tick_log.close()
+    if replayer is None:
+        config_store.close() # 写最终检查点
+        save_quote_snapshot()
     if root:
         try:
             root.withdraw() # 先隐藏窗口
@@ -822,327 +951,58 @@ def quit_app():
 # ================= AI技术分析模块 =================
 def get_kline_data_analysis(code):
     """获取K线数据 (用于技术分析)"""
-    # 简单的代码转换
-    api_code = code
-    if code.startswith("csi"): api_code = "sh" + code[3:]
-    elif code.startswith("sh1b"): api_code = "sh00" + code[4:]
+    inst = instrument_registry.get(code)
     
     # 不支持非股票/指数代码
-    if code.startswith(("hf_", "gds_", "nf_", "Au", "Ag", "Pt")):
+    if "kline" not in inst.capabilities:
         return None
+    api_code = inst.kline_code
 
-    # 获取100天日K
-    url = f"http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={api_code},day,,,100,qfq"
+    # 获取100天日K (本地日K缓存)，转成列存储
+    import indicators, technical_analysis
     try:
-        resp = requests.get(url, timeout=3)
-        if resp.status_code != 200: return None
-        data = resp.json()
-        
-        stock_data = data['data'].get(api_code, {})
-        # 兼容不同字段名
-        kline = stock_data.get('qfqday', stock_data.get('day', []))
-        
-        parsed_data = []
-        for item in kline:
-            # item: [date, open, close, high, low, volume, ...]
-            parsed_data.append({
-                "date": item[0],
-                "open": float(item[1]),
-                "close": float(item[2]),
-                "high": float(item[3]),
-                "low": float(item[4]),
-                "volume": float(item[5])
-            })
-        return parsed_data
+        kline = kline_store.get_bars(api_code, technical_analysis.ANALYSIS_BARS)
+        if not kline:
+            return None
+        return indicators.Bars.from_rows(kline)
     except Exception as e:
         print(f"Analysis Error: {e}")
         return None
 
-def calculate_ma(data, days):
-    """计算移动平均线"""
-    if len(data) < days:
+def seed_live_indicators(code, bars):
+    """用日K历史建立实时指标状态，并立即并入最近一次行情"""
+    import indicators
+    live = indicators.LiveIndicators(bars)
+    quote = quote_cache.get(code)
+    if quote:
+        live.update(quote[0], quote[2], quote[3])
+    live_indicators[code] = (datetime.now().strftime("%Y-%m-%d"), live)
+    return live
+
+def live_bar_date(code):
+    """实时指标当前K线的日期 (分析结果缓存的版本号)，尚未建立时返回 None"""
+    entry = live_indicators.get(code)
+    if entry is None or entry[1].bar is None:
         return None
-    
-    # 取最后N天
-    subset = data[-days:]
-    avg = sum(d['close'] for d in subset) / days
-    return avg
+    return entry[1].bar[0]
 
-def calculate_rsi(data, periods=14):
-    """计算RSI相对强弱指标"""
-    if len(data) < periods + 1:
+def get_live_indicators(code):
+    """获取实时指标状态；没有或不是今天建立的 (可能已除权) 才重新读取日K"""
+    entry = live_indicators.get(code)
+    if entry is not None and entry[0] == datetime.now().strftime("%Y-%m-%d"):
+        return entry[1]
+    data = get_kline_data_analysis(code)
+    if not data:
         return None
-        
-    gains = []
-    losses = []
-    
-    # 计算每日涨跌
-    for i in range(1, len(data)):
-        change = data[i]['close'] - data[i-1]['close']
-        if change > 0:
-            gains.append(change)
-            losses.append(0)
-        else:
-            gains.append(0)
-            losses.append(abs(change))
-            
-    # 只取最近N天用于计算初始值 (简单算法)
-    # 标准RSI需要平滑移动平均，这里用简单平均模拟近似值
-    recent_gains = gains[-periods:]
-    recent_losses = losses[-periods:]
-    
-    avg_gain = sum(recent_gains) / periods
-    avg_loss = sum(recent_losses) / periods
-    
-    if avg_loss == 0:
-        return 100
-        
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-def calculate_macd(data, short=12, long=26, mid=9):
-    """计算MACD (DIF, DEA, MACD)"""
-    if not data or len(data) < long + mid: return None
-    
-    # 简单EMA计算
-    closes = [d['close'] for d in data]
-    
-    def get_ema(values, n):
-        ema = [values[0]]
-        alpha = 2 / (n + 1)
-        for i in range(1, len(values)):
-            ema.append(alpha * values[i] + (1 - alpha) * ema[-1])
-        return ema
-        
-    ema_short = get_ema(closes, short)
-    ema_long = get_ema(closes, long)
-    
-    dif = [s - l for s, l in zip(ema_short, ema_long)]
-    dea = get_ema(dif, mid)
-    
-    macd_bar = [(d - de) * 2 for d, de in zip(dif, dea)]
-    
-    return {
-        "dif": dif[-1],
-        "dea": dea[-1],
-        "macd": macd_bar[-1],
-        "prev_macd": macd_bar[-2]
-    }
-
-def calculate_kdj(data, n=9, m1=3, m2=3):
-    """计算KDJ"""
-    if not data or len(data) < n: return None
-    
-    k_val = 50
-    d_val = 50
-    
-    # 需要逐日计算以获得准确序列，这里简化计算最后几天
-    # 为了准确性，我们从足够早的地方开始算
-    start_idx = max(0, len(data) - 100) 
-    
-    for i in range(start_idx, len(data)):
-        # 获取过去N天(含今天)的最高最低
-        window = data[max(0, i-n+1):i+1]
-        if not window: continue
-        
-        low_n = min(d['low'] for d in window)
-        high_n = max(d['high'] for d in window)
-        close = data[i]['close']
-        
-        if high_n == low_n:
-            rsv = 50
-        else:
-            rsv = (close - low_n) / (high_n - low_n) * 100
-            
-        k_val = (m1-1)/m1 * k_val + 1/m1 * rsv
-        d_val = (m2-1)/m2 * d_val + 1/m2 * k_val
-        
-    j_val = 3 * k_val - 2 * d_val
-    
-    return {"k": k_val, "d": d_val, "j": j_val}
+    return seed_live_indicators(code, data)
 
 def generate_analysis_data(code, name):
     """生成分析数据字典 (分离数据与视图)"""
-    data = get_kline_data_analysis(code)
-    if not data: return None
-    
-    current_price = data[-1]['close']
-    yesterday_price = data[-2]['close']
-    
-    # 1. 趋势分析
-    ma5 = calculate_ma(data, 5)
-    ma20 = calculate_ma(data, 20)
-    ma60 = calculate_ma(data, 60)
-    macd = calculate_macd(data)
-    
-    # 2. 资金分析
-    vol_today = data[-1]['volume']
-    vol_ma5 = 0
-    if len(data) >= 6:
-        vol_ma5 = sum(d['volume'] for d in data[-6:-1]) / 5
-    
-    # 3. 情绪分析
-    rsi = calculate_rsi(data)
-    kdj = calculate_kdj(data)
-    
-    # 4. 综合研判打分
-    score = 0
-    factors = [] # 记录得分因子 (描述, 分数变动)
-    
-    # 趋势分 (3分)
-    trend_desc = "震荡"
-    
-    # 细化趋势描述与评分
-    if ma5 and ma20:
-        if ma5 > ma20:
-            if current_price > ma20:
-                trend_desc = "多头排列"
-                score += 1.0
-                factors.append(("多头排列", 1.0))
-            else:
-                trend_desc = "回调震荡"
-                score -= 0.5 # 破位风险
-                factors.append(("回调破位", -0.5))
-        else: # ma5 < ma20
-            if current_price > ma20:
-                trend_desc = "反弹震荡"
-                score += 0.5 # 弱势反弹
-                factors.append(("弱势反弹", 0.5))
-            else:
-                trend_desc = "空头排列"
-                score -= 1.0
-                factors.append(("空头排列", -1.0))
-    elif ma20:
-        # 只有MA20的情况 (新股或数据不足)
-        if current_price > ma20: 
-            score += 0.5
-            trend_desc = "站上均线"
-            factors.append(("站上均线", 0.5))
-        else: 
-            score -= 0.5
-            trend_desc = "均线压制"
-            factors.append(("均线压制", -0.5))
-
-    # 均线交叉评分 (额外加分项)
-    if ma5 and ma20:
-        if ma5 > ma20: 
-            score += 0.5
-            factors.append(("MA5金叉", 0.5))
-        elif ma5 < ma20: 
-            score -= 0.5
-            factors.append(("MA5死叉", -0.5))
-    
-    if macd:
-        # MACD 金叉/死叉
-        if macd['dif'] > macd['dea']: 
-            score += 0.5 # 金叉状态
-            factors.append(("MACD金叉", 0.5))
-        elif macd['dif'] < macd['dea']: 
-            score -= 0.5 # 死叉状态
-            factors.append(("MACD死叉", -0.5))
-        
-        if macd['macd'] > 0 and macd['macd'] > macd['prev_macd']: 
-            score += 0.5 # 红柱增长
-            factors.append(("红柱增长", 0.5))
-        if macd['dif'] > 0 and macd['dea'] > 0: 
-            score += 0.5 # 零轴上方
-            factors.append(("零轴上方", 0.5))
-    
-    # 资金分 (2分)
-    vol_desc = "平量"
-    vol_ratio = 0
-    if vol_ma5 > 0:
-        vol_ratio = vol_today / vol_ma5
-        if vol_ratio > 1.5: 
-            vol_desc = "放量"
-            if current_price > yesterday_price: 
-                score += 1 # 放量涨
-                factors.append(("放量上涨", 1.0))
-            else: 
-                score -= 1 # 放量跌
-                factors.append(("放量下跌", -1.0))
-        elif vol_ratio < 0.6: 
-            vol_desc = "缩量"
-            if current_price < yesterday_price: 
-                score += 0.5 # 缩量跌(惜售)
-                factors.append(("缩量下跌", 0.5))
-            elif current_price > yesterday_price: 
-                score -= 0.5 # 缩量涨(背离风险)
-                factors.append(("缩量上涨", -0.5))
-        
-        # 补充逻辑：如果放量过大 (>3.0) 且在高位，可能是出货，扣分
-        if vol_ratio > 3.0 and current_price > ma20:
-             score -= 0.5
-             factors.append(("高位巨量", -0.5))
-            
-    # 情绪分 (2分)
-    sentiment_desc = "中性"
-    if rsi:
-        if rsi > 80: 
-            score -= 1
-            sentiment_desc = "超买"
-            factors.append(("RSI超买", -1.0))
-        elif rsi < 20: 
-            score += 1.5 # 超卖反弹权重高
-            sentiment_desc = "超卖"
-            factors.append(("RSI超卖", 1.5))
-            
-    if kdj:
-        # KDJ 金叉/死叉
-        if kdj['k'] > kdj['d']: 
-            score += 0.5 # 金叉
-            factors.append(("KDJ金叉", 0.5))
-        elif kdj['k'] < kdj['d']: 
-            score -= 0.5 # 死叉
-            factors.append(("KDJ死叉", -0.5))
-        
-        if kdj['j'] < 0 or kdj['j'] > 100:
-             if kdj['j'] < 0: 
-                 score += 0.5
-                 factors.append(("KDJ超卖", 0.5))
-             if kdj['j'] > 100: 
-                 score -= 1.0 # J值过高风险极大
-                 factors.append(("KDJ超买", -1.0))
-
-
-             
-    # 结论
-    conclusion = "观察"
-    action_color = "#888888" # Gray
-    if score >= 2.5:
-        conclusion = "积极买入"
-        action_color = "#FF4D4F" # Red
-    elif score >= 1:
-        conclusion = "持有/低吸"
-        action_color = "#FF7875" # Light Red
-    elif score <= -1.5:
-        conclusion = "减仓/卖出"
-        action_color = "#52C41A" # Green
-    elif score <= 0:
-        conclusion = "观望"
-        action_color = "#95DE64" # Light Green
-        
-    return {
-        "name": name,
-        "code": code,
-        "price": current_price,
-        "pct": (current_price - yesterday_price) / yesterday_price * 100,
-        "ma5": ma5,
-        "ma20": ma20,
-        "ma60": ma60,
-        "macd": macd,
-        "vol_ratio": vol_ratio,
-        "vol_desc": vol_desc,
-        "trend_desc": trend_desc,
-        "sentiment_desc": sentiment_desc,
-        "rsi": rsi,
-        "kdj": kdj,
-        "conclusion": conclusion,
-        "action_color": action_color,
-        "score": score,
-        "factors": factors
-    }
+    # 实时指标: 日K历史只在首次读取，之后由实时行情逐笔更新，这里直接取值
+    live = get_live_indicators(code)
+    if live is None: return None
+    import technical_analysis
+    return technical_analysis.score_snapshot(code, name, live.snapshot())
 
 def show_analysis_result(name, stock_info=None):
     """显示分析结果窗口 (美化版)"""
@@ -1361,17 +1221,99 @@ def show_analysis_result(name, stock_info=None):
 
 
 def run_analysis_thread(stock):
-    """在线程中运行分析"""
+    """在线程池中运行分析 (结果有缓存，连续点击直接复用)"""
     def task():
         # 获取结构化数据
-        data = generate_analysis_data(stock['code'], stock['name'])
+        try:
+            data = analysis_cache.get(stock['code'], stock['name'])
+        except Exception as e:
+            print(f"Analysis Error: {e}")
+            return
         if data:
             root.after(0, lambda: show_analysis_result(stock['name'], data))
         else:
             # 错误处理
             pass
         
-    threading.Thread(target=task, daemon=True).start()
+    _analysis_pool.submit(task)
+
+def show_screener():
+    """自选股批量打分 (结果表格，点击表头排序)；扫描进行中再次点击只把窗口提到前面"""
+    global screener_task, screener_window
+    if screener_task is not None and not screener_task.done():
+        if screener_window is not None and screener_window.winfo_exists():
+            screener_window.lift()
+        return
+    from tkinter import ttk
+    import screener
+    win = screener_window = tk.Toplevel(root)
+    win.title("自选股扫描")
+    win.attributes("-topmost", True)
+    try:
+        pos_x = root.winfo_x() + root.winfo_width() + 10
+        if pos_x + 900 > root.winfo_screenwidth():
+            pos_x = max(10, root.winfo_x() - 900 - 10)
+        win.geometry(f"900x600+{pos_x}+{root.winfo_y()}")
+    except Exception:
+        win.geometry("900x600")
+
+    status_var = tk.StringVar(value="正在扫描...")
+    tk.Label(win, textvariable=status_var, anchor="w").pack(fill="x", padx=5, pady=3)
+
+    frame = tk.Frame(win)
+    frame.pack(fill="both", expand=True, padx=5, pady=5)
+    columns = [field for field, _ in screener.COLUMNS]
+    tree = ttk.Treeview(frame, columns=columns, show="headings")
+    widths = {"code": 80, "name": 90, "price": 70, "pct": 70, "score": 60, "conclusion": 80, "factors": 420}
+    scrollbar = ttk.Scrollbar(frame, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scrollbar.set)
+    tree.pack(side="left", fill="both", expand=True)
+    scrollbar.pack(side="right", fill="y")
+
+    results = []
+    sort_state = {"field": "score", "reverse": True}
+
+    def fill():
+        tree.delete(*tree.get_children())
+        for r in results:
+            tree.insert("", "end", values=[screener.format_cell(r, f) for f in columns])
+
+    def sort_by(field):
+        if field == "factors":
+            return
+        if sort_state["field"] == field:
+            sort_state["reverse"] = not sort_state["reverse"]
+        else:
+            sort_state["field"] = field
+            sort_state["reverse"] = field in ("price", "pct", "score")
+        results.sort(key=lambda r: r[field], reverse=sort_state["reverse"])
+        fill()
+
+    for field, title in screener.COLUMNS:
+        tree.heading(field, text=title, command=lambda f=field: sort_by(f))
+        tree.column(field, width=widths[field], anchor="w" if field in ("name", "factors") else "center")
+
+    def on_done(scored, total, elapsed):
+        if not win.winfo_exists():
+            return
+        results[:] = scored
+        fill()
+        status_var.set(f"{len(scored)}/{total} 只完成打分，用时 {elapsed:.1f} 秒 (点击表头排序)")
+
+    def task():
+        stocks = list(STOCKS)
+        t0 = time.time()
+        # 与右键分析共用实时指标状态和结果缓存
+        try:
+            scored = screener.screen(stocks, analyze=analysis_cache.get)
+        except Exception as e:
+            print(f"Screener Error: {e}")
+            message = f"扫描失败: {e}"
+            root.after(0, lambda: win.winfo_exists() and status_var.set(message))
+            return
+        root.after(0, lambda: on_done(scored, len(stocks), time.time() - t0))
+
+    screener_task = _analysis_pool.submit(task)
 
 def show_context_menu(event):
     """显示右键菜单"""
@@ -1388,13 +1330,15 @@ def show_context_menu(event):
                 
     if clicked_stock:
         # 添加分析选项 (仅对股票/指数有效)
-        code = clicked_stock['code']
-        # 简单过滤掉明显不支持的品种 (如黄金、外汇的前缀)
-        if not code.startswith(("hf_", "gds_", "nf_")):
+        # 过滤掉不支持的品种 (如黄金、外汇、期货)
+        if instrument_registry.has(clicked_stock['code'], "analysis"):
             menu.add_command(label=f"📈 技术面分析: {clicked_stock['name']}", 
                             command=lambda s=clicked_stock: run_analysis_thread(s))
             menu.add_separator()
     
+    menu.add_command(label="🔍 自选股扫描 (批量打分)", command=show_screener)
+    menu.add_separator()
+    
     # 显示模式子菜单
     mode_menu = tk.Menu(menu, tearoff=0)
     mode_menu.add_radiobutton(label="纯百分比 (Percent)", command=lambda: toggle_display_mode("percent"))
@@ -1503,6 +1447,7 @@ def open_settings():
 
             # 添加到列表
             STOCKS.append({"code": code, "name": name})
+            on_stocks_changed()
             save_config()
             refresh_list()
             # messagebox.showinfo("成功", f"已添加 {name} 到监控列表") # 用户要求不弹窗
@@ -1650,6 +1595,7 @@ def open_settings():
             top.title("扫码关注公众号")
             top.geometry("400x400")
             
+            from PIL import Image, ImageTk # 只有二维码用到，按需加载
             img = Image.open(qr_path)
             img.thumbnail((350, 350))
             photo = ImageTk.PhotoImage(img)
@@ -1720,6 +1666,7 @@ def open_settings():
             if not found:
                 STOCKS.append({"code": code, "name": name})
         
+        on_stocks_changed()
         save_config()
         refresh_list()
         # 清空输入
@@ -1727,7 +1674,7 @@ def open_settings():
         name_entry.delete(0, tk.END)
         
         # 立即刷新UI
-        if root: root.after(0, lambda: refresh_labels({}))
+        if root: root.after(0, redraw_all)
         
     def delete_stock():
         selection = stock_listbox.curselection()
@@ -1737,13 +1684,14 @@ def open_settings():
         
         idx = selection[0]
         del STOCKS[idx]
+        on_stocks_changed()
         save_config()
         refresh_list()
         code_entry.delete(0, tk.END)
         name_entry.delete(0, tk.END)
         
         # 立即刷新UI
-        if root: root.after(0, lambda: refresh_labels({}))
+        if root: root.after(0, redraw_all)
 
     btn_frame = tk.Frame(edit_frame)
     btn_frame.grid(row=1, column=0, columnspan=4, pady=10)
@@ -1766,17 +1714,88 @@ def on_map(event):
     if root.state() == 'normal' and not root.overrideredirect():
         root.after(100, lambda: root.overrideredirect(True))
 
-def main():
-    global root
+def parse_replay_speed(value):
+    """回放倍速: 正数或 max (最快)"""
+    if value == "max":
+        return 0.0
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be > 0 or 'max'")
+    return speed
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="桌面股票监控")
+    parser.add_argument("--replay", metavar="YYYYMMDD|synthetic",
+                        help="回放某天的行情记录或合成行情 (不请求网络)，结束后输出帧率并退出")
+    parser.add_argument("--speed", type=parse_replay_speed, default=1.0, help="回放倍速，max 为最快 (默认 1)")
+    parser.add_argument("--replay-dir", default=tick_recorder.TICK_DIR, help="行情记录目录")
+    parser.add_argument("--symbols", type=int, default=0, help="合成行情的代码数量 (默认使用自选股)")
+    parser.add_argument("--duration", type=int, default=4 * 3600, help="合成行情的时长 (秒)")
+    parser.add_argument("--no-shake", action="store_true", help="回放时不播放抖动动画 (仍统计次数)")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="输出启动耗时 (导入/首帧/第一笔行情，单位 ms) 后退出")
+    return parser.parse_args(argv)
+
+def prepare_replay(args):
+    """回放模式: 准备行情源并替换自选股，成功返回 True"""
+    global STOCKS, replayer, ui_poll_ms, shake_enabled
+    import replay
+    if args.replay == "synthetic":
+        if args.symbols:
+            STOCKS = [{"code": f"sh{600000 + i}", "name": f"合成{i:03d}"} for i in range(args.symbols)]
+        batches = replay.synthetic_batches([s["code"] for s in STOCKS], args.duration)
+    else:
+        try:
+            loaded = replay.recorded_batches(args.replay, args.replay_dir)
+        except ValueError as e:
+            print(f"Replay error: {e}")
+            return False
+        if loaded is None:
+            print(f"No tick log for {args.replay} in {args.replay_dir}")
+            return False
+        codes, batches = loaded
+        names = {s["code"]: s["name"] for s in STOCKS}
+        STOCKS = [{"code": c, "name": names.get(c, c)} for c in codes]
+
+    # 回放的行情与实时行情走同一条路径: 计算增量 -> ui_bridge -> refresh_labels
+    def publish(ts, quotes):
+        ui_bridge.publish(build_quote_snapshot(STOCKS, quotes, ()))
+
+    replayer = replay.Replayer(batches, publish, args.speed)
+    ui_poll_ms = 1
+    shake_enabled = not args.no_shake
+    return True
+
+def check_replay():
+    """回放进度: 每 5 秒输出一次统计，结束后输出报告并退出"""
+    if not root: return
+    if replayer.finished:
+        print(replayer.format_report())
+        quit_app()
+        return
+    print(replayer.format_report())
+    root.after(5000, check_replay)
+
+def main(argv=None):
+    global root, profile_startup
+    args = parse_args(argv)
+    profile_startup = args.profile_startup
     
     # === 关键修改：开启高DPI感知，解决字体模糊问题 ===
     try:
         ctypes.windll.shcore.SetProcessDpiAwareness(1)
     except Exception:
-        ctypes.windll.user32.SetProcessDPIAware()
+        try:
+            ctypes.windll.user32.SetProcessDPIAware()
+        except Exception:
+            pass # 非 Windows (如在 Linux 上回放测试)
     # ===============================================
 
     load_config()
+    if args.replay and not prepare_replay(args):
+        return
+    on_stocks_changed()
+    mark_startup("config")
 
     root = tk.Tk()
     root.title("") # 无标题
@@ -1801,16 +1820,43 @@ def main():
     # 右键菜单
     root.bind("<Button-3>", show_context_menu)
     
-    # 初始化Labels (首次)
-    refresh_labels({})
+    # 初始化Labels (首次): 有上次的行情快照时直接画出来，不等网络
+    if replayer is None:
+        restore_quote_snapshot()
+    refresh_labels(ui_quotes, ui_stale)
+    last_percentages.clear() # 快照的涨跌幅不参与抖动判断
+    root.update_idletasks()
+    mark_startup("first_paint")
+    if profile_startup:
+        # 网络不通时也要有结果
+        root.after(STARTUP_PROFILE_TIMEOUT * 1000, report_startup_profile)
+
+    if replayer is not None:
+        # 回放模式: 不启动行情引擎和网络请求
+        replayer.start()
+        root.after(ui_poll_ms, poll_ui_bridge)
+        root.after(5000, check_replay)
+        root.mainloop()
+        return
         
-    # 启动数据更新线程
-    t = threading.Thread(target=update_ui_loop, daemon=True)
-    t.start()
-    
-    # 启动 MA5 获取线程
-    ma5_thread = threading.Thread(target=get_ma5_volumes_thread, daemon=True)
-    ma5_thread.start()
+    # 预热行情连接 (DNS + TCP 握手)，首个刷新周期即可复用长连接
+    threading.Thread(target=http_client.warm_up, daemon=True).start()
+
+    # 配置的后台定时保存
+    config_store.start()
+    # 行情快照定时保存 (在引擎线程池中执行)
+    quote_engine.add_job("snapshot", save_quote_snapshot, quote_snapshot.SNAPSHOT_INTERVAL, lambda _: None)
+
+    # 启动行情引擎 (固定频率调度，结果经 ui_bridge 回到主线程)
+    quote_engine.add_job("quotes", fetch_quote_snapshot, REFRESH_RATE, ui_bridge.publish)
+    quote_engine.start()
+    root.after(ui_poll_ms, poll_ui_bridge)
+    
+    # 后台并发获取 MA5 (之后自选股变化时自动补拉)
+    prefetch_ma5_volumes()
+    # 压缩以前的行情记录
+    if tick_log is not None:
+        threading.Thread(target=tick_recorder.compact_old, daemon=True).start()
     
     root.mainloop()
 
@@ -1,44 +1,54 @@
-import requests
+import argparse
+import csv
 import datetime
+import json
+import sys
+
+import numpy as np
+
+import indicators
+import instruments
+import kline_store
+
+ANALYSIS_BARS = 100 # 技术分析使用的日K数量
+
+# 结论阈值 (打分 -> 结论)，score_snapshot 与 score_series 共用
+BUY_SCORE = 2.5    # >= 积极买入
+HOLD_SCORE = 1     # >= 持有/低吸
+SELL_SCORE = -1.5  # <= 减仓/卖出
+WATCH_SCORE = 0    # <= 观望 (其余为观察)
+# 结论编号 (score_series 的向量化结论)
+CONCLUSION_CODES = {2: "积极买入", 1: "持有/低吸", 0: "观察", -1: "观望", -2: "减仓/卖出"}
+# 打分比较前指标保留的小数位: 实时递推 (LiveIndicators) 与 score_series 的累加顺序不同，
+# 末位误差 (如 RSI 19.99999999999997 与 20.0) 不能让两边在阈值上得出不同的分数
+COMPARE_DECIMALS = 9
+
+def _round(value):
+    """打分比较用的取整 (与 score_series 用同一个 np.round)，None 原样返回"""
+    return None if value is None else float(np.round(value, COMPARE_DECIMALS))
+
+def _rounded_snapshot(snap):
+    """LiveIndicators.snapshot() 中参与打分比较的指标取整后的副本"""
+    snap = dict(snap)
+    for key in ("ma5", "ma20", "ma60", "rsi"):
+        snap[key] = _round(snap.get(key))
+    for key in ("macd", "kdj"):
+        if snap.get(key):
+            snap[key] = {k: _round(v) for k, v in snap[key].items()}
+    return snap
 
 def get_kline_data(code):
     """获取K线数据 (腾讯接口)"""
-    # 处理代码前缀
-    api_code = code
-    if code.startswith("sh00") or code.startswith("sh60") or code.startswith("sh68"):
-        pass # shXXXXXX
-    elif code.startswith("sz"):
-        pass
-    else:
-        # 简单处理，默认为sh
-        pass
+    # 处理代码前缀 (csi/sh1b/cns 等别名换算成 K线接口的 sh 代码)
+    code = instruments.resolve(code).kline_code
         
-    # 获取100天日K
-    url = f"http://web.ifzq.gtimg.cn/appstock/app/fqkline/get?param={code},day,,,100,qfq"
+    # 获取100天日K (本地日K缓存，与主程序共用)，转成列存储
     try:
-        resp = requests.get(url, timeout=2)
-        data = resp.json()
-        
-        # 解析数据
-        # 路径: data['data'][code]['day'] or 'qfqday'
-        stock_data = data['data'].get(code, {})
-        kline = stock_data.get('qfqday', stock_data.get('day', []))
-        
-        # 格式化: [date, open, close, high, low, volume]
-        parsed_data = []
-        for item in kline:
-            parsed_data.append({
-                "date": item[0],
-                "open": float(item[1]),
-                "close": float(item[2]),
-                "high": float(item[3]),
-                "low": float(item[4]),
-                "volume": float(item[5])
-            })
-        return parsed_data
+        kline = kline_store.get_bars(code, ANALYSIS_BARS, timeout=2)
+        return indicators.Bars.from_rows(kline)
     except Exception as e:
         print(f"Error: {e}")
-        return []
+        return None
 
 def calculate_ma(data, days):
     """计算移动平均线"""
@@ -46,42 +56,280 @@ def calculate_ma(data, days):
         return None
     
     # 取最后N天
-    subset = data[-days:]
-    avg = sum(d['close'] for d in subset) / days
-    return avg
+    return float(data.close[-days:].mean())
 
 def calculate_rsi(data, periods=14):
     """计算RSI相对强弱指标"""
     if len(data) < periods + 1:
         return None
         
-    gains = []
-    losses = []
+    # 只取最近N天的简单平均 (标准RSI需要平滑移动平均，见 indicators.rsi_wilder)
+    return float(indicators.rsi_simple(data.close, periods)[-1])
+
+def score_snapshot(code, name, snap):
+    """
+    综合研判打分 (右键分析与批量选股共用)
+    snap 为 indicators.LiveIndicators.snapshot() 的返回值，数据不足时返回 None
+    """
+    if not snap or snap["prev_close"] is None: return None
+    snap = _rounded_snapshot(snap)
     
-    # 计算每日涨跌
-    for i in range(1, len(data)):
-        change = data[i]['close'] - data[i-1]['close']
-        if change > 0:
-            gains.append(change)
-            losses.append(0)
-        else:
-            gains.append(0)
-            losses.append(abs(change))
-            
-    # 只取最近N天用于计算初始值 (简单算法)
-    # 标准RSI需要平滑移动平均，这里用简单平均模拟近似值
-    recent_gains = gains[-periods:]
-    recent_losses = losses[-periods:]
+    current_price = snap["price"]
+    yesterday_price = snap["prev_close"]
+    
+    # 1. 趋势分析
+    ma5 = snap["ma5"]
+    ma20 = snap["ma20"]
+    ma60 = snap["ma60"]
+    macd = snap["macd"]
     
-    avg_gain = sum(recent_gains) / periods
-    avg_loss = sum(recent_losses) / periods
+    # 2. 资金分析
+    vol_today = snap["volume"]
+    vol_ma5 = snap["vol_ma5"]
     
-    if avg_loss == 0:
-        return 100
+    # 3. 情绪分析
+    rsi = snap["rsi"]
+    kdj = snap["kdj"]
+    
+    # 4. 综合研判打分
+    score = 0
+    factors = [] # 记录得分因子 (描述, 分数变动)
+    
+    # 趋势分 (3分)
+    trend_desc = "震荡"
+    
+    # 细化趋势描述与评分
+    if ma5 and ma20:
+        if ma5 > ma20:
+            if current_price > ma20:
+                trend_desc = "多头排列"
+                score += 1.0
+                factors.append(("多头排列", 1.0))
+            else:
+                trend_desc = "回调震荡"
+                score -= 0.5 # 破位风险
+                factors.append(("回调破位", -0.5))
+        else: # ma5 < ma20
+            if current_price > ma20:
+                trend_desc = "反弹震荡"
+                score += 0.5 # 弱势反弹
+                factors.append(("弱势反弹", 0.5))
+            else:
+                trend_desc = "空头排列"
+                score -= 1.0
+                factors.append(("空头排列", -1.0))
+    elif ma20:
+        # 只有MA20的情况 (新股或数据不足)
+        if current_price > ma20: 
+            score += 0.5
+            trend_desc = "站上均线"
+            factors.append(("站上均线", 0.5))
+        else: 
+            score -= 0.5
+            trend_desc = "均线压制"
+            factors.append(("均线压制", -0.5))
+
+    # 均线交叉评分 (额外加分项)
+    if ma5 and ma20:
+        if ma5 > ma20: 
+            score += 0.5
+            factors.append(("MA5金叉", 0.5))
+        elif ma5 < ma20: 
+            score -= 0.5
+            factors.append(("MA5死叉", -0.5))
+    
+    if macd:
+        # MACD 金叉/死叉
+        if macd['dif'] > macd['dea']: 
+            score += 0.5 # 金叉状态
+            factors.append(("MACD金叉", 0.5))
+        elif macd['dif'] < macd['dea']: 
+            score -= 0.5 # 死叉状态
+            factors.append(("MACD死叉", -0.5))
+        
+        if macd['macd'] > 0 and macd['macd'] > macd['prev_macd']: 
+            score += 0.5 # 红柱增长
+            factors.append(("红柱增长", 0.5))
+        if macd['dif'] > 0 and macd['dea'] > 0: 
+            score += 0.5 # 零轴上方
+            factors.append(("零轴上方", 0.5))
+    
+    # 资金分 (2分)
+    vol_desc = "平量"
+    vol_ratio = 0
+    if vol_ma5 > 0:
+        vol_ratio = _round(vol_today / vol_ma5)
+        if vol_ratio > 1.5: 
+            vol_desc = "放量"
+            if current_price > yesterday_price: 
+                score += 1 # 放量涨
+                factors.append(("放量上涨", 1.0))
+            else: 
+                score -= 1 # 放量跌
+                factors.append(("放量下跌", -1.0))
+        elif vol_ratio < 0.6: 
+            vol_desc = "缩量"
+            if current_price < yesterday_price: 
+                score += 0.5 # 缩量跌(惜售)
+                factors.append(("缩量下跌", 0.5))
+            elif current_price > yesterday_price: 
+                score -= 0.5 # 缩量涨(背离风险)
+                factors.append(("缩量上涨", -0.5))
+        
+        # 补充逻辑：如果放量过大 (>3.0) 且在高位，可能是出货，扣分
+        if vol_ratio > 3.0 and ma20 and current_price > ma20:
+             score -= 0.5
+             factors.append(("高位巨量", -0.5))
+            
+    # 情绪分 (2分)
+    sentiment_desc = "中性"
+    if rsi:
+        if rsi > 80: 
+            score -= 1
+            sentiment_desc = "超买"
+            factors.append(("RSI超买", -1.0))
+        elif rsi < 20: 
+            score += 1.5 # 超卖反弹权重高
+            sentiment_desc = "超卖"
+            factors.append(("RSI超卖", 1.5))
+            
+    if kdj:
+        # KDJ 金叉/死叉
+        if kdj['k'] > kdj['d']: 
+            score += 0.5 # 金叉
+            factors.append(("KDJ金叉", 0.5))
+        elif kdj['k'] < kdj['d']: 
+            score -= 0.5 # 死叉
+            factors.append(("KDJ死叉", -0.5))
+        
+        if kdj['j'] < 0 or kdj['j'] > 100:
+             if kdj['j'] < 0: 
+                 score += 0.5
+                 factors.append(("KDJ超卖", 0.5))
+             if kdj['j'] > 100: 
+                 score -= 1.0 # J值过高风险极大
+                 factors.append(("KDJ超买", -1.0))
+
+
+             
+    # 结论
+    conclusion = "观察"
+    action_color = "#888888" # Gray
+    if score >= BUY_SCORE:
+        conclusion = "积极买入"
+        action_color = "#FF4D4F" # Red
+    elif score >= HOLD_SCORE:
+        conclusion = "持有/低吸"
+        action_color = "#FF7875" # Light Red
+    elif score <= SELL_SCORE:
+        conclusion = "减仓/卖出"
+        action_color = "#52C41A" # Green
+    elif score <= WATCH_SCORE:
+        conclusion = "观望"
+        action_color = "#95DE64" # Light Green
         
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return {
+        "name": name,
+        "code": code,
+        "date": snap["date"],
+        "price": current_price,
+        "pct": (current_price - yesterday_price) / yesterday_price * 100,
+        "ma5": ma5,
+        "ma20": ma20,
+        "ma60": ma60,
+        "macd": macd,
+        "vol_ratio": vol_ratio,
+        "vol_desc": vol_desc,
+        "trend_desc": trend_desc,
+        "sentiment_desc": sentiment_desc,
+        "rsi": rsi,
+        "kdj": kdj,
+        "conclusion": conclusion,
+        "action_color": action_color,
+        "score": score,
+        "factors": factors
+    }
+
+def score_series(bars):
+    """
+    score_snapshot 的向量化版本: 对每一根K线 (以当根收盘为"今天") 计算打分，一次算完整段历史
+    bars 为 indicators.Bars；返回与K线等长的 float 数组，规则与 score_snapshot 逐条对应
+    """
+    close = bars.close
+    size = len(close)
+    score = np.zeros(size)
+    if size < 2:
+        return score
+    prev = np.concatenate(([np.nan], close[:-1]))
+    count = np.arange(1, size + 1)  # 每根K线 (含) 之前的K线数量
+    up = close > prev
+    down = close < prev
+
+    # 趋势分 (NaN 表示数据不足，比较结果为 False)
+    # 参与比较的指标与 score_snapshot 一样先保留 COMPARE_DECIMALS 位小数
+    ma5 = np.round(indicators.sma(close, 5), COMPARE_DECIMALS)
+    ma20 = np.round(indicators.sma(close, 20), COMPARE_DECIMALS)
+    both = ~np.isnan(ma5) & ~np.isnan(ma20)
+    above20 = close > ma20
+    bull = both & (ma5 > ma20)
+    score += np.where(bull, np.where(above20, 1.0, -0.5), 0.0)
+    score += np.where(both & ~(ma5 > ma20), np.where(above20, 0.5, -1.0), 0.0)
+    only20 = np.isnan(ma5) & ~np.isnan(ma20)
+    score += np.where(only20, np.where(above20, 0.5, -0.5), 0.0)
+    score += np.where(both & (ma5 > ma20), 0.5, 0.0) - np.where(both & (ma5 < ma20), 0.5, 0.0)
+
+    # MACD (至少 long + mid 根K线)
+    dif, dea, macd_bar = (np.round(x, COMPARE_DECIMALS) for x in indicators.macd(close))
+    prev_bar = np.concatenate(([np.nan], macd_bar[:-1]))
+    has_macd = count >= 26 + 9
+    score += np.where(has_macd & (dif > dea), 0.5, 0.0) - np.where(has_macd & (dif < dea), 0.5, 0.0)
+    score += np.where(has_macd & (macd_bar > 0) & (macd_bar > prev_bar), 0.5, 0.0)
+    score += np.where(has_macd & (dif > 0) & (dea > 0), 0.5, 0.0)
+
+    # 资金分: 量比 = 当天成交量 / 之前5天均量
+    vol_ma5 = np.concatenate(([np.nan], indicators.sma(bars.volume, 5)[:-1]))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = np.round(np.where(vol_ma5 > 0, bars.volume / vol_ma5, np.nan), COMPARE_DECIMALS)
+    heavy = ratio > 1.5
+    light = ratio < 0.6
+    score += np.where(heavy, np.where(up, 1.0, -1.0), 0.0)
+    score += np.where(light & down, 0.5, 0.0) - np.where(light & up, 0.5, 0.0)
+    score -= np.where((ratio > 3.0) & above20, 0.5, 0.0)
+
+    # 情绪分: RSI (为 0 时与 score_snapshot 一样视为无效)
+    rsi = np.round(indicators.rsi_simple(close), COMPARE_DECIMALS)
+    valid_rsi = ~np.isnan(rsi) & (rsi != 0)
+    score -= np.where(valid_rsi & (rsi > 80), 1.0, 0.0)
+    score += np.where(valid_rsi & (rsi < 20), 1.5, 0.0)
+
+    # KDJ (至少 9 根K线)
+    k, d, j = (np.round(x, COMPARE_DECIMALS) for x in indicators.kdj(bars.high, bars.low, close))
+    has_kdj = count >= 9
+    score += np.where(has_kdj & (k > d), 0.5, 0.0) - np.where(has_kdj & (k < d), 0.5, 0.0)
+    score += np.where(has_kdj & (j < 0), 0.5, 0.0) - np.where(has_kdj & (j > 100), 1.0, 0.0)
+
+    # 第一根K线没有昨收，score_snapshot 不打分
+    score[0] = 0.0
+    return score
+
+
+def conclusion_series(score):
+    """打分序列 -> 结论编号序列 (见 CONCLUSION_CODES)"""
+    return np.select(
+        [score >= BUY_SCORE, score >= HOLD_SCORE, score <= SELL_SCORE, score <= WATCH_SCORE],
+        [2, 1, -2, -1], default=0)
+
+
+def analyze_code(code, name=None, bars=ANALYSIS_BARS):
+    """从本地日K缓存读取历史并打分 (不依赖界面，供批量选股/命令行使用)"""
+    inst = instruments.resolve(code)
+    if "analysis" not in inst.capabilities:
+        return None
+    kline = kline_store.get_bars(inst.kline_code, bars)
+    if not kline:
+        return None
+    snap = indicators.LiveIndicators(indicators.Bars.from_rows(kline)).snapshot()
+    return score_snapshot(code, name or code, snap)
 
 def analyze_stock(code, name):
     print(f"\n======== {name} ({code}) 技术面AI分析 ========")
@@ -90,8 +338,8 @@ def analyze_stock(code, name):
         print("数据获取失败")
         return
 
-    current_price = data[-1]['close']
-    yesterday_price = data[-2]['close']
+    current_price = float(data.close[-1])
+    yesterday_price = float(data.close[-2])
     
     # 1. 均线分析 (趋势)
     ma5 = calculate_ma(data, 5)
@@ -112,8 +360,8 @@ def analyze_stock(code, name):
         print(f"❄️ [调整] 5日线 < 20日线，短期处于调整/下跌中")
 
     # 2. 成交量分析 (资金)
-    vol_today = data[-1]['volume']
-    vol_ma5 = sum(d['volume'] for d in data[-6:-1]) / 5 # 昨天及之前的5天均量
+    vol_today = float(data.volume[-1])
+    vol_ma5 = float(data.volume[-6:-1].mean()) # 昨天及之前的5天均量
     vol_ratio = vol_today / vol_ma5
     
     print("--- 资金分析 ---")
@@ -151,7 +399,85 @@ def analyze_stock(code, name):
     else:
         print("👀 结论：建议【观察】。多空分歧，等待方向明确。")
 
+# 导出字段 (CSV 列顺序)；macd/kdj 展开为子字段，因子拼成一列
+EXPORT_FIELDS = (
+    "code", "name", "date", "price", "pct", "score", "conclusion",
+    "ma5", "ma20", "ma60", "macd_dif", "macd_dea", "macd", "macd_prev",
+    "rsi", "kdj_k", "kdj_d", "kdj_j", "vol_ratio",
+    "trend_desc", "vol_desc", "sentiment_desc", "factors",
+)
+
+
+def export_record(result):
+    """score_snapshot 的结果 -> 扁平的导出记录 (去掉界面用的颜色)"""
+    macd = result["macd"] or {}
+    kdj = result["kdj"] or {}
+    record = {k: result[k] for k in EXPORT_FIELDS if k in result and k not in ("macd", "factors")}
+    record.update({
+        "macd_dif": macd.get("dif"), "macd_dea": macd.get("dea"),
+        "macd": macd.get("macd"), "macd_prev": macd.get("prev_macd"),
+        "kdj_k": kdj.get("k"), "kdj_d": kdj.get("d"), "kdj_j": kdj.get("j"),
+        "factors": [[desc, value] for desc, value in result["factors"]],
+    })
+    return record
+
+
+def write_records(records, fmt, out):
+    if fmt == "csv":
+        writer = csv.DictWriter(out, fieldnames=EXPORT_FIELDS)
+        writer.writeheader()
+        for record in records:
+            row = dict(record)
+            row["factors"] = " ".join(f"{desc}{value:+g}" for desc, value in record["factors"])
+            writer.writerow(row)
+    else:
+        for record in records:
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def main(argv=None):
+    """
+    命令行批量分析 (可放到定时任务里无界面运行):
+        python technical_analysis.py sh600000 sz000001            # JSON lines 输出到标准输出
+        python technical_analysis.py --file codes.txt --format csv -o report.csv
+        python technical_analysis.py --config stock_config.json   # 主程序的自选股
+        python technical_analysis.py --text sh588000              # 文字版分析报告
+    """
+    import screener  # 并发打分与代码列表读取 (screener 依赖本模块，放在函数内导入)
+
+    parser = argparse.ArgumentParser(description="技术面分析 (与界面使用相同的指标和打分)")
+    parser.add_argument("codes", nargs="*", help="代码")
+    parser.add_argument("--file", help="代码列表文件 (每行一个代码，可跟名称)")
+    parser.add_argument("--config", help="主程序配置文件 (读取其中的自选股)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), default="jsonl", help="输出格式")
+    parser.add_argument("-o", "--output", help="输出文件 (默认标准输出)")
+    parser.add_argument("--workers", type=int, default=screener.SCREEN_WORKERS, help="并发数")
+    parser.add_argument("--text", action="store_true", help="逐只打印文字版分析报告")
+    args = parser.parse_args(argv)
+
+    stocks = [{"code": c, "name": c} for c in args.codes]
+    if args.file:
+        stocks += screener.read_codes(args.file)
+    if args.config:
+        stocks += screener.load_watchlist(args.config)
+    if not stocks:
+        parser.error("no codes given (use codes, --file or --config)")
+
+    if args.text:
+        for s in stocks:
+            analyze_stock(s["code"], s["name"])
+        return 0
+
+    results = screener.screen(stocks, workers=args.workers)
+    records = [export_record(r) for r in results]
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as f:
+            write_records(records, args.format, f)
+    else:
+        write_records(records, args.format, sys.stdout)
+    print(f"{len(records)}/{len(stocks)} analyzed", file=sys.stderr)
+    return 0 if records else 1
+
+
 if __name__ == "__main__":
-    # 分析你的持仓
-    analyze_stock("sh588000", "科创50ETF")
-    analyze_stock("sh000832", "中证转债")
+    sys.exit(main())
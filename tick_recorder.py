@@ -0,0 +1,410 @@
+"""
+行情记录: 把每一笔行情 (时间, 代码, 价格, 涨跌幅, 成交量) 追加到按日分文件的定长二进制日志
+
+文件 (目录 TICK_DIR 下，日期为本地日期):
+- YYYYMMDD.ticks  16 字节文件头 + 16 字节定长记录，只追加；可 mmap 后零拷贝读成 NumPy 结构化数组
+- YYYYMMDD.codes  代码表，每行一个代码，行号即记录里的代码编号
+- YYYYMMDD.tkz    压缩后的旧日志 (compact): 差分编码后 zlib 压缩，读取时还原成同样的记录
+
+记录 (小端): 当天 0 点起的毫秒数 uint32 | 代码编号 uint16 | 涨跌幅 x100 int16 | 价格 x1000 int32 | 成交量 uint32
+只记录和上一次相比有变化的行情；进程中断时文件末尾不完整的记录在读取时忽略
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import threading
+import time
+import zlib
+from datetime import date, datetime, timedelta
+
+TICK_DIR = "ticks"
+MAGIC = b"SMTK"
+VERSION = 1
+PRICE_SCALE = 1000   # 价格保留 3 位小数
+PCT_SCALE = 100      # 涨跌幅保留 2 位小数 (±327.67%)
+
+_HEADER = struct.Struct("<4sHxxq")   # magic, version, 当天 0 点的时间戳 (秒)
+_RECORD = struct.Struct("<IHhiI")
+# 记录的 NumPy 结构化类型 (与 _RECORD 对应)；读取时才导入 NumPy，主程序只写入不需要它
+RECORD_FIELDS = [("time", "<u4"), ("code", "<u2"), ("pct", "<i2"), ("price", "<i4"), ("volume", "<u4")]
+# 压缩格式中按代码差分的列及差分后的类型
+_DELTA_TYPES = (("pct", "<i4"), ("price", "<i4"), ("volume", "<i8"))
+
+
+def _day_start(day):
+    return datetime(day.year, day.month, day.day).timestamp()
+
+
+def _paths(directory, day):
+    stem = os.path.join(directory, day.strftime("%Y%m%d"))
+    return stem + ".ticks", stem + ".codes", stem + ".tkz"
+
+
+def _clip(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+class TickRecorder:
+    """行情记录器 (线程安全)；record() 每个刷新周期调用一次，批量写入"""
+
+    def __init__(self, directory=TICK_DIR):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._day = None
+        self._file = None
+        self._codes_file = None
+        self._code_ids = {}   # {code: 编号}
+        self._last = {}       # {code: 上次记录的行情}，用于只记录变化
+        self.records = 0      # 本次运行写入的记录数
+
+    def _open(self, day):
+        self._close()
+        os.makedirs(self.directory, exist_ok=True)
+        ticks_path, codes_path, _ = _paths(self.directory, day)
+        self._code_ids = {}
+        if os.path.exists(codes_path):
+            with open(codes_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    self._code_ids[line.rstrip("\n")] = len(self._code_ids)
+        new = not os.path.exists(ticks_path) or os.path.getsize(ticks_path) < _HEADER.size
+        self._file = open(ticks_path, "ab")
+        if new:
+            self._file.truncate(0)
+            self._file.write(_HEADER.pack(MAGIC, VERSION, int(_day_start(day))))
+        else:
+            # 上次中断时可能留下半条记录，截掉后再追加，保证记录对齐
+            size = os.path.getsize(ticks_path)
+            whole = _HEADER.size + (size - _HEADER.size) // _RECORD.size * _RECORD.size
+            if whole != size:
+                self._file.truncate(whole)
+        self._codes_file = open(codes_path, "a", encoding="utf-8")
+        self._day = day
+        self._last = {}
+
+    def _code_id(self, code):
+        code_id = self._code_ids.get(code)
+        if code_id is None:
+            code_id = self._code_ids[code] = len(self._code_ids)
+            self._codes_file.write(code + "\n")
+            self._codes_file.flush()  # 代码表先落盘，记录里才能引用
+        return code_id
+
+    def record(self, quotes, now=None):
+        """
+        追加一批行情 {code: (price, percent, volume, quote_time)}，返回写入的记录数
+        now 为记录时间 (time.time())，默认当前时间；跨日时自动切换到新文件
+        """
+        now = time.time() if now is None else now
+        moment = datetime.fromtimestamp(now)
+        with self._lock:
+            if self._day != moment.date():
+                self._open(moment.date())
+            offset = int((now - _day_start(self._day)) * 1000)
+            chunks = []
+            for code, quote in quotes.items():
+                if self._last.get(code) == quote:
+                    continue
+                self._last[code] = quote
+                price, percent, volume = quote[0], quote[1] or 0, quote[2]
+                chunks.append(_RECORD.pack(
+                    offset, self._code_id(code),
+                    _clip(round(percent * PCT_SCALE), -32768, 32767),
+                    _clip(round(price * PRICE_SCALE), -2**31, 2**31 - 1),
+                    _clip(int(volume or 0), 0, 2**32 - 1)))
+            if chunks:
+                self._file.write(b"".join(chunks))
+                self._file.flush()
+                self.records += len(chunks)
+            return len(chunks)
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        for f in (self._file, self._codes_file):
+            if f is not None:
+                f.close()
+        self._file = self._codes_file = None
+        self._day = None
+
+
+# ================= 读取 =================
+
+class TickLog:
+    """
+    一天的行情记录。records 为 RECORD_FIELDS 结构化数组:
+    原始日志是 mmap 上的零拷贝视图 (只读)，压缩日志是解压后的数组
+    """
+
+    def __init__(self, day, codes, base, records, mapping=None):
+        self.day = day
+        self.codes = codes  # 编号 -> 代码
+        self.base = base    # 当天 0 点的时间戳
+        self.records = records
+        self._mapping = mapping
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """释放 mmap (之后不能再访问 records)"""
+        self.records = self.records[:0].copy()
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                pass  # 调用方仍持有记录的视图，等其释放后由垃圾回收关闭
+            self._mapping = None
+
+    # ---------- 列 (换算成实际数值) ----------
+
+    @property
+    def timestamps(self):
+        return self.base + self.records["time"] / 1000.0
+
+    @property
+    def prices(self):
+        return self.records["price"] / PRICE_SCALE
+
+    @property
+    def percents(self):
+        return self.records["pct"] / PCT_SCALE
+
+    def for_code(self, code):
+        """某只代码当天的全部记录 (结构化数组)，没有时为空数组"""
+        try:
+            code_id = self.codes.index(code)
+        except ValueError:
+            return self.records[:0]
+        return self.records[self.records["code"] == code_id]
+
+    def batches(self):
+        """
+        按记录时间分批还原行情: 逐批产出 (时间戳, {code: (price, percent, volume, quote_time)})
+        同一刷新周期写入的记录时间相同，正好是一批；quote_time 取记录时间 (YYYYMMDDHHMMSS)
+        """
+        import numpy as np
+        records = self.records
+        if not len(records):
+            return
+        times = records["time"]
+        bounds = np.flatnonzero(np.diff(times)) + 1
+        starts = np.concatenate(([0], bounds)).tolist()
+        ends = np.concatenate((bounds, [len(records)])).tolist()
+        codes = self.codes
+        code_col = records["code"].tolist()
+        prices = self.prices.tolist()
+        percents = self.percents.tolist()
+        volumes = records["volume"].tolist()
+        for start, end in zip(starts, ends):
+            ts = self.base + int(times[start]) / 1000.0
+            quote_time = datetime.fromtimestamp(ts).strftime("%Y%m%d%H%M%S")
+            yield ts, {codes[code_col[i]]: (prices[i], percents[i], volumes[i], quote_time)
+                       for i in range(start, end)}
+
+
+def _read_codes(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def load_day(day, directory=TICK_DIR):
+    """读取某天 (date 或 "YYYYMMDD"/"YYYY-MM-DD") 的记录，返回 TickLog；没有记录时返回 None"""
+    if isinstance(day, str):
+        day = datetime.strptime(day.replace("-", ""), "%Y%m%d").date()
+    ticks_path, codes_path, packed_path = _paths(directory, day)
+    if os.path.exists(ticks_path) and os.path.exists(codes_path):
+        with open(ticks_path, "rb") as f:
+            size = os.path.getsize(ticks_path)
+            if size < _HEADER.size:
+                return None
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, base = _HEADER.unpack_from(mapping, 0)
+        if magic != MAGIC or version != VERSION:
+            mapping.close()
+            raise ValueError(f"{ticks_path}: not a tick log")
+        count = (size - _HEADER.size) // _RECORD.size  # 忽略末尾不完整的记录
+        import numpy as np
+        records = np.frombuffer(mapping, dtype=RECORD_FIELDS, count=count, offset=_HEADER.size)
+        return TickLog(day, _read_codes(codes_path), float(base), records, mapping)
+    if os.path.exists(packed_path):
+        codes, base, records = _unpack(packed_path)
+        return TickLog(day, codes, base, records)
+    return None
+
+
+def list_days(directory=TICK_DIR):
+    """有记录的日期 (升序)"""
+    days = set()
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            stem, ext = os.path.splitext(name)
+            if ext in (".ticks", ".tkz") and stem.isdigit() and len(stem) == 8:
+                days.add(datetime.strptime(stem, "%Y%m%d").date())
+    return sorted(days)
+
+
+# ================= 压缩 =================
+# .tkz: 文件头 | 代码表字节数, 记录数 (uint32 x2) | 代码表 (utf-8，换行分隔) | zlib(各列)
+# 时间列与前一条记录差分 (同一批内为 0)；涨跌幅/价格/成交量与同一代码的上一条记录差分 (每只代码第一条存原值)
+# 差分后数值很小，各列再按字节转置 (高位的 0 字节连在一起)，zlib 压缩率远高于原始定长记录
+# 记录顺序不变，解压后与原始日志逐条一致
+
+def _shuffle(values):
+    import numpy as np
+    return values.view(np.uint8).reshape(-1, values.dtype.itemsize).T.tobytes()
+
+
+def _unshuffle(raw, dtype, count):
+    import numpy as np
+    dtype = np.dtype(dtype)
+    planes = np.frombuffer(raw, dtype=np.uint8, count=count * dtype.itemsize)
+    return np.ascontiguousarray(planes.reshape(dtype.itemsize, count).T).view(dtype).ravel()
+
+
+def _pack(log):
+    import numpy as np
+    records = log.records
+    code = records["code"]
+    order = np.argsort(code, kind="stable")  # 按代码分组，组内保持时间顺序
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = code[order][1:] != code[order][:-1]
+
+    time_col = records["time"].astype(np.int64)
+    columns = [_shuffle(code.astype("<u2")), _shuffle(np.diff(time_col, prepend=0).astype("<i4"))]
+    for name, dtype in _DELTA_TYPES:
+        values = records[name][order].astype(np.int64)
+        delta = np.diff(values, prepend=0)
+        delta[first] = values[first]
+        restored = np.empty_like(delta)
+        restored[order] = delta
+        columns.append(_shuffle(restored.astype(dtype)))
+    codes = "\n".join(log.codes).encode("utf-8")
+    return (_HEADER.pack(MAGIC, VERSION, int(log.base)) + struct.pack("<II", len(codes), len(records))
+            + codes + zlib.compress(b"".join(columns), 6))
+
+
+def _unpack(path):
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, base = _HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path}: not a packed tick log")
+    codes_len, count = struct.unpack_from("<II", data, _HEADER.size)
+    pos = _HEADER.size + 8
+    codes = data[pos:pos + codes_len].decode("utf-8").split("\n") if codes_len else []
+    raw = memoryview(zlib.decompress(data[pos + codes_len:]))
+
+    import numpy as np
+    records = np.empty(count, dtype=RECORD_FIELDS)
+    code = _unshuffle(raw, "<u2", count)
+    offset = 2 * count
+    records["code"] = code
+    records["time"] = np.cumsum(_unshuffle(raw[offset:], "<i4", count), dtype=np.int64)
+    offset += 4 * count
+
+    order = np.argsort(code, kind="stable")
+    first = np.ones(count, dtype=bool)
+    first[1:] = code[order][1:] != code[order][:-1]
+    group = np.cumsum(first) - 1
+    for name, dtype in _DELTA_TYPES:
+        delta = _unshuffle(raw[offset:], dtype, count)[order].astype(np.int64)
+        offset += np.dtype(dtype).itemsize * count
+        # 组内累加还原: 全局前缀和减去每组起点之前的前缀和
+        total = np.cumsum(delta)
+        values = total - (total - delta)[first][group]
+        records[name][order] = values
+    return codes, float(base), records
+
+
+def compact(day, directory=TICK_DIR):
+    """把某天的原始日志压缩为 .tkz 并删除原始文件；返回 (原始字节数, 压缩后字节数)，没有原始日志时返回 None"""
+    if isinstance(day, str):
+        day = datetime.strptime(day.replace("-", ""), "%Y%m%d").date()
+    ticks_path, codes_path, packed_path = _paths(directory, day)
+    if not os.path.exists(ticks_path):
+        return None
+    log = load_day(day, directory)
+    if log is None:
+        return None
+    with log:
+        payload = _pack(log)
+    size = os.path.getsize(ticks_path) + os.path.getsize(codes_path)
+    tmp_path = packed_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, packed_path)
+    os.remove(ticks_path)
+    os.remove(codes_path)
+    return size, len(payload)
+
+
+def compact_old(directory=TICK_DIR, keep_days=1, today=None):
+    """压缩 keep_days 天以前 (不含今天) 的原始日志，返回压缩的天数"""
+    cutoff = (today or date.today()) - timedelta(days=keep_days - 1)
+    done = 0
+    for day in list_days(directory):
+        if day < cutoff and os.path.exists(_paths(directory, day)[0]):
+            try:
+                if compact(day, directory):
+                    done += 1
+            except Exception as e:
+                print(f"Tick log compaction failed for {day}: {e}")
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="行情记录查看/压缩")
+    parser.add_argument("--dir", default=TICK_DIR, help="记录目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("list", help="列出有记录的日期")
+    info = sub.add_parser("info", help="某天的记录概况")
+    info.add_argument("day", help="日期 YYYYMMDD")
+    info.add_argument("--code", help="只看某只代码 (输出最近的记录)")
+    pack = sub.add_parser("compact", help="压缩旧日志")
+    pack.add_argument("day", nargs="?", help="日期 (不填则压缩今天以前的全部原始日志)")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for day in list_days(args.dir):
+            ticks_path, codes_path, packed_path = _paths(args.dir, day)
+            path = ticks_path if os.path.exists(ticks_path) else packed_path
+            print(f"{day}  {os.path.splitext(path)[1]:<6} {os.path.getsize(path) / 1e6:8.2f} MB")
+    elif args.command == "info":
+        t0 = time.perf_counter()
+        log = load_day(args.day, args.dir)
+        if log is None:
+            print(f"no ticks for {args.day}", file=sys.stderr)
+            return 1
+        with log:
+            elapsed = time.perf_counter() - t0
+            print(f"{log.day}: {len(log)} ticks, {len(log.codes)} codes, loaded in {elapsed * 1000:.1f} ms")
+            if args.code:
+                rows = log.for_code(args.code)[-20:]
+                for r in rows:
+                    ts = datetime.fromtimestamp(log.base + int(r["time"]) / 1000.0)
+                    print(f"{ts:%H:%M:%S.%f}"[:-3], f"{r['price'] / PRICE_SCALE:.3f}",
+                          f"{r['pct'] / PCT_SCALE:+.2f}%", int(r["volume"]))
+    else:
+        if args.day:
+            result = compact(args.day, args.dir)
+            if result is None:
+                print(f"no raw tick log for {args.day}", file=sys.stderr)
+                return 1
+            print(f"{args.day}: {result[0] / 1e6:.2f} MB -> {result[1] / 1e6:.2f} MB")
+        else:
+            print(f"compacted {compact_old(args.dir)} day(s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())